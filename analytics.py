@@ -0,0 +1,346 @@
+"""Availability analytics over the stored check history.
+
+All aggregation runs inside SQLite with window functions over the whole
+``checks`` table: consecutive checks with the same state are grouped into
+availability intervals, from which uptime, restock counts, mean time to
+restock and hour-of-week restock patterns are derived. Hourly and daily
+rollups (see Database.apply_retention) add to uptime only, as they no longer
+hold individual transitions.
+
+    python analytics.py [--location NAME] [--intervals] [--db PATH]
+"""
+import argparse
+import time
+from datetime import datetime
+from config import Config
+from database import Database
+
+DAYS = ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat')
+
+# Every check with the state of the check before it and the time of the one
+# after it, per series; {series_filter} narrows the checks read
+_ORDERED = '''
+    ordered AS (
+        SELECT c.id, c.series_id, c.checked_at, c.is_available,
+               LAG(c.is_available) OVER w AS prev_available,
+               LEAD(c.checked_at) OVER w AS next_checked_at
+        FROM checks c
+        {series_filter}
+        WINDOW w AS (PARTITION BY c.series_id ORDER BY c.checked_at, c.id)
+    )
+'''
+
+# Runs of consecutive checks with the same state. An interval ends when the
+# first check with the other state is seen; the last one is still open
+# (ended_at NULL) and lasts until the product was last seen: its heartbeat
+# in check_state, later than its latest stored check in changes-only mode
+_INTERVALS = _ORDERED + ''',
+    numbered AS (
+        SELECT *, SUM(CASE WHEN prev_available IS NULL OR prev_available != is_available THEN 1 ELSE 0 END)
+                  OVER (PARTITION BY series_id ORDER BY checked_at, id ROWS UNBOUNDED PRECEDING) AS run
+        FROM ordered
+    ),
+    runs AS (
+        SELECT series_id, run, is_available,
+               MIN(checked_at) AS started_at,
+               CASE WHEN COUNT(next_checked_at) = COUNT(*) THEN MAX(next_checked_at) END AS ended_at,
+               MAX(checked_at) AS last_checked_at,
+               COUNT(*) AS checks
+        FROM numbered
+        GROUP BY series_id, run
+    ),
+    seen AS (
+        SELECT s.id AS series_id, CAST(strftime('%s', cs.last_seen_at) AS INTEGER) AS last_seen_at
+        FROM check_state cs
+        JOIN locations l ON l.name = cs.location_name
+        JOIN products p ON p.name = cs.product_name
+        JOIN series s ON s.location_id = l.id AND s.product_id = p.id
+    ),
+    intervals AS (
+        SELECT r.series_id, r.run, r.is_available, r.started_at, r.ended_at,
+               CASE WHEN r.ended_at IS NULL THEN MAX(r.last_checked_at, COALESCE(seen.last_seen_at, 0))
+                    ELSE r.last_checked_at END AS last_checked_at,
+               r.checks
+        FROM runs r
+        LEFT JOIN seen ON seen.series_id = r.series_id
+    )
+'''
+
+_NAMES = '''
+    JOIN series s ON s.id = {alias}.series_id
+    JOIN locations l ON l.id = s.location_id
+    JOIN products p ON p.id = s.product_id
+'''
+
+_HOUR_OF_WEEK = '''
+    CAST(strftime('%w', checked_at, 'unixepoch', 'localtime') AS INTEGER) * 24
+    + CAST(strftime('%H', checked_at, 'unixepoch', 'localtime') AS INTEGER)
+'''
+
+
+def hour_of_week(timestamp=None):
+    """Local hour of the week (0 = Sunday 00:00-00:59) of a Unix timestamp, as used in restock patterns."""
+    moment = datetime.fromtimestamp(time.time() if timestamp is None else timestamp)
+    return (moment.isoweekday() % 7) * 24 + moment.hour
+
+
+def format_hour_of_week(hour):
+    """Format an hour of the week, e.g. 'Mon 08:00'."""
+    return f"{DAYS[hour // 24]} {hour % 24:02d}:00"
+
+
+def format_duration(seconds):
+    """Format a duration in seconds as e.g. '2d 3h', '4h 10m' or '12m'."""
+    if seconds is None:
+        return '-'
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+class AvailabilityAnalytics:
+    """Availability statistics computed from a Database's history tables."""
+
+    def __init__(self, db):
+        self.conn = db.conn
+
+    def _series_filter(self, location_name=None, product_name=None, alias='c'):
+        """WHERE clause and parameters restricting the rows of table ``alias`` to matching series."""
+        conditions = []
+        params = []
+        if location_name is not None:
+            conditions.append('l.name = ?')
+            params.append(location_name)
+        if product_name is not None:
+            conditions.append('p.name = ?')
+            params.append(product_name)
+        if not conditions:
+            return '', params
+        return f'''
+            WHERE {alias}.series_id IN (
+                SELECT s.id FROM series s
+                JOIN locations l ON l.id = s.location_id
+                JOIN products p ON p.id = s.product_id
+                WHERE {' AND '.join(conditions)}
+            )
+        ''', params
+
+    def intervals(self, location_name=None, product_name=None):
+        """
+        Availability intervals: runs of consecutive checks with the same state.
+
+        Returns:
+            list: dicts with location_name, product_name, available,
+            started_at, ended_at (None while still ongoing), duration in
+            seconds (up to when the product was last seen for an ongoing
+            interval) and
+            checks, ordered by product and time
+        """
+        series_filter, params = self._series_filter(location_name, product_name)
+        cursor = self.conn.execute(f'''
+            WITH {_INTERVALS.format(series_filter=series_filter)}
+            SELECT l.name AS location_name, p.name AS product_name, i.is_available, i.started_at, i.ended_at,
+                   COALESCE(i.ended_at, i.last_checked_at) - i.started_at AS duration, i.checks
+            FROM intervals i
+            {_NAMES.format(alias='i')}
+            ORDER BY l.name, p.name, i.started_at
+        ''', params)
+        return [{
+            'location_name': row['location_name'],
+            'product_name': row['product_name'],
+            'available': bool(row['is_available']),
+            'started_at': row['started_at'],
+            'ended_at': row['ended_at'],
+            'duration': row['duration'],
+            'checks': row['checks']
+        } for row in cursor]
+
+    def summary(self, location_name=None, product_name=None):
+        """
+        Per-product availability statistics.
+
+        Uptime is time-weighted (each check's state lasts until the next
+        check) and includes rolled-up history. A restock is a sold-out
+        interval followed by an available one; the mean time to restock
+        leaves out a sold-out interval the history starts with, as its real
+        start is unknown. Series whose checks were all rolled up only have
+        an uptime.
+
+        Returns:
+            list: dicts with location_name, product_name, uptime (0-1 or
+            None), observed_seconds, restocks, mean_time_to_restock (seconds
+            or None), available (current state, None without raw checks)
+            and since (start of the current interval)
+        """
+        series_filter, params = self._series_filter(location_name, product_name)
+        rollup_filter, rollup_params = self._series_filter(location_name, product_name, alias='r')
+        cursor = self.conn.execute(f'''
+            WITH {_INTERVALS.format(series_filter=series_filter)},
+            raw AS (
+                SELECT series_id,
+                       SUM(CASE WHEN is_available THEN COALESCE(ended_at, last_checked_at) - started_at END)
+                           AS available_seconds,
+                       SUM(COALESCE(ended_at, last_checked_at) - started_at) AS observed_seconds,
+                       SUM(CASE WHEN NOT is_available AND ended_at IS NOT NULL THEN 1 ELSE 0 END) AS restocks,
+                       AVG(CASE WHEN NOT is_available AND ended_at IS NOT NULL AND run > 1
+                                THEN ended_at - started_at END) AS mean_time_to_restock,
+                       MAX(run) AS last_run
+                FROM intervals
+                GROUP BY series_id
+            ),
+            rolled AS (
+                SELECT r.series_id,
+                       SUM(r.period * r.available_checks * 1.0 / r.checks) AS available_seconds,
+                       SUM(r.period) AS observed_seconds
+                FROM availability_rollups r
+                {rollup_filter}
+                GROUP BY r.series_id
+            ),
+            tracked AS (
+                SELECT series_id FROM raw UNION SELECT series_id FROM rolled
+            )
+            SELECT l.name AS location_name, p.name AS product_name,
+                   COALESCE(raw.available_seconds, 0) + COALESCE(rolled.available_seconds, 0) AS available_seconds,
+                   COALESCE(raw.observed_seconds, 0) + COALESCE(rolled.observed_seconds, 0) AS observed_seconds,
+                   COALESCE(raw.restocks, 0) AS restocks, raw.mean_time_to_restock,
+                   i.is_available, i.started_at AS since
+            FROM tracked
+            LEFT JOIN raw ON raw.series_id = tracked.series_id
+            LEFT JOIN intervals i ON i.series_id = raw.series_id AND i.run = raw.last_run
+            LEFT JOIN rolled ON rolled.series_id = tracked.series_id
+            {_NAMES.format(alias='tracked')}
+            ORDER BY l.name, p.name
+        ''', params + rollup_params)
+        return [{
+            'location_name': row['location_name'],
+            'product_name': row['product_name'],
+            'uptime': row['available_seconds'] / row['observed_seconds'] if row['observed_seconds'] else None,
+            'observed_seconds': row['observed_seconds'],
+            'restocks': row['restocks'],
+            'mean_time_to_restock': row['mean_time_to_restock'],
+            'available': bool(row['is_available']) if row['is_available'] is not None else None,
+            'since': row['since']
+        } for row in cursor]
+
+    def restock_pattern(self, location_name=None, product_name=None):
+        """
+        Restocks per location and local hour of the week (see hour_of_week()).
+
+        Returns:
+            dict: {location_name: {hour_of_week: restock count}}
+        """
+        series_filter, params = self._series_filter(location_name, product_name)
+        cursor = self.conn.execute(f'''
+            WITH {_ORDERED.format(series_filter=series_filter)}
+            SELECT l.name AS location_name, {_HOUR_OF_WEEK} AS hour_of_week, COUNT(*) AS restocks
+            FROM ordered o
+            {_NAMES.format(alias='o')}
+            WHERE o.is_available = 1 AND o.prev_available = 0
+            GROUP BY l.name, hour_of_week
+        ''', params)
+        pattern = {}
+        for row in cursor:
+            pattern.setdefault(row['location_name'], {})[row['hour_of_week']] = row['restocks']
+        return pattern
+
+    def restock_windows(self, min_restocks=None):
+        """
+        Hours of the week in which each location has restocked repeatedly.
+
+        Args:
+            min_restocks: Restocks needed in an hour of the week for it to
+                count as a likely window (default: Config.RESTOCK_MIN_EVENTS)
+
+        Returns:
+            dict: {location_name: set of hour_of_week}
+        """
+        min_restocks = Config.RESTOCK_MIN_EVENTS if min_restocks is None else min_restocks
+        windows = {}
+        for location_name, hours in self.restock_pattern().items():
+            likely = {hour for hour, restocks in hours.items() if restocks >= min_restocks}
+            if likely:
+                windows[location_name] = likely
+        return windows
+
+
+def in_restock_window(windows, location_name, lead_minutes=None, timestamp=None):
+    """
+    Whether a location is in, or within ``lead_minutes`` of, one of its likely restock windows.
+
+    Args:
+        windows: Result of AvailabilityAnalytics.restock_windows()
+        location_name: Location to look up
+        lead_minutes: How early before a window to start (default: Config.RESTOCK_LEAD_MINUTES)
+        timestamp: Unix timestamp to check (default: now)
+    """
+    hours = windows.get(location_name)
+    if not hours:
+        return False
+    lead_minutes = Config.RESTOCK_LEAD_MINUTES if lead_minutes is None else lead_minutes
+    timestamp = time.time() if timestamp is None else timestamp
+    return hour_of_week(timestamp) in hours or hour_of_week(timestamp + lead_minutes * 60) in hours
+
+
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+
+
+def print_report(analytics, location_name=None, show_intervals=False):
+    """Print availability statistics, restock windows and optionally the intervals."""
+    stats = analytics.summary(location_name)
+    if not stats:
+        print("No checks recorded yet")
+        return
+
+    print(f"{'Location':<28}{'Product':<32}{'Uptime':>8}{'Restocks':>10}{'MTTR':>10}  Now")
+    for row in stats:
+        uptime = f"{row['uptime'] * 100:.1f}%" if row['uptime'] is not None else '-'
+        state = {True: 'available', False: 'sold out', None: 'unknown'}[row['available']]
+        since = f" since {format_timestamp(row['since'])}" if row['since'] else ''
+        print(f"{row['location_name'][:27]:<28}{row['product_name'][:31]:<32}{uptime:>8}{row['restocks']:>10}"
+              f"{format_duration(row['mean_time_to_restock']):>10}  {state}{since}")
+
+    print()
+    print("Restocks by hour of week (local time):")
+    pattern = analytics.restock_pattern(location_name)
+    windows = analytics.restock_windows()
+    for name, hours in sorted(pattern.items()):
+        busiest = sorted(hours.items(), key=lambda entry: (-entry[1], entry[0]))[:5]
+        listed = ', '.join(f"{format_hour_of_week(hour)} ({count})" for hour, count in busiest)
+        marker = ' *' if name in windows else ''
+        print(f"  {name}: {listed}{marker}")
+    if windows:
+        print(f"  * polled every {Config.CHECK_INTERVAL_HOT_MINUTES:g} min around hours with "
+              f"{Config.RESTOCK_MIN_EVENTS}+ restocks")
+
+    if show_intervals:
+        print()
+        print("Availability intervals:")
+        for interval in analytics.intervals(location_name):
+            state = 'available' if interval['available'] else 'sold out '
+            ongoing = ' (ongoing)' if interval['ended_at'] is None else ''
+            print(f"  {interval['location_name']} / {interval['product_name']}: {state} "
+                  f"{format_timestamp(interval['started_at'])} for {format_duration(interval['duration'])}{ongoing}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Availability report from the check history')
+    parser.add_argument('--location', help='Only report on this location')
+    parser.add_argument('--intervals', action='store_true', help='List every availability interval')
+    parser.add_argument('--db', help=f'Database file (default: {Config.DATABASE_PATH})')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        print_report(AvailabilityAnalytics(db), args.location, args.intervals)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Lightweight HTTP-only Wolt backend using the venue menu JSON endpoint."""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from backends import BaseScraper, error_result, fingerprint, venue_key
+from config import Config
+from database import format_price
+from health import LoadTimeTracker
+from metrics import PHASE_SECONDS, ERRORS
+from venues import parse_product_url
+
+logger = logging.getLogger(__name__)
+
+
+def item_name(item):
+    """Return a menu item's name; localized names are lists of {'lang', 'value'}."""
+    name = item.get('name')
+    if isinstance(name, list):
+        name = name[0].get('value') if name else None
+    return name
+
+
+def index_menu(data):
+    """
+    Index every item of a menu JSON document by id and by lowercased name.
+
+    Returns:
+        tuple: (items_by_id, items_by_name)
+    """
+    by_id = {}
+    by_name = {}
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if 'id' in node and ('baseprice' in node or 'price' in node):
+                by_id[node['id']] = node
+                name = item_name(node)
+                if isinstance(name, str):
+                    by_name.setdefault(name.strip().lower(), node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return by_id, by_name
+
+
+def item_status(item):
+    """
+    Work out availability and price of a single menu item.
+
+    Handles both the restaurant menu shape (``baseprice``, ``enabled``,
+    ``quantity_left``) and the retail assortment shape (``price``,
+    ``disabled_info``, ``purchasable_balance``).
+
+    Returns:
+        dict: {'available': bool, 'price': str or None}
+    """
+    cents = item.get('baseprice', item.get('price'))
+    if isinstance(cents, dict):
+        cents = cents.get('amount')
+
+    available = bool(item.get('enabled', True)) and not item.get('disabled_info')
+    for stock_field in ('quantity_left', 'purchasable_balance'):
+        if item.get(stock_field) is not None and item[stock_field] <= 0:
+            available = False
+
+    return {
+        'available': available and cents is not None,
+        'price': format_price(cents)
+    }
+
+
+class WoltApiScraper(BaseScraper):
+    """Checks products by asking Wolt's venue menu endpoint instead of rendering the page.
+
+    With a ``fingerprints`` cache (backends.FingerprintCache) menus are
+    requested conditionally (If-None-Match / If-Modified-Since), and a 304
+    response or a body identical to the last one returns the previous
+    results, marked unchanged, without parsing the menu.
+    """
+
+    def __init__(self, api_url=None, max_concurrency=1, timeout=10, fingerprints=None):
+        self.api_url = api_url or Config.WOLT_API_URL
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.fingerprints = fingerprints
+        # Per-venue request durations; a venue that stops answering times out early
+        self.fetch_times = LoadTimeTracker(min_timeout=2000)
+        self.session = None
+
+    def start(self):
+        """Open the pooled HTTP session."""
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+    def close(self):
+        """Close the HTTP session."""
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    def ensure_healthy(self):
+        if not self.session:
+            self.start()
+
+    def fetch_menu(self, venue_slug):
+        """Fetch the menu JSON document for a venue."""
+        response = self._get(venue_slug)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_venue_info(self, venue_slug):
+        """Fetch the venue info document (opening hours, timezone) for a venue."""
+        self.ensure_healthy()
+        response = self.session.get(Config.WOLT_VENUE_API_URL.format(slug=venue_slug), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _get(self, venue_slug, headers=None):
+        """Request a venue's menu with a timeout sized from its earlier requests."""
+        timeout = self.fetch_times.timeout_for(venue_slug, self.timeout * 1000) / 1000
+        started = time.monotonic()
+        response = self.session.get(self.api_url.format(slug=venue_slug), headers=headers, timeout=timeout)
+        self.fetch_times.record(venue_slug, (time.monotonic() - started) * 1000)
+        return response
+
+    def check_product_availability(self, url, timeout=30000):
+        """
+        Check if a product is available using the venue menu endpoint.
+
+        Args:
+            url: The Wolt product URL (must contain the venue slug and item id)
+            timeout: Unused, the HTTP timeout is set on the scraper
+
+        Returns:
+            dict: {
+                'available': bool,
+                'price': str or None,
+                'error': str or None
+            }
+        """
+        venue_slug, item_id = parse_product_url(url)
+        if not venue_slug or not item_id:
+            return error_result('No venue slug or item id in URL')
+
+        venue = {'name': venue_slug, 'slug': venue_slug, 'items': [{'id': item_id, 'name': item_id, 'url': url}]}
+        return self.check_venue(venue, timeout)[0]
+
+    def check_many(self, urls, timeout=30000):
+        """Check several product URLs using up to ``max_concurrency`` requests at once."""
+        self.ensure_healthy()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(lambda url: self.check_product_availability(url, timeout), urls))
+
+    def check_venue(self, venue, timeout=30000):
+        """
+        Check all tracked items of a venue with a single menu request.
+
+        Items are matched by id, or by name when no id is configured.
+
+        Returns:
+            list: One result dict per item, in the order of venue['items']
+        """
+        self.ensure_healthy()
+
+        if not venue.get('slug'):
+            return [error_result('No venue slug in URL') for _ in venue['items']]
+
+        key = venue_key(venue['slug'], venue['items'])
+        page_fingerprint = None
+        try:
+            if self.fingerprints is None:
+                with PHASE_SECONDS.time(phase='api_fetch', location=venue['slug']):
+                    data = self.fetch_menu(venue['slug'])
+            else:
+                with PHASE_SECONDS.time(phase='api_fetch', location=venue['slug']):
+                    response = self._get(venue['slug'], headers=self.fingerprints.validators(key))
+                if response.status_code == 304:
+                    cached = self.fingerprints.hit(key)
+                    if cached is not None:
+                        logger.info(f"API check of {venue['name']}: menu not modified")
+                        return cached
+                response.raise_for_status()
+                page_fingerprint = fingerprint(response.content)
+                cached = self.fingerprints.lookup(key, page_fingerprint)
+                if cached is not None:
+                    logger.info(f"API check of {venue['name']}: menu unchanged")
+                    return cached
+                data = response.json()
+            with PHASE_SECONDS.time(phase='parse', location=venue['slug']):
+                by_id, by_name = index_menu(data)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Error fetching menu for {venue['slug']}: {e}")
+            ERRORS.inc(component='api', kind='timeout' if isinstance(e, requests.Timeout) else 'error')
+            return [error_result(str(e)) for _ in venue['items']]
+
+        results = []
+        for item in venue['items']:
+            if item['id']:
+                menu_item = by_id.get(item['id'])
+            else:
+                menu_item = by_name.get(item['name'].strip().lower())
+
+            if menu_item is None:
+                results.append(error_result(f"Item {item['id'] or item['name']} not found in menu"))
+                continue
+
+            result = item_status(menu_item)
+            result['error'] = None
+            results.append(result)
+
+        if self.fingerprints is not None:
+            self.fingerprints.store(key, page_fingerprint, results, etag=response.headers.get('ETag'),
+                                    last_modified=response.headers.get('Last-Modified'))
+
+        logger.info(f"API check of {venue['name']}: {sum(r['available'] for r in results)}/{len(results)} item(s) available")
+        return results
+
+    def check_venues(self, venues, timeout=30000):
+        """Check several venues using up to ``max_concurrency`` requests at once."""
+        self.ensure_healthy()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(lambda venue: self.check_venue(venue, timeout), venues))
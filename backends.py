@@ -0,0 +1,216 @@
+"""Pluggable scraper backends.
+
+Every backend exposes the same small interface as WoltScraper, so
+ProductMonitor can pick one per location without knowing how a check is
+carried out.
+"""
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def error_result(error):
+    """Result dict for a check that could not be completed."""
+    return {
+        'available': False,
+        'price': None,
+        'error': error
+    }
+
+
+def fingerprint(content):
+    """Stable hash of page content: bytes, text, or JSON-serializable extracted fragments."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    elif not isinstance(content, bytes):
+        content = json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+class FingerprintCache:
+    """Last fingerprint and results per page, so unchanged pages can be skipped.
+
+    A backend looks up a page's fingerprint (a content hash) before parsing
+    it; on a match it returns the results it stored last time, each marked
+    ``'unchanged': True`` so the monitor skips storing and notifying them.
+    HTTP validators (ETag / Last-Modified) are kept with the entry for
+    conditional requests. Results containing an error are never cached.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def validators(self, key):
+        """HTTP validators of a cached page as request headers (empty if not cached)."""
+        entry = self._entries.get(key)
+        if not entry:
+            return {}
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, key):
+        """The cached results of a page known to be unchanged (e.g. a 304 response), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [dict(result, unchanged=True) for result in entry['results']]
+
+    def lookup(self, key, fingerprint):
+        """The cached results if the page still has this fingerprint, else None (a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [dict(result, unchanged=True) for result in entry['results']]
+
+    def store(self, key, fingerprint, results, etag=None, last_modified=None):
+        """Remember a page's fingerprint and results."""
+        with self._lock:
+            if any(result['error'] for result in results):
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = {
+                'fingerprint': fingerprint,
+                'results': [dict(result) for result in results],
+                'etag': etag,
+                'last_modified': last_modified
+            }
+
+    def __repr__(self):
+        return f"<FingerprintCache(hits={self.hits}, misses={self.misses}, pages={len(self._entries)})>"
+
+
+def venue_key(url, items):
+    """Fingerprint cache key of a page checked for the given items."""
+    return (url, tuple((item['id'], item['name']) for item in items))
+
+
+class BaseScraper:
+    """Interface shared by all scraper backends."""
+
+    def __enter__(self):
+        """Context manager entry."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+    def start(self):
+        """Acquire the backend's resources."""
+
+    def close(self):
+        """Release the backend's resources."""
+
+    def ensure_healthy(self):
+        """Make sure the backend is ready to serve a check cycle."""
+
+    def check_product_availability(self, url, timeout=30000):
+        """
+        Check if a product is available at a given Wolt URL.
+
+        Returns:
+            dict: {
+                'available': bool,
+                'price': str or None,
+                'error': str or None
+            }
+        """
+        raise NotImplementedError
+
+    def check_many(self, urls, timeout=30000):
+        """Check several product URLs, returning one result per URL in order."""
+        return [self.check_product_availability(url, timeout) for url in urls]
+
+    def check_venue(self, venue, timeout=30000):
+        """
+        Check all tracked items of one venue (see venues.load_venues).
+
+        Backends override this to load the venue once for all of its items;
+        the default checks every item URL on its own.
+
+        Returns:
+            list: One result dict per item, in the order of venue['items']
+        """
+        return self.check_many([item['url'] for item in venue['items']], timeout)
+
+    def check_venues(self, venues, timeout=30000):
+        """Check several venues, returning one list of item results per venue."""
+        return [self.check_venue(venue, timeout) for venue in venues]
+
+
+class FallbackScraper(BaseScraper):
+    """Tries a primary backend and retries failed checks on a fallback backend.
+
+    The fallback is only made ready once a check actually needs it, so a
+    browser fallback is never launched while the primary keeps succeeding.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def start(self):
+        self.primary.start()
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+    def ensure_healthy(self):
+        self.primary.ensure_healthy()
+
+    def check_product_availability(self, url, timeout=30000):
+        return self.check_many([url], timeout)[0]
+
+    def check_many(self, urls, timeout=30000):
+        results = self.primary.check_many(urls, timeout)
+
+        failed = [i for i, result in enumerate(results) if result['error']]
+        if failed:
+            logger.info(f"Falling back for {len(failed)} of {len(urls)} check(s)")
+            self.fallback.ensure_healthy()
+            retried = self.fallback.check_many([urls[i] for i in failed], timeout)
+            for i, result in zip(failed, retried):
+                results[i] = result
+
+        return results
+
+    def check_venue(self, venue, timeout=30000):
+        return self.check_venues([venue], timeout)[0]
+
+    def check_venues(self, venues, timeout=30000):
+        results = self.primary.check_venues(venues, timeout)
+
+        # Re-check only the failed items, still one load per venue
+        retry = []
+        for venue, item_results in zip(venues, results):
+            failed = [i for i, result in enumerate(item_results) if result['error']]
+            if failed:
+                retry.append((item_results, failed, dict(venue, items=[venue['items'][i] for i in failed])))
+
+        if retry:
+            logger.info(f"Falling back for {len(retry)} of {len(venues)} venue(s)")
+            self.fallback.ensure_healthy()
+            retried = self.fallback.check_venues([partial for _, _, partial in retry], timeout)
+            for (item_results, failed, _), partial_results in zip(retry, retried):
+                for i, result in zip(failed, partial_results):
+                    item_results[i] = result
+
+        return results
@@ -0,0 +1,135 @@
+"""Benchmark history lookups, writes and file size at large history sizes.
+
+Builds a throwaway database with the original (unindexed, one text row per
+check) schema, times last-check lookups, migrates it to the current compact
+schema and times them again. Writes are compared the same way: the original
+rollback journal with a commit per check against WAL with one batch per
+cycle. The file size is reported before and after migration and compaction.
+
+    python benchmarks/bench_database.py [--rows 1000000] [--locations 50]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database, MIGRATIONS  # noqa: E402
+
+
+def build_history(path, rows, locations):
+    """Fill a version-1 database with ``rows`` checks spread over ``locations``, 5 minutes apart."""
+    conn = sqlite3.connect(path)
+    conn.execute(MIGRATIONS[0][2])
+    conn.execute('PRAGMA user_version = 1')
+
+    start = datetime(2024, 1, 1)
+    per_location = rows // locations
+
+    def generate():
+        for step in range(per_location):
+            checked_at = (start + timedelta(minutes=5 * step)).isoformat()
+            for location in range(locations):
+                yield (f'Venue {location}', f'https://wolt.com/venue/venue-{location}', 'Product',
+                       random.random() < 0.2, '8,99 €', checked_at)
+
+    with conn:
+        conn.executemany('''
+            INSERT INTO product_checks (location_name, location_url, product_name, is_available, price, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', generate())
+    conn.close()
+
+
+def legacy_last_check(conn, location_name, product_name):
+    """The last-check query of the original schema."""
+    return conn.execute('''
+        SELECT * FROM product_checks
+        WHERE location_name = ? AND product_name = ?
+        ORDER BY checked_at DESC
+        LIMIT 1
+    ''', (location_name, product_name)).fetchone()
+
+
+def legacy_add_check(conn, location_name, location_url, product_name, is_available, price):
+    """The original write: one text row and one commit per check."""
+    conn.execute('''
+        INSERT INTO product_checks (location_name, location_url, product_name, is_available, price, checked_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (location_name, location_url, product_name, 1 if is_available else 0, price, datetime.utcnow().isoformat()))
+    conn.commit()
+
+
+def time_lookups(last_check, locations, lookups):
+    """Latencies of ``last_check(location_name, product_name)`` in milliseconds."""
+    latencies = []
+    for _ in range(lookups):
+        name = f'Venue {random.randrange(locations)}'
+        started = time.perf_counter()
+        last_check(name, 'Product')
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"{label:<28}p50 {statistics.median(latencies):9.3f} ms   p99 {p99:9.3f} ms")
+
+
+def time_writes(add_check, checks):
+    started = time.perf_counter()
+    for i in range(checks):
+        add_check(f'Venue {i}', 'https://wolt.com', 'Product', True, '8,99 €')
+    return (time.perf_counter() - started) * 1000
+
+
+def megabytes(path):
+    return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p)) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark history lookups, writes and size at scale')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--locations', type=int, default=50)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--writes', type=int, default=200, help='Checks per simulated cycle')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f"Building {args.rows:,} checks for {args.locations} locations...")
+        build_history(path, args.rows, args.locations)
+
+        # Version 1 schema: no index, rollback journal
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA synchronous=FULL')
+        report('last check, no index', time_lookups(
+            lambda name, product: legacy_last_check(conn, name, product), args.locations, args.lookups))
+        before = time_writes(lambda *check: legacy_add_check(conn, *check), args.writes)
+        conn.close()
+        size_before = megabytes(path)
+
+        started = time.perf_counter()
+        db = Database(path)
+        print(f"Migrated to schema version {db.schema_version()} in {time.perf_counter() - started:.1f} s")
+        db.compact()
+        report('last check, compact', time_lookups(db.query_last_check, args.locations, args.lookups))
+
+        with db.batch():
+            after = time_writes(db.add_check, args.writes)
+        print(f"{args.writes} writes, journal + commit each {before:9.1f} ms")
+        print(f"{args.writes} writes, WAL + one batch       {after:9.1f} ms")
+        print(f"File size: {size_before:.1f} MB before, {megabytes(path):.1f} MB after migration and VACUUM")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark: targeted extraction vs. the original full-page BeautifulSoup scan.
+
+Runs both approaches on the saved pages in fixtures/html, checks their
+answers against the expected ones and reports the time per page.
+
+    python benchmarks/bench_extraction.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+from extraction import ExtractionRules, extract_fragments, product_result, venue_results  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'fixtures', 'html')
+
+TARGET = {'id': '08c0c9d79b5528337e4ce2b1', 'name': 'Divlji crveni losos fileti s kožom MSC 150g', 'url': ''}
+VENUE_ITEMS = [
+    TARGET,
+    {'id': None, 'name': 'Bakalar škampi 500g', 'url': ''},
+    {'id': '269e0d37f2a74de452e6b438', 'name': '269e0d37f2a74de452e6b438', 'url': ''},
+]
+
+# fixture file, tracked items (None for a product page), expected availability per item
+CASES = [
+    ('product-available.html', None, [True]),
+    ('product-sold-out.html', None, [False]),
+    ('venue.html', VENUE_ITEMS, [True, True, False]),
+]
+
+
+def legacy_parse(content):
+    """The original approach: parse the whole page and scan all of its text."""
+    soup = BeautifulSoup(content, 'html.parser')
+    page_text = soup.get_text().lower()
+    indicators = ['sold out', 'rasprodano', 'nije dostupno', 'out of stock', 'not available']
+    is_out_of_stock = any(indicator in page_text for indicator in indicators)
+
+    price = None
+    for elem in soup.find_all(string=lambda text: text and '€' in text):
+        if any(char.isdigit() for char in elem):
+            price = elem.strip()
+            break
+
+    return {'available': price is not None and not is_out_of_stock, 'price': price}
+
+
+def targeted_parse(content, items, rules):
+    fragments = extract_fragments(content, rules, items or ())
+    if items is None:
+        return [product_result(fragments, rules)]
+    return venue_results(fragments, items, rules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare extraction approaches on saved HTML fixtures')
+    parser.add_argument('--repeat', type=int, default=50, help='Parses per fixture and approach')
+    args = parser.parse_args()
+
+    rules = ExtractionRules()
+
+    print(f"{'fixture':<26}{'approach':<11}{'ms/page':>9}{'speedup':>9}  correct")
+    for filename, items, expected in CASES:
+        with open(os.path.join(FIXTURES, filename), encoding='utf-8') as f:
+            content = f.read()
+
+        legacy = legacy_parse(content)
+        legacy_ok = all(legacy['available'] == want for want in expected)
+        targeted = targeted_parse(content, items, rules)
+        targeted_ok = [result['available'] for result in targeted] == expected
+
+        legacy_ms = timeit.timeit(lambda: legacy_parse(content), number=args.repeat) / args.repeat * 1000
+        targeted_ms = timeit.timeit(lambda: targeted_parse(content, items, rules), number=args.repeat) / args.repeat * 1000
+
+        print(f"{filename:<26}{'legacy':<11}{legacy_ms:>9.2f}{'':>9}  {legacy_ok}")
+        print(f"{'':<26}{'targeted':<11}{targeted_ms:>9.2f}{legacy_ms / targeted_ms:>8.1f}x  {targeted_ok}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark alert fan-out to many subscribers against the mock Telegram server.
+
+Subscribes ``--subscribers`` chats to one item (directly, to the whole venue
+or to the item everywhere), plus as many to other venues that must not be
+alerted, then measures:
+
+- ``lookup``:   Database.get_subscribers for the item, the query behind every alert
+- ``enqueue``:  writing ``--alerts`` alerts to the outbox for every recipient
+- ``delivery``: until the sender pool has emptied the outbox, one digest per chat
+
+The mock server (mock_telegram.py) enforces the same rate limit as the
+senders and answers 403 for ``--blocked`` chats, which must end up
+unsubscribed. The run fails (exit status 1) if any chat missed its digest,
+got it twice, or Telegram's limits were hit.
+
+    python benchmarks/bench_fanout.py [--subscribers 2000] [--rate 200] [--senders 8] [--latency 0.02]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config  # noqa: E402
+from database import Database, ANY  # noqa: E402
+from mock_telegram import MockTelegram  # noqa: E402
+from notifier import TelegramNotifier, NotificationQueue, RateLimiter  # noqa: E402
+
+VENUE_URL = 'https://wolt.com/hr/hrv/zagreb/venue/fisherija-maksimir'
+OTHER_VENUE_URL = 'https://wolt.com/hr/hrv/zagreb/venue/fisherija-dubrava'
+PRODUCT_NAME = 'Divlji crveni losos fileti s kožom MSC 150g'
+
+
+def seed(db, subscribers, blocked):
+    """Subscribe the chats; returns the chat ids that should be alerted."""
+    expected = []
+    for i in range(subscribers):
+        chat_id = str(100000 + i)
+        # Half subscribe to the item at the venue, a quarter to the whole venue, a quarter to the item anywhere
+        venue_url, product_name = [(VENUE_URL, PRODUCT_NAME), (VENUE_URL, PRODUCT_NAME),
+                                   (VENUE_URL, ANY), (ANY, PRODUCT_NAME)][i % 4]
+        db.add_subscription(chat_id, venue_url, product_name)
+        db.add_subscription(str(900000 + i), OTHER_VENUE_URL, PRODUCT_NAME)
+        if i >= blocked:
+            expected.append(chat_id)
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark alert fan-out to many subscribers')
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--blocked', type=int, default=20, help='Subscribers that blocked the bot')
+    parser.add_argument('--alerts', type=int, default=3, help='Alerts per chat, sent as one digest')
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help='Messages per second allowed by the mock and used by the senders '
+                             '(Telegram allows about 30)')
+    parser.add_argument('--senders', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds per sendMessage')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            MockTelegram(rate=args.rate, blocked=[100000 + i for i in range(args.blocked)],
+                         latency=args.latency) as mock:
+        Config.TELEGRAM_API_URL = mock.url
+        Config.TELEGRAM_BOT_TOKEN = 'bench-token'
+        Config.TELEGRAM_CHAT_ID = '1'
+        db_path = os.path.join(work_dir, 'fanout.db')
+        db = Database(db_path)
+        expected = seed(db, args.subscribers, args.blocked)
+
+        timings = []
+        for _ in range(200):
+            started = time.perf_counter()
+            recipients = db.get_subscribers(VENUE_URL, PRODUCT_NAME)
+            timings.append((time.perf_counter() - started) * 1000)
+        plan = ' | '.join(row[3] for row in db.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT subscriber_id FROM subscriptions '
+            'WHERE venue_url IN (?, ?) AND product_name IN (?, ?)', (VENUE_URL, ANY, PRODUCT_NAME, ANY)))
+
+        queue = NotificationQueue(TelegramNotifier(), db_path=db_path, digest_window=3600, senders=args.senders,
+                                  rate_limiter=RateLimiter(rate=args.rate))
+        started = time.perf_counter()
+        for i in range(args.alerts):
+            queue.enqueue(f"Venue {i}", VENUE_URL, PRODUCT_NAME, '8,99 €', chat_ids=recipients)
+        enqueue_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        queue.flush()
+        while queue.pending():
+            time.sleep(0.05)
+        delivery_seconds = time.perf_counter() - started
+        queue.close()
+
+        received = mock.chats()
+        missing = [chat_id for chat_id in expected if chat_id not in received]
+        repeated = [chat_id for chat_id, count in received.items() if count > 1]
+        unsubscribed = args.blocked - len({s['chat_id'] for s in db.get_subscriptions()
+                                           if int(s['chat_id']) < 100000 + args.blocked})
+        db.close()
+
+    print(f"lookup          {statistics.median(timings):8.2f} ms median for {len(recipients)} recipients "
+          f"of {args.subscribers * 2} subscriptions")
+    print(f"                {plan}")
+    print(f"enqueue         {enqueue_seconds * 1000:8.1f} ms for {args.alerts} x {len(recipients)} outbox rows")
+    print(f"delivery        {delivery_seconds:8.2f} s  {len(mock.messages)} messages, "
+          f"{len(mock.messages) / delivery_seconds:.0f}/s of {args.rate:.0f}/s allowed, "
+          f"{args.senders} senders, {args.latency * 1000:.0f} ms per send")
+    print(f"rate limited    {mock.rate_limited:8d}")
+    print(f"blocked chats   {unsubscribed:8d} of {args.blocked} unsubscribed")
+    print(f"missing         {len(missing):8d}")
+    print(f"repeated        {len(repeated):8d}")
+    if missing or repeated or mock.rate_limited or unsubscribed != args.blocked:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark what logging costs a check on the thread that runs it.
+
+Logs the lines of one item check (checking, navigation, page ready, page
+stats, result) ``--checks`` times and reports the median and p99 time per
+check spent in the logging calls, for:
+
+- ``sync``:     file and console handlers called directly, as before
+- ``queued``:   logs.setup_logging, text format; I/O and formatting on the listener thread
+- ``compact``:  the same with LOG_FORMAT=compact and LOG_SAMPLE_EVERY=10
+
+The console is a file in a temporary directory, so terminal speed does not
+skew the comparison. Items are "not available" in 9 checks of 10, the
+steady state of a monitor waiting for a restock.
+
+    python benchmarks/bench_logging.py [--checks 20000] [--items 50]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import logs  # noqa: E402
+
+VENUE_URL = 'https://wolt.com/hr/hrv/zagreb/venue/fisherija-maksimir'
+PRODUCT_NAME = 'Divlji crveni losos fileti s kožom MSC 150g'
+
+
+def run_checks(checks, items):
+    """Log ``checks`` item checks; returns the microseconds each one spent logging."""
+    main_logger = logging.getLogger('main')
+    scraper_logger = logging.getLogger('scraper')
+    timings = []
+    for i in range(checks):
+        product_name = f"{PRODUCT_NAME} #{i % items}"
+        available = i % 10 == 0
+        started = time.perf_counter()
+        main_logger.info(f"Checking {product_name} at Fisherija Maksimir...")
+        scraper_logger.info(f"Navigating to {VENUE_URL}")
+        scraper_logger.info("Page ready after 412 ms")
+        scraper_logger.info("Page stats: 38 requests, 21 blocked, 12 from cache, 184 KB fetched")
+        main_logger.info(f"Fisherija Maksimir - {product_name}: {'available' if available else 'not available'}",
+                         extra={'sample_key': (VENUE_URL, product_name), 'sampled': not available})
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def sync_logging(work_dir):
+    """The previous set-up: handlers called on the logging thread."""
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for path in ('sync.log', 'sync-console.log'):
+        handler = logging.FileHandler(os.path.join(work_dir, path))
+        handler.setFormatter(logging.Formatter(logs.TEXT_FORMAT))
+        root.addHandler(handler)
+
+
+def stop_sync_logging():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def queued_logging(work_dir, name, **options):
+    """logs.setup_logging with the console redirected to a file."""
+    console = open(os.path.join(work_dir, f"{name}-console.log"), 'w')
+    stderr, sys.stderr = sys.stderr, console
+    try:
+        logs.setup_logging(os.path.join(work_dir, f"{name}.log"), max_mb=0, **options)
+    finally:
+        sys.stderr = stderr
+    return console
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging's cost per check")
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--items', type=int, default=50)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        sync_logging(work_dir)
+        results.append(('sync', run_checks(args.checks, args.items), 0))
+        stop_sync_logging()
+
+        for name, options in [('queued', {'log_format': 'text', 'sample_every': 0}),
+                              ('compact', {'log_format': 'compact', 'sample_every': 10})]:
+            console = queued_logging(work_dir, name, **options)
+            timings = run_checks(args.checks, args.items)
+            started = time.perf_counter()
+            # Waits for the listener to write out the backlog
+            logs.stop_logging()
+            drain_ms = (time.perf_counter() - started) * 1000
+            console.close()
+            results.append((name, timings, drain_ms))
+
+        sizes = {name: os.path.getsize(os.path.join(work_dir, f"{name}.log")) for name, _, _ in results}
+
+    print(f"{'':<10}{'median':>10}{'p99':>10}{'drain':>10}{'log file':>10}")
+    for name, timings, drain_ms in results:
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{name:<10}{statistics.median(timings):8.1f}us{p99:8.1f}us{drain_ms:8.0f}ms"
+              f"{sizes[name] / 1024:8.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+"""Offline end-to-end benchmark against the local stub server.
+
+Simulates 1, 10, 100 and 500 locations (available, sold-out and slow
+variants, see stub_server.py) and runs these scenarios against them:
+
+- ``product``: WoltScraper / WoltApiScraper.check_product_availability per location
+- ``brand``:   WoltScraper.get_brand_locations on a brand page listing every location (browser only)
+- ``cycle``:   full ProductMonitor.check_all_locations cycles, including the database and alert queue
+- ``profile``: product checks with a persistent browser profile, first on an empty
+  profile (``cold``), then in a new browser on the same profile (``warm``), with the
+  pages' script bundles served cacheable by the stub; reports the cache hit ratio
+  and the bytes fetched per check (browser only)
+
+Throughput, p50/p99 latency, peak memory (this process plus the browser)
+and correctness are reported. Results are saved to benchmarks/results/
+and compared with the previous run.
+
+    python benchmarks/bench_scraper.py [--backend api|browser] [--locations 1,10,100,500]
+                                       [--scenarios product,brand,cycle,profile] [--compare latest|PATH|none]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config  # noqa: E402
+from notifier import TelegramNotifier  # noqa: E402
+from stub_server import StubServer, FIXTURES_DIR  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+ITEM_ID = '08c0c9d79b5528337e4ce2b1'
+
+
+def variant(index, slow_every):
+    """Variant of the index-th simulated location: every slow_every-th is slow, odd ones sold out."""
+    if slow_every and index % slow_every == slow_every - 1:
+        return 'slow'
+    return 'sold-out' if index % 2 else 'available'
+
+
+def make_locations(base_url, count, slow_every):
+    """Simulated locations as (config entry, expected availability) pairs."""
+    locations = []
+    for i in range(count):
+        slug = f"{variant(i, slow_every)}-{i}"
+        locations.append(({
+            'name': f"Bench {slug}",
+            'url': f"{base_url}/hr/hrv/zagreb/venue/{slug}/divlji-crveni-losos-itemid-{ITEM_ID}"
+        }, not slug.startswith('sold-out')))
+    return locations
+
+
+def write_brand_page(fixtures_dir, locations):
+    """Write a brand page fixture listing every simulated location."""
+    links = ''.join(
+        f'<li><a href="/hr/hrv/zagreb/venue/{location["url"].split("/venue/")[1].split("/")[0]}">'
+        f'{location["name"]}</a></li>'
+        for location, _ in locations
+    )
+    with open(os.path.join(fixtures_dir, 'html', 'brand.html'), 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Bench | Wolt</title></head>'
+                f'<body><main><h1>Bench</h1><ul>{links}</ul></main></body></html>')
+
+
+class PeakMemory:
+    """Samples the RSS of this process and its children (the browser) in the background."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss(self):
+        process = psutil.Process(os.getpid())
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))] if values else None
+
+
+def summarize(scenario, backend, count, seconds, latencies, work, correct, memory):
+    """One result row; ``work`` is the number of location checks done in ``seconds``."""
+    return {
+        'scenario': scenario,
+        'backend': backend,
+        'locations': count,
+        'seconds': round(seconds, 3),
+        'throughput': round(work / seconds, 2) if seconds else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'peak_rss_mb': round(memory.peak / 1024 / 1024, 1),
+        'correct': correct
+    }
+
+
+def make_scraper(backend, api_url, concurrency):
+    if backend == 'api':
+        from api_scraper import WoltApiScraper
+        return WoltApiScraper(api_url=api_url, max_concurrency=concurrency)
+    from scraper import WoltScraper
+    return WoltScraper(max_concurrency=concurrency, max_per_host=concurrency)
+
+
+def bench_product(backend, locations, api_url, concurrency):
+    """check_product_availability for every location, ``concurrency`` at a time."""
+    latencies = []
+
+    def check(entry):
+        started = time.perf_counter()
+        result = scraper.check_product_availability(entry[0]['url'])
+        latencies.append(time.perf_counter() - started)
+        return result['available'] == entry[1] and not result['error']
+
+    with make_scraper(backend, api_url, concurrency) as scraper, PeakMemory() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            correct = sum(pool.map(check, locations))
+        seconds = time.perf_counter() - started
+    return summarize('product', backend, len(locations), seconds, latencies, len(locations),
+                     f"{correct}/{len(locations)}", memory)
+
+
+def bench_brand(locations, base_url, fixtures_dir, repeat):
+    """get_brand_locations on a brand page listing every location."""
+    from scraper import WoltScraper
+
+    write_brand_page(fixtures_dir, locations)
+    latencies = []
+    found = 0
+    with WoltScraper() as scraper, PeakMemory() as memory:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            check_started = time.perf_counter()
+            found = len(scraper.get_brand_locations(f"{base_url}/hr/hrv/zagreb/brand/bench"))
+            latencies.append(time.perf_counter() - check_started)
+        seconds = time.perf_counter() - started
+    return summarize('brand', 'browser', len(locations), seconds, latencies, len(locations) * repeat,
+                     f"{found}/{len(locations)}", memory)
+
+
+def serve_assets_from_stub(fixtures_dir, base_url):
+    """
+    Point the script bundles of the page fixtures at the stub server.
+
+    Returns:
+        dict: Fixture path -> original content, to put back afterwards
+    """
+    originals = {}
+    for name in ('product-available.html', 'product-sold-out.html', 'venue.html'):
+        path = os.path.join(fixtures_dir, 'html', name)
+        with open(path, encoding='utf-8') as f:
+            originals[path] = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(originals[path].replace('https://consumer-static-assets.wolt.com/', f"{base_url}/static/"))
+    return originals
+
+
+def bench_profile(locations, base_url, fixtures_dir, work_dir, concurrency):
+    """Product checks on an empty persistent profile, then in a new browser on the warmed-up profile."""
+    from scraper import WoltScraper, BrowserProfile
+
+    originals = serve_assets_from_stub(fixtures_dir, base_url)
+    profile = BrowserProfile(os.path.join(work_dir, f"profile-{len(locations)}"))
+    rows = []
+    try:
+        for phase in ('cold', 'warm'):
+            latencies = []
+
+            def check(entry):
+                started = time.perf_counter()
+                result = scraper.check_product_availability(entry[0]['url'])
+                latencies.append(time.perf_counter() - started)
+                return result['available'] == entry[1] and not result['error']
+
+            with WoltScraper(max_concurrency=concurrency, max_per_host=concurrency, profile=profile) as scraper, \
+                    PeakMemory() as memory:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    correct = sum(pool.map(check, locations))
+                seconds = time.perf_counter() - started
+            totals = scraper.page_totals
+            row = summarize(phase, 'browser', len(locations), seconds, latencies, len(locations),
+                            f"{correct}/{len(locations)}", memory)
+            row['cache_hit_ratio'] = round(totals.cache_hit_ratio, 3)
+            row['kb_fetched_per_check'] = round(totals.bytes_fetched / max(1, totals.pages) / 1024, 1)
+            rows.append(row)
+    finally:
+        for path, content in originals.items():
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+    return rows
+
+
+class NullNotifier(TelegramNotifier):
+    """Accepts every alert without sending it, so cycles never reach Telegram."""
+
+    def deliver(self, message, parse_mode='HTML', chat_id=None):
+        return True, None
+
+
+def bench_cycle(backend, locations, work_dir, cycles):
+    """Full ProductMonitor.check_all_locations cycles over every location."""
+    import main
+
+    Config.LOCATIONS = [location for location, _ in locations]
+    Config.SCRAPER_BACKEND = backend
+    # Every stub venue is open; leave the venue info requests out of the cycle times
+    Config.OPENING_HOURS = False
+    Config.DATABASE_PATH = os.path.join(work_dir, f"cycle-{backend}-{len(locations)}.db")
+
+    monitor = main.ProductMonitor()
+    monitor.alerts.notifier = NullNotifier()
+    monitor.alerts.digest_window = 0
+    latencies = []
+    try:
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            for _ in range(cycles):
+                cycle_started = time.perf_counter()
+                monitor.check_all_locations()
+                latencies.append(time.perf_counter() - cycle_started)
+            seconds = time.perf_counter() - started
+
+        correct = 0
+        for location, expected in locations:
+            last = monitor.db.get_last_check(location['name'], Config.PRODUCT_NAME)
+            correct += last is not None and last.is_available == expected
+    finally:
+        monitor.cleanup()
+    return summarize('cycle', backend, len(locations), seconds, latencies, len(locations) * cycles,
+                     f"{correct}/{len(locations)}", memory)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(compare, backend):
+    """Rows of the run to compare with: the 'latest' saved run of the backend, a file path, or 'none'."""
+    if compare == 'none':
+        return None
+    path = compare
+    if compare == 'latest':
+        runs = sorted(glob.glob(os.path.join(RESULTS_DIR, f'*-{backend}.json')))
+        if not runs:
+            return None
+        path = runs[-1]
+    with open(path, encoding='utf-8') as f:
+        run = json.load(f)
+    print(f"Comparing with {os.path.relpath(path, ROOT)} ({run['meta'].get('revision')}, {run['meta']['started']})")
+    return {(row['scenario'], row['backend'], row['locations']): row for row in run['results']}
+
+
+def change(new, old):
+    if not old or new is None:
+        return ''
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def print_row(row, previous):
+    old = (previous or {}).get((row['scenario'], row['backend'], row['locations']), {})
+    print(f"{row['scenario']:<9}{row['backend']:<9}{row['locations']:>6}"
+          f"{row['throughput']:>10.1f}{change(row['throughput'], old.get('throughput')):>7}"
+          f"{row['p50_ms']:>10.1f}{change(row['p50_ms'], old.get('p50_ms')):>7}"
+          f"{row['p99_ms']:>10.1f}{change(row['p99_ms'], old.get('p99_ms')):>7}"
+          f"{row['peak_rss_mb']:>9.1f}  {row['correct']}"
+          + (f"  {row['cache_hit_ratio']:.0%} cached, {row['kb_fetched_per_check']:.0f} KB/check"
+             if 'cache_hit_ratio' in row else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline scraper and monitor benchmark against the stub server')
+    parser.add_argument('--backend', choices=('api', 'browser'), default='api')
+    parser.add_argument('--locations', default='1,10,100,500', help='Comma-separated location counts')
+    parser.add_argument('--scenarios', default='product,brand,cycle',
+                        help='Comma-separated: product, brand, cycle, profile')
+    parser.add_argument('--concurrency', type=int, default=Config.MAX_CONCURRENT_CHECKS)
+    parser.add_argument('--cycles', type=int, default=3, help='Monitor cycles per location count')
+    parser.add_argument('--slow-every', type=int, default=10, help='Every n-th location loads slowly (0: none)')
+    parser.add_argument('--slow-delay', type=float, default=1.0, help='Extra response time of slow locations')
+    parser.add_argument('--compare', default='latest', help="Earlier results to compare with: 'latest', a path or 'none'")
+    parser.add_argument('--no-save', action='store_true', help='Do not save the results')
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.locations.split(',')]
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',')]
+    for browser_only in ('brand', 'profile'):
+        if args.backend != 'browser' and browser_only in scenarios:
+            print(f"Skipping the {browser_only} scenario, it needs --backend browser")
+            scenarios.remove(browser_only)
+
+    previous = load_previous(args.compare, args.backend)
+    started = datetime.now()
+    rows = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # A private copy of the fixtures, so the brand page can be generated
+        fixtures_dir = os.path.join(work_dir, 'fixtures')
+        shutil.copytree(FIXTURES_DIR, fixtures_dir)
+
+        # Keep the monitor's log file and console output out of the way
+        os.chdir(work_dir)
+        logging.disable(logging.WARNING)
+
+        with StubServer(fixtures_dir=fixtures_dir, slow_delay=args.slow_delay) as server:
+            api_url = f"{server.url}/v4/venues/slug/{{slug}}/menu"
+            Config.WOLT_API_URL = api_url
+
+            print(f"{'scenario':<9}{'backend':<9}{'locs':>6}{'checks/s':>10}{'':>7}{'p50 ms':>10}{'':>7}"
+                  f"{'p99 ms':>10}{'':>7}{'peak MB':>9}  correct")
+            for count in counts:
+                locations = make_locations(server.url, count, args.slow_every)
+                for scenario in scenarios:
+                    if scenario == 'product':
+                        row = bench_product(args.backend, locations, api_url, args.concurrency)
+                    elif scenario == 'brand':
+                        row = bench_brand(locations, server.url, fixtures_dir, args.cycles)
+                    elif scenario == 'cycle':
+                        row = bench_cycle(args.backend, locations, work_dir, args.cycles)
+                    elif scenario == 'profile':
+                        for row in bench_profile(locations, server.url, fixtures_dir, work_dir, args.concurrency):
+                            rows.append(row)
+                            print_row(row, previous)
+                        continue
+                    else:
+                        parser.error(f"Unknown scenario '{scenario}'")
+                    rows.append(row)
+                    print_row(row, previous)
+
+        os.chdir(ROOT)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}-{args.backend}.json")
+        meta = {
+            'started': started.isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args)
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': rows}, f, indent=2)
+        print(f"Saved results to {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark the start-up cost of one-shot runs (``python main.py --once``).
+
+Measures, each as the median wall time of fresh interpreter processes:
+
+- ``python``:       interpreter start-up alone, the floor for everything else
+- ``import main``:  importing the monitor with its heavy modules deferred
+- ``eager imports``: importing main plus the scraper, API and Telegram modules
+  it defers, i.e. what every run paid before
+- ``--once``:       a full one-shot run against the local stub server with the
+  API backend, from process start to exit, with settings unchanged since
+  the last run (no Telegram check or startup message) and nothing to send
+
+The run fails (exit status 1) when ``--once`` exceeds ``--budget-ms``. Uses
+the default location in config.py, which the stub server serves.
+
+    python benchmarks/bench_startup.py [--runs 10] [--budget-ms 1000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def median_ms(command, env, cwd, runs):
+    """Median wall time of ``command`` over ``runs`` fresh processes, in milliseconds."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, env=env, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def seed(db_path):
+    """Prepare the state of a monitor that has run before: settings, product state and opening hours known."""
+    import main
+    from config import Config
+    from database import Database
+
+    monitor_db = Database(db_path)
+    try:
+        monitor_db.set_setting('startup_fingerprint', main.startup_fingerprint())
+        monitor_db.set_setting('last_maintenance', time.time())
+        for venue in main.load_venues(Config.LOCATIONS, Config.PRODUCT_NAME):
+            for item in venue['items']:
+                # Matches the stub's menu, so the run has no alert to send
+                monitor_db.add_check(venue['name'], item['url'], item['name'], True, '8,99 €')
+    finally:
+        monitor_db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the start-up cost of one-shot runs')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=1000.0,
+                        help='Maximum median wall time of a --once run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        from stub_server import StubServer
+        with StubServer() as server:
+            env = dict(os.environ,
+                       PYTHONPATH=ROOT,
+                       TELEGRAM_BOT_TOKEN='bench-token',
+                       TELEGRAM_CHAT_ID='0',
+                       SCRAPER_BACKEND='api',
+                       WOLT_API_URL=f"{server.url}/v4/venues/slug/{{slug}}/menu",
+                       WOLT_VENUE_API_URL=f"{server.url}/v3/venues/slug/{{slug}}")
+            # The seeded settings must hash like the child processes' ones
+            os.environ.update(env)
+            os.chdir(work_dir)
+            seed(os.path.join(work_dir, 'product_tracker.db'))
+
+            once = [sys.executable, os.path.join(ROOT, 'main.py'), '--once']
+            # Warm-up: fetches the opening hours once, as a real first run would
+            subprocess.run(once, env=env, cwd=work_dir, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            rows = [
+                ('python', median_ms([sys.executable, '-c', 'pass'], env, work_dir, args.runs)),
+                ('import main', median_ms([sys.executable, '-c', 'import main'], env, work_dir, args.runs)),
+                ('eager imports', median_ms([sys.executable, '-c', 'import main, scraper, api_scraper, notifier'],
+                                            env, work_dir, args.runs)),
+                ('--once', median_ms(once, env, work_dir, args.runs)),
+            ]
+
+    for label, ms in rows:
+        print(f"{label:<16}{ms:9.1f} ms")
+    once_ms = rows[-1][1]
+    verdict = 'within' if once_ms <= args.budget_ms else 'OVER'
+    print(f"--once is {verdict} the {args.budget_ms:.0f} ms budget")
+    if once_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,17 +11,153 @@ class Config:
     # Telegram settings
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    # Bot API server (e.g. a local mock_telegram.py for benchmarks)
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+    # Alerts raised within this many seconds of each other are sent as one message
+    NOTIFICATION_DIGEST_SECONDS = float(os.getenv('NOTIFICATION_DIGEST_SECONDS', '10'))
+    # Alerts go to TELEGRAM_CHAT_ID and every subscribed chat (see subscribe.py),
+    # sent by NOTIFICATION_SENDERS threads within Telegram's flood limits: at
+    # most TELEGRAM_RATE_LIMIT messages per second overall, one per
+    # TELEGRAM_CHAT_INTERVAL_SECONDS per chat and TELEGRAM_GROUP_INTERVAL_SECONDS per group
+    NOTIFICATION_SENDERS = int(os.getenv('NOTIFICATION_SENDERS', '8'))
+    TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', '30'))
+    TELEGRAM_CHAT_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_CHAT_INTERVAL_SECONDS', '1'))
+    TELEGRAM_GROUP_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_GROUP_INTERVAL_SECONDS', '3'))
 
     # Monitoring settings
     CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', '5'))
+    # Venues that changed in the last HOT_PERIOD_MINUTES are polled every
+    # CHECK_INTERVAL_HOT_MINUTES; ones unchanged for STALE_AFTER_HOURS (or
+    # never seen changing) every CHECK_INTERVAL_STALE_MINUTES
+    CHECK_INTERVAL_HOT_MINUTES = float(os.getenv('CHECK_INTERVAL_HOT_MINUTES', '1'))
+    HOT_PERIOD_MINUTES = float(os.getenv('HOT_PERIOD_MINUTES', '30'))
+    CHECK_INTERVAL_STALE_MINUTES = float(os.getenv('CHECK_INTERVAL_STALE_MINUTES', '10'))
+    STALE_AFTER_HOURS = float(os.getenv('STALE_AFTER_HOURS', '24'))
+    # Venues are also polled every CHECK_INTERVAL_HOT_MINUTES from
+    # RESTOCK_LEAD_MINUTES before an hour of the week in which they have
+    # restocked at least RESTOCK_MIN_EVENTS times (0 disables)
+    RESTOCK_MIN_EVENTS = int(os.getenv('RESTOCK_MIN_EVENTS', '3'))
+    RESTOCK_LEAD_MINUTES = float(os.getenv('RESTOCK_LEAD_MINUTES', '15'))
+    # Failing venues: after a failed check a venue waits FAILURE_BACKOFF_MINUTES,
+    # doubled per further failure up to FAILURE_BACKOFF_MAX_MINUTES. After
+    # CIRCUIT_BREAKER_FAILURES failures in a row (0 disables) it is only probed
+    # every CIRCUIT_BREAKER_PROBE_MINUTES until a check succeeds
+    FAILURE_BACKOFF_MINUTES = float(os.getenv('FAILURE_BACKOFF_MINUTES', '5'))
+    FAILURE_BACKOFF_MAX_MINUTES = float(os.getenv('FAILURE_BACKOFF_MAX_MINUTES', '60'))
+    CIRCUIT_BREAKER_FAILURES = int(os.getenv('CIRCUIT_BREAKER_FAILURES', '5'))
+    CIRCUIT_BREAKER_PROBE_MINUTES = float(os.getenv('CIRCUIT_BREAKER_PROBE_MINUTES', '60'))
+
+    # Scheduler: random spread of first checks (seconds), jitter of later
+    # checks (fraction of the interval) and what to do with missed checks
+    # ('skip', 'run_once' or 'catch_up')
+    SCHEDULE_START_JITTER_SECONDS = float(os.getenv('SCHEDULE_START_JITTER_SECONDS', '30'))
+    SCHEDULE_JITTER = float(os.getenv('SCHEDULE_JITTER', '0.1'))
+    MISSED_RUN_POLICY = os.getenv('MISSED_RUN_POLICY', 'run_once')
+
+    # Concurrency settings
+    # How many product pages may be loading at the same time
+    MAX_CONCURRENT_CHECKS = int(os.getenv('MAX_CONCURRENT_CHECKS', '4'))
+    # Politeness budget: open pages per host and minimum delay between page loads on one host
+    MAX_CHECKS_PER_HOST = int(os.getenv('MAX_CHECKS_PER_HOST', '4'))
+    HOST_DELAY_SECONDS = float(os.getenv('HOST_DELAY_SECONDS', '0.5'))
+    # Sharded mode: scrape in this many worker processes, each with its own
+    # browser (0 or 1 scrapes in the monitor process). Limits above are per shard
+    SHARDS = int(os.getenv('SHARDS', '0'))
+    SHARD_MAX_RESTARTS = int(os.getenv('SHARD_MAX_RESTARTS', '3'))
+    SHARD_VENUE_TIMEOUT_SECONDS = float(os.getenv('SHARD_VENUE_TIMEOUT_SECONDS', '120'))
+
+    # Scraper backend: 'browser' renders the page with Playwright, 'api' asks the
+    # venue menu JSON endpoint, 'auto' uses the API and falls back to the browser.
+    # A location can override it with its own 'backend' key.
+    SCRAPER_BACKEND = os.getenv('SCRAPER_BACKEND', 'auto')
+    WOLT_API_URL = os.getenv('WOLT_API_URL', 'https://restaurant-api.wolt.com/v4/venues/slug/{slug}/menu')
+    # Venue info endpoint, read for each venue's opening hours
+    WOLT_VENUE_API_URL = os.getenv('WOLT_VENUE_API_URL', 'https://restaurant-api.wolt.com/v3/venues/slug/{slug}')
+
+    # Opening hours: skip checks while a venue is closed, checking it only every
+    # CLOSED_CHECK_INTERVAL_MINUTES (0: not at all until it opens), and poll at
+    # the hot interval from OPENING_RAMP_MINUTES before until that long after
+    # opening. Hours are refreshed every OPENING_HOURS_REFRESH_HOURS
+    OPENING_HOURS = os.getenv('OPENING_HOURS', 'true').lower() == 'true'
+    CLOSED_CHECK_INTERVAL_MINUTES = float(os.getenv('CLOSED_CHECK_INTERVAL_MINUTES', '60'))
+    OPENING_RAMP_MINUTES = float(os.getenv('OPENING_RAMP_MINUTES', '10'))
+    OPENING_HOURS_REFRESH_HOURS = float(os.getenv('OPENING_HOURS_REFRESH_HOURS', '24'))
+
+    # Resource filtering: abort requests for these resource types and domains
+    # while scraping; if ALLOWED_DOMAINS is set only those domains may load
+    BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', 'true').lower() == 'true'
+    BLOCKED_RESOURCE_TYPES = os.getenv('BLOCKED_RESOURCE_TYPES', 'image,media,font')
+    BLOCKED_DOMAINS = os.getenv('BLOCKED_DOMAINS', '')
+    ALLOWED_DOMAINS = os.getenv('ALLOWED_DOMAINS', '')
+
+    # Extraction rules (comma-separated; empty uses the built-in defaults)
+    # Text that marks a product as sold out
+    OUT_OF_STOCK_INDICATORS = os.getenv('OUT_OF_STOCK_INDICATORS', '')
+    # CSS selectors of the element holding the product on a product page
+    PRODUCT_CONTAINER_SELECTORS = os.getenv('PRODUCT_CONTAINER_SELECTORS', '')
+
+    # Browser lifecycle
+    # The browser is kept running between cycles and restarted after this many
+    # pages or once its memory grows past the RSS limit (0 disables a limit)
+    BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', '500'))
+    BROWSER_MAX_RSS_MB = int(os.getenv('BROWSER_MAX_RSS_MB', '1024'))
+    # Persistent browser profile: keep the HTTP cache, service worker storage
+    # and cookies in this directory across browser starts (empty: a fresh
+    # profile every start), its caches capped at BROWSER_PROFILE_MAX_MB
+    BROWSER_PROFILE_DIR = os.getenv('BROWSER_PROFILE_DIR', '')
+    BROWSER_PROFILE_MAX_MB = float(os.getenv('BROWSER_PROFILE_MAX_MB', '256'))
 
     # Product settings
     PRODUCT_NAME = os.getenv('PRODUCT_NAME', 'Divlji crveni losos fileti s kožom MSC 150g')
 
+    # Skip parsing, storing and notifying when a page is unchanged since its
+    # last check (304 Not Modified or identical content / product fragment)
+    SKIP_UNCHANGED_PAGES = os.getenv('SKIP_UNCHANGED_PAGES', 'true').lower() == 'true'
+
+    # Metrics: Prometheus-style endpoint at http://METRICS_HOST:METRICS_PORT/metrics
+    # (0 disables) and an optional JSON-lines log of every observation
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_JSON_LOG = os.getenv('METRICS_JSON_LOG', '')
+
+    # Logging: the log file is written on a background thread and rotated at
+    # LOG_MAX_MB (0: never) or, if set, on LOG_ROTATE_WHEN ('midnight', 'H', ...),
+    # keeping LOG_BACKUP_COUNT rotated files, gzipped with LOG_COMPRESS.
+    # LOG_FORMAT 'compact' writes JSON lines; LOG_SAMPLE_EVERY=n keeps one in n
+    # repeated "not available" lines per item (0 or 1 keeps all)
+    LOG_FILE = os.getenv('LOG_FILE', 'product_monitor.log')
+    LOG_MAX_MB = float(os.getenv('LOG_MAX_MB', '10'))
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_COMPRESS = os.getenv('LOG_COMPRESS', 'true').lower() == 'true'
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '0'))
+
     # Database
     DATABASE_PATH = 'product_tracker.db'
+    # Only store a check when availability or price changed (a heartbeat
+    # records when each product was last seen either way)
+    STORE_CHANGES_ONLY = os.getenv('STORE_CHANGES_ONLY', 'false').lower() == 'true'
+    # History retention: raw checks are kept this many days, then merged into
+    # hourly summaries, which become daily summaries after HISTORY_HOURLY_DAYS
+    # (0 keeps a level forever). Retention and VACUUM run every
+    # MAINTENANCE_INTERVAL_HOURS (0 disables)
+    HISTORY_RAW_DAYS = int(os.getenv('HISTORY_RAW_DAYS', '30'))
+    HISTORY_HOURLY_DAYS = int(os.getenv('HISTORY_HOURLY_DAYS', '365'))
+    MAINTENANCE_INTERVAL_HOURS = float(os.getenv('MAINTENANCE_INTERVAL_HOURS', '24'))
 
     # Wolt locations to monitor
+    # Each entry is either a product URL (tracking PRODUCT_NAME) or a venue URL
+    # with several items, which is loaded only once per cycle:
+    #     {
+    #         'name': 'Fisherija Maksimir',
+    #         'url': 'https://wolt.com/hr/hrv/zagreb/venue/fisherija-maksimir',
+    #         'items': [
+    #             {'id': '08c0c9d79b5528337e4ce2b1', 'name': 'Divlji crveni losos fileti s kožom MSC 150g'},
+    #             {'name': 'Fileti bakalara 400g'},
+    #         ]
+    #     },
     LOCATIONS = [
         {
             'name': 'Fisherija Maksimir',
@@ -30,6 +166,28 @@ class Config:
         # We'll add more locations after we can see them all
     ]
 
+    # Brands whose venues are all tracked automatically, in addition to
+    # LOCATIONS. Their brand pages are scraped and the venues found stored in
+    # the database, refreshed every DISCOVERY_REFRESH_HOURS. 'items' are
+    # tracked at every venue of the brand; 'path' (optional) is the item part
+    # of its product URL, used when the item is not shown on the venue page:
+    #     {
+    #         'brand_url': 'https://wolt.com/hr/hrv/zagreb/brand/fisherija',
+    #         'items': [
+    #             {'id': '08c0c9d79b5528337e4ce2b1', 'name': 'Divlji crveni losos fileti s kožom MSC 150g',
+    #              'path': 'divlji-crveni-losos-fileti-s-kozom-msc-150g-itemid-08c0c9d79b5528337e4ce2b1'},
+    #         ]
+    #     },
+    DISCOVERY = []
+    DISCOVERY_REFRESH_HOURS = float(os.getenv('DISCOVERY_REFRESH_HOURS', '24'))
+
+    SCRAPER_BACKENDS = ('browser', 'api', 'auto')
+
+    @staticmethod
+    def split_list(value):
+        """Split a comma-separated setting into a list of non-empty entries."""
+        return [part.strip() for part in value.split(',') if part.strip()]
+
     @classmethod
     def validate(cls):
         """Validate that required configuration is present."""
@@ -37,4 +195,18 @@ class Config:
             raise ValueError("TELEGRAM_BOT_TOKEN is required. Please set it in .env file")
         if not cls.TELEGRAM_CHAT_ID:
             raise ValueError("TELEGRAM_CHAT_ID is required. Please set it in .env file")
+        if cls.LOG_FORMAT not in ('text', 'compact'):
+            raise ValueError(f"Unknown LOG_FORMAT '{cls.LOG_FORMAT}'")
+        if cls.MISSED_RUN_POLICY not in ('skip', 'run_once', 'catch_up'):
+            raise ValueError(f"Unknown MISSED_RUN_POLICY '{cls.MISSED_RUN_POLICY}'")
+        for location in cls.LOCATIONS:
+            backend = location.get('backend', cls.SCRAPER_BACKEND)
+            if backend not in cls.SCRAPER_BACKENDS:
+                raise ValueError(f"Unknown scraper backend '{backend}' for {location['name']}")
+        for brand in cls.DISCOVERY:
+            backend = brand.get('backend') or cls.SCRAPER_BACKEND
+            if backend not in cls.SCRAPER_BACKENDS:
+                raise ValueError(f"Unknown scraper backend '{backend}' for {brand['brand_url']}")
+            if not brand.get('items'):
+                raise ValueError(f"Discovered brand {brand['brand_url']} needs 'items' to track")
         return True
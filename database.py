@@ -1,11 +1,217 @@
 """Database operations for product tracking using built-in sqlite3."""
+import logging
+import os
+import re
 import sqlite3
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from calendar import timegm
+from datetime import datetime, timezone
 from config import Config
+from metrics import PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Schema migrations, applied in order to bring a database file up to date.
+# The version reached is stored in SQLite's user_version pragma; append new
+# steps at the end and never edit ones that have shipped.
+MIGRATIONS = [
+    (1, 'create product_checks', '''
+        CREATE TABLE IF NOT EXISTS product_checks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            location_name TEXT NOT NULL,
+            location_url TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            is_available INTEGER NOT NULL,
+            price TEXT,
+            checked_at TEXT NOT NULL
+        )
+    '''),
+    (2, 'index checks by location and time', '''
+        CREATE INDEX IF NOT EXISTS idx_product_checks_location_time
+        ON product_checks (location_name, checked_at)
+    '''),
+    (3, 'latest state and heartbeat per product', '''
+        CREATE TABLE IF NOT EXISTS check_state (
+            location_name TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            check_id INTEGER NOT NULL,
+            location_url TEXT NOT NULL,
+            is_available INTEGER NOT NULL,
+            price TEXT,
+            checked_at TEXT NOT NULL,
+            last_seen_at TEXT NOT NULL,
+            PRIMARY KEY (location_name, product_name)
+        );
+        INSERT OR REPLACE INTO check_state
+        SELECT location_name, product_name, id, location_url, is_available, price, checked_at, checked_at
+        FROM product_checks
+        WHERE id IN (SELECT MAX(id) FROM product_checks GROUP BY location_name, product_name);
+    '''),
+    (4, 'compact history with location/product tables and rollups', '''
+        CREATE TABLE locations (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE series (
+            id INTEGER PRIMARY KEY,
+            location_id INTEGER NOT NULL REFERENCES locations (id),
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            url TEXT NOT NULL,
+            UNIQUE (location_id, product_id)
+        );
+        CREATE TABLE checks (
+            id INTEGER PRIMARY KEY,
+            series_id INTEGER NOT NULL REFERENCES series (id),
+            checked_at INTEGER NOT NULL,
+            is_available INTEGER NOT NULL,
+            price_cents INTEGER
+        );
+        CREATE INDEX idx_checks_series_time ON checks (series_id, checked_at);
+        CREATE TABLE availability_rollups (
+            series_id INTEGER NOT NULL REFERENCES series (id),
+            period INTEGER NOT NULL,
+            period_start INTEGER NOT NULL,
+            checks INTEGER NOT NULL,
+            available_checks INTEGER NOT NULL,
+            min_price_cents INTEGER,
+            max_price_cents INTEGER,
+            PRIMARY KEY (series_id, period, period_start)
+        ) WITHOUT ROWID;
+
+        INSERT INTO locations (name) SELECT DISTINCT location_name FROM product_checks;
+        INSERT INTO products (name) SELECT DISTINCT product_name FROM product_checks;
+        INSERT INTO series (location_id, product_id, url)
+        SELECT l.id, p.id, pc.location_url
+        FROM product_checks pc
+        JOIN locations l ON l.name = pc.location_name
+        JOIN products p ON p.name = pc.product_name
+        WHERE pc.id IN (SELECT MAX(id) FROM product_checks GROUP BY location_name, product_name);
+        INSERT INTO checks (id, series_id, checked_at, is_available, price_cents)
+        SELECT pc.id, s.id, CAST(strftime('%s', pc.checked_at) AS INTEGER), pc.is_available, price_to_cents(pc.price)
+        FROM product_checks pc
+        JOIN locations l ON l.name = pc.location_name
+        JOIN products p ON p.name = pc.product_name
+        JOIN series s ON s.location_id = l.id AND s.product_id = p.id;
+        DROP TABLE product_checks;
+
+        -- The old row shape, for reading the history by hand
+        CREATE VIEW product_checks AS
+        SELECT c.id, l.name AS location_name, s.url AS location_url, p.name AS product_name, c.is_available,
+               CASE WHEN c.price_cents IS NULL THEN NULL
+                    ELSE printf('%d,%02d €', c.price_cents / 100, c.price_cents % 100) END AS price,
+               strftime('%Y-%m-%dT%H:%M:%S', c.checked_at, 'unixepoch') AS checked_at
+        FROM checks c
+        JOIN series s ON s.id = c.series_id
+        JOIN locations l ON l.id = s.location_id
+        JOIN products p ON p.id = s.product_id;
+    '''),
+    (5, 'discovered venues per brand', '''
+        CREATE TABLE brands (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            refreshed_at INTEGER
+        );
+        CREATE TABLE venues (
+            id INTEGER PRIMARY KEY,
+            brand_id INTEGER NOT NULL REFERENCES brands (id),
+            url TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            first_seen_at INTEGER NOT NULL,
+            last_seen_at INTEGER NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX idx_venues_brand ON venues (brand_id);
+    '''),
+    (6, 'venue opening hours', '''
+        CREATE TABLE venue_schedules (
+            venue_url TEXT PRIMARY KEY,
+            timezone TEXT,
+            fetched_at INTEGER NOT NULL
+        );
+        CREATE TABLE opening_hours (
+            venue_url TEXT NOT NULL REFERENCES venue_schedules (venue_url),
+            weekday INTEGER NOT NULL,
+            opens_at INTEGER NOT NULL,
+            closes_at INTEGER NOT NULL,
+            PRIMARY KEY (venue_url, weekday, opens_at)
+        ) WITHOUT ROWID;
+    '''),
+    (7, 'monitor settings', '''
+        CREATE TABLE settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    '''),
+    (8, 'alert subscriptions', '''
+        CREATE TABLE subscribers (
+            id INTEGER PRIMARY KEY,
+            chat_id TEXT NOT NULL UNIQUE,
+            name TEXT,
+            created_at INTEGER NOT NULL
+        );
+        -- Keyed by what is watched, so the subscribers of an item are one
+        -- index range; '*' stands for every venue or every item
+        CREATE TABLE subscriptions (
+            venue_url TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            subscriber_id INTEGER NOT NULL REFERENCES subscribers (id),
+            created_at INTEGER NOT NULL,
+            PRIMARY KEY (venue_url, product_name, subscriber_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX idx_subscriptions_subscriber ON subscriptions (subscriber_id);
+    '''),
+]
+
+# Matches every venue or every item in a subscription
+ANY = '*'
+
+_PRICE_RE = re.compile(r'(\d+)(?:[.,](\d{1,2}))?')
+
+
+def price_to_cents(price):
+    """Parse a displayed price ('12,99 €', '€12.99', '€ 5') into integer cents."""
+    if not price:
+        return None
+    match = _PRICE_RE.search(price)
+    if not match:
+        return None
+    euros, cents = match.groups()
+    return int(euros) * 100 + int((cents or '0').ljust(2, '0'))
+
+
+def format_price(cents):
+    """Format an integer amount in cents the way Wolt shows it (e.g. '12,99 €')."""
+    if cents is None:
+        return None
+    return f"{cents / 100:.2f} €".replace('.', ',')
+
+
+def _timestamp(moment):
+    """Unix timestamp of a naive UTC datetime."""
+    return timegm(moment.utctimetuple())
+
+
+def _iso(timestamp):
+    """UTC ISO format of a Unix timestamp, as used for checked_at on ProductCheck."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
 
 
 class ProductCheck:
-    """Simple data class for product checks."""
+    """Simple data class for product checks.
+
+    Uses __slots__ instead of a per-instance __dict__, so millions of
+    checks streamed from iter_checks() stay cheap.
+    """
+
+    __slots__ = ('id', 'location_name', 'location_url', 'product_name', 'is_available', 'price', 'checked_at')
 
     def __init__(self, id, location_name, location_url, product_name, is_available, price, checked_at):
         self.id = id
@@ -20,72 +226,90 @@ class ProductCheck:
         return f"<ProductCheck(location='{self.location_name}', available={self.is_available}, time={self.checked_at})>"
 
 
+# Checks with their location and product names, in the ProductCheck row shape
+_HISTORY_SELECT = '''
+    SELECT c.id, l.name AS location_name, s.url AS location_url, p.name AS product_name,
+           c.is_available, c.price_cents, c.checked_at
+    FROM checks c
+    JOIN series s ON s.id = c.series_id
+    JOIN locations l ON l.id = s.location_id
+    JOIN products p ON p.id = s.product_id
+'''
+
+
+def _check_from_row(row):
+    return ProductCheck(
+        row['id'],
+        row['location_name'],
+        row['location_url'],
+        row['product_name'],
+        bool(row['is_available']),
+        format_price(row['price_cents']),
+        _iso(row['checked_at'])
+    )
+
+
 class Database:
-    """Database manager for product tracking using sqlite3."""
+    """Database manager for product tracking using sqlite3.
+
+    History is stored compactly: one row per check in ``checks`` holding a
+    series id (a location/product pair), a Unix timestamp, the availability
+    flag and the price in cents. apply_retention() rolls checks older than
+    ``HISTORY_RAW_DAYS`` up into hourly summaries and those older than
+    ``HISTORY_HOURLY_DAYS`` into daily ones; compact() reclaims the space.
+
+    The latest check of every product is cached in memory (persisted in the
+    check_state table), so the monitor's transition checks never query the
+    history. With ``changes_only`` a history row is only written when a
+    product's availability or price changes; every check still updates the
+    product's ``last_seen_at`` heartbeat in check_state.
+    """
 
-    def __init__(self):
-        self.db_path = Config.DATABASE_PATH
+    def __init__(self, db_path=None, changes_only=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.changes_only = Config.STORE_CHANGES_ONLY if changes_only is None else changes_only
         self.conn = None
+        self._batch_depth = 0
+        # Callbacks waiting for the open batch to commit (see after_commit)
+        self._after_commit = []
+        # (location_name, product_name) -> (latest stored ProductCheck, last_seen_at)
+        self._state = {}
+        # (location_name, product_name) -> (series id, url)
+        self._series = {}
         self._connect()
-        self._create_tables()
+        self._migrate()
+        self._load_state()
 
     def _connect(self):
         """Connect to the database."""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets readers (and the notification outbox) work alongside the
+        # writer, and NORMAL sync is durable enough in WAL mode
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Used by migration 4 to convert stored price strings
+        self.conn.create_function('price_to_cents', 1, price_to_cents, deterministic=True)
 
-    def _create_tables(self):
-        """Create database tables if they don't exist."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS product_checks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                location_name TEXT NOT NULL,
-                location_url TEXT NOT NULL,
-                product_name TEXT NOT NULL,
-                is_available INTEGER NOT NULL,
-                price TEXT,
-                checked_at TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+    def schema_version(self):
+        """Return the schema version of the database file."""
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
 
-    def add_check(self, location_name, location_url, product_name, is_available, price=None):
-        """Add a new product check to the database."""
-        cursor = self.conn.cursor()
-        checked_at = datetime.utcnow().isoformat()
-
-        cursor.execute('''
-            INSERT INTO product_checks (location_name, location_url, product_name, is_available, price, checked_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (location_name, location_url, product_name, 1 if is_available else 0, price, checked_at))
-
-        self.conn.commit()
-
-        return ProductCheck(
-            cursor.lastrowid,
-            location_name,
-            location_url,
-            product_name,
-            is_available,
-            price,
-            checked_at
-        )
+    def _migrate(self):
+        """Apply the schema migrations this database file has not seen yet."""
+        version = self.schema_version()
+        for target, description, sql in MIGRATIONS:
+            if target <= version:
+                continue
+            logger.info(f"Migrating database to version {target}: {description}")
+            self.conn.executescript(f'BEGIN; {sql}; PRAGMA user_version = {target}; COMMIT;')
 
-    def get_last_check(self, location_name):
-        """Get the most recent check for a location."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM product_checks
-            WHERE location_name = ?
-            ORDER BY checked_at DESC
-            LIMIT 1
-        ''', (location_name,))
-
-        row = cursor.fetchone()
-        if row:
-            return ProductCheck(
-                row['id'],
+    def _load_state(self):
+        """Warm the in-memory state and series caches from check_state and series."""
+        self._state = {}
+        for row in self.conn.execute('SELECT * FROM check_state'):
+            check = ProductCheck(
+                row['check_id'],
                 row['location_name'],
                 row['location_url'],
                 row['product_name'],
@@ -93,30 +317,574 @@ class Database:
                 row['price'],
                 row['checked_at']
             )
-        return None
+            self._state[(check.location_name, check.product_name)] = (check, row['last_seen_at'])
+
+        self._series = {}
+        for row in self.conn.execute('''
+            SELECT s.id, s.url, l.name AS location_name, p.name AS product_name
+            FROM series s
+            JOIN locations l ON l.id = s.location_id
+            JOIN products p ON p.id = s.product_id
+        '''):
+            self._series[(row['location_name'], row['product_name'])] = (row['id'], row['url'])
+        logger.info(f"Loaded last state of {len(self._state)} product(s)")
+
+    @contextmanager
+    def batch(self):
+        """
+        Group writes into one transaction, committed when the block exits.
+
+        Used once per check cycle so a cycle costs a single commit instead
+        of one per check. Nested batches join the outermost one.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except Exception:
+            if self._batch_depth == 1:
+                self.conn.rollback()
+                self._after_commit.clear()
+                # The caches may hold writes that were just rolled back
+                self._load_state()
+            raise
+        else:
+            if self._batch_depth == 1:
+                with PHASE_SECONDS.time(phase='db_commit'):
+                    self.conn.commit()
+                self._run_after_commit()
+        finally:
+            self._batch_depth -= 1
+
+    def after_commit(self, callback):
+        """
+        Call ``callback()`` once the open batch has committed, or right away
+        outside a batch; dropped if the batch is rolled back.
+
+        For writes on other connections (e.g. the alert outbox) that would
+        otherwise wait on the batch's write lock until the busy timeout.
+        """
+        self._after_commit.append(callback)
+        if not self._batch_depth:
+            self._run_after_commit()
+
+    def _run_after_commit(self):
+        while self._after_commit:
+            callback = self._after_commit.pop(0)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error after commit: {e}")
+
+    def _commit(self):
+        if not self._batch_depth:
+            self.conn.commit()
+
+    def _series_id(self, location_name, location_url, product_name):
+        """Id of the location/product series, created (or its URL updated) as needed."""
+        key = (location_name, product_name)
+        cached = self._series.get(key)
+        if cached and cached[1] == location_url:
+            return cached[0]
+
+        if cached:
+            self.conn.execute('UPDATE series SET url = ? WHERE id = ?', (location_url, cached[0]))
+            series_id = cached[0]
+        else:
+            self.conn.execute('INSERT OR IGNORE INTO locations (name) VALUES (?)', (location_name,))
+            self.conn.execute('INSERT OR IGNORE INTO products (name) VALUES (?)', (product_name,))
+            series_id = self.conn.execute('''
+                INSERT INTO series (location_id, product_id, url)
+                SELECT l.id, p.id, ? FROM locations l, products p
+                WHERE l.name = ? AND p.name = ?
+            ''', (location_url, location_name, product_name)).lastrowid
+        self._series[key] = (series_id, location_url)
+        return series_id
+
+    def add_check(self, location_name, location_url, product_name, is_available, price=None):
+        """
+        Record a product check.
+
+        Returns:
+            ProductCheck: The stored check; in changes-only mode an unchanged
+            check returns the earlier check it matched
+        """
+        started = time.perf_counter()
+        now = int(time.time())
+        checked_at = _iso(now)
+        key = (location_name, product_name)
+        last = self._state.get(key, (None, None))[0]
+        changed = last is None or last.is_available != bool(is_available) or last.price != price
+
+        if changed or not self.changes_only:
+            series_id = self._series_id(location_name, location_url, product_name)
+            cursor = self.conn.execute('''
+                INSERT INTO checks (series_id, checked_at, is_available, price_cents)
+                VALUES (?, ?, ?, ?)
+            ''', (series_id, now, 1 if is_available else 0, price_to_cents(price)))
+            check = ProductCheck(
+                cursor.lastrowid,
+                location_name,
+                location_url,
+                product_name,
+                bool(is_available),
+                price,
+                checked_at
+            )
+        else:
+            check = last
+
+        self.conn.execute('''
+            INSERT OR REPLACE INTO check_state
+                (location_name, product_name, check_id, location_url, is_available, price, checked_at, last_seen_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (location_name, product_name, check.id, check.location_url, 1 if check.is_available else 0,
+              check.price, check.checked_at, checked_at))
+        self._state[key] = (check, checked_at)
+
+        self._commit()
+        PHASE_SECONDS.observe(time.perf_counter() - started, phase='db_write')
+        return check
+
+    def get_last_check(self, location_name, product_name=None):
+        """Get the most recent check for a location, optionally for one product (served from the cache)."""
+        if product_name is not None:
+            return self._state.get((location_name, product_name), (None, None))[0]
+
+        checks = [check for (location, _), (check, _) in self._state.items() if location == location_name]
+        return max(checks, key=lambda check: check.checked_at, default=None)
+
+    def get_last_seen(self, location_name, product_name):
+        """Get the time (UTC ISO format) a product was last checked, stored or not."""
+        return self._state.get((location_name, product_name), (None, None))[1]
+
+    def query_last_check(self, location_name, product_name=None):
+        """Get the most recent stored check straight from the history table, bypassing the cache."""
+        # The newest check of each of the location's series is one index
+        # lookup; only those are compared
+        params = [location_name]
+        product_filter = ''
+        if product_name is not None:
+            product_filter = 'AND p.name = ?'
+            params.append(product_name)
+
+        row = self.conn.execute(f'''
+            {_HISTORY_SELECT}
+            WHERE l.name = ? {product_filter}
+              AND c.id = (SELECT id FROM checks WHERE series_id = s.id ORDER BY checked_at DESC, id DESC LIMIT 1)
+            ORDER BY c.checked_at DESC, c.id DESC
+            LIMIT 1
+        ''', params).fetchone()
+        return _check_from_row(row) if row else None
 
     def get_availability_history(self, location_name, limit=10):
         """Get recent availability history for a location."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM product_checks
-            WHERE location_name = ?
-            ORDER BY checked_at DESC
+        cursor = self.conn.execute(f'''
+            {_HISTORY_SELECT}
+            WHERE l.name = ?
+            ORDER BY c.checked_at DESC, c.id DESC
             LIMIT ?
         ''', (location_name, limit))
+        return [_check_from_row(row) for row in cursor]
 
-        results = []
-        for row in cursor.fetchall():
-            results.append(ProductCheck(
-                row['id'],
-                row['location_name'],
-                row['location_url'],
-                row['product_name'],
-                bool(row['is_available']),
-                row['price'],
-                row['checked_at']
-            ))
-        return results
+    def iter_checks(self, location_name=None, product_name=None, since=None, until=None, chunk_size=1000):
+        """
+        Stream stored checks, oldest first, without loading them all into memory.
+
+        Rows are fetched ``chunk_size`` at a time from a single cursor, so
+        memory use stays flat however long the history is.
+
+        Args:
+            location_name: Only checks of this location
+            product_name: Only checks of this product
+            since: Only checks at or after this datetime (UTC)
+            until: Only checks before this datetime (UTC)
+            chunk_size: Rows fetched from SQLite per round trip
+
+        Yields:
+            ProductCheck
+        """
+        conditions = []
+        params = []
+        if location_name is not None:
+            conditions.append('l.name = ?')
+            params.append(location_name)
+        if product_name is not None:
+            conditions.append('p.name = ?')
+            params.append(product_name)
+        if since is not None:
+            conditions.append('c.checked_at >= ?')
+            params.append(_timestamp(since))
+        if until is not None:
+            conditions.append('c.checked_at < ?')
+            params.append(_timestamp(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        cursor = self.conn.execute(f'''
+            {_HISTORY_SELECT}
+            {where}
+            ORDER BY c.checked_at, c.id
+        ''', params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _check_from_row(row)
+        finally:
+            cursor.close()
+
+    def get_rollups(self, location_name, product_name, period=HOUR):
+        """
+        Get the hourly (``period=HOUR``) or daily (``period=DAY``) summaries of a product.
+
+        Returns:
+            list: dicts with period_start (UTC ISO format), checks,
+            available_checks, min_price and max_price, oldest first
+        """
+        cursor = self.conn.execute('''
+            SELECT r.* FROM availability_rollups r
+            JOIN series s ON s.id = r.series_id
+            JOIN locations l ON l.id = s.location_id
+            JOIN products p ON p.id = s.product_id
+            WHERE l.name = ? AND p.name = ? AND r.period = ?
+            ORDER BY r.period_start
+        ''', (location_name, product_name, period))
+        return [{
+            'period_start': _iso(row['period_start']),
+            'checks': row['checks'],
+            'available_checks': row['available_checks'],
+            'min_price': format_price(row['min_price_cents']),
+            'max_price': format_price(row['max_price_cents'])
+        } for row in cursor.fetchall()]
+
+    def _roll_up(self, source, period, cutoff):
+        """Merge rows older than ``cutoff`` from ``source`` into ``period`` summaries; returns the source rows read."""
+        if source == 'checks':
+            select = f'''
+                SELECT series_id, {period}, checked_at - checked_at % {period},
+                       COUNT(*), SUM(is_available), MIN(price_cents), MAX(price_cents)
+                FROM checks WHERE checked_at < ?
+                GROUP BY 1, 3
+            '''
+            delete = 'DELETE FROM checks WHERE checked_at < ?'
+        else:
+            select = f'''
+                SELECT series_id, {period}, period_start - period_start % {period},
+                       SUM(checks), SUM(available_checks), MIN(min_price_cents), MAX(max_price_cents)
+                FROM availability_rollups WHERE period = {HOUR} AND period_start < ?
+                GROUP BY 1, 3
+            '''
+            delete = f'DELETE FROM availability_rollups WHERE period = {HOUR} AND period_start < ?'
+
+        self.conn.execute(f'''
+            INSERT INTO availability_rollups
+                (series_id, period, period_start, checks, available_checks, min_price_cents, max_price_cents)
+            {select}
+            ON CONFLICT (series_id, period, period_start) DO UPDATE SET
+                checks = checks + excluded.checks,
+                available_checks = available_checks + excluded.available_checks,
+                min_price_cents = MIN(COALESCE(min_price_cents, excluded.min_price_cents),
+                                      COALESCE(excluded.min_price_cents, min_price_cents)),
+                max_price_cents = MAX(COALESCE(max_price_cents, excluded.max_price_cents),
+                                      COALESCE(excluded.max_price_cents, max_price_cents))
+        ''', (cutoff,))
+        return self.conn.execute(delete, (cutoff,)).rowcount
+
+    def apply_retention(self, raw_days=None, hourly_days=None, now=None):
+        """
+        Downsample old history.
+
+        Checks older than ``raw_days`` are merged into hourly summaries and
+        hourly summaries older than ``hourly_days`` into daily ones; the
+        merged rows are deleted. Cutoffs are aligned to whole hours/days so
+        a summary never covers part of a period. 0 keeps that level forever.
+        Raw checks are kept in changes-only mode: their rows are not evenly
+        spaced, so counts would not weigh states by time, and deleting them
+        would lose each series' last known state.
+
+        Args:
+            raw_days: Days of raw checks to keep (default: Config.HISTORY_RAW_DAYS)
+            hourly_days: Days of hourly summaries to keep (default: Config.HISTORY_HOURLY_DAYS)
+            now: Unix timestamp to measure from (default: the current time)
+
+        Returns:
+            dict: {'checks': rows rolled up, 'hourly': hourly rows rolled up}
+        """
+        raw_days = Config.HISTORY_RAW_DAYS if raw_days is None else raw_days
+        hourly_days = Config.HISTORY_HOURLY_DAYS if hourly_days is None else hourly_days
+        now = int(time.time()) if now is None else int(now)
+
+        rolled = {'checks': 0, 'hourly': 0}
+        with self.batch():
+            if raw_days and not self.changes_only:
+                cutoff = now - raw_days * DAY
+                rolled['checks'] = self._roll_up('checks', HOUR, cutoff - cutoff % HOUR)
+            if hourly_days:
+                cutoff = now - hourly_days * DAY
+                rolled['hourly'] = self._roll_up('availability_rollups', DAY, cutoff - cutoff % DAY)
+
+        logger.info(f"Retention: rolled up {rolled['checks']} check(s) and {rolled['hourly']} hourly summary(ies)")
+        return rolled
+
+    def file_size(self):
+        """Size of the database file plus its write-ahead log, in bytes."""
+        return sum(os.path.getsize(path) for path in (self.db_path, self.db_path + '-wal') if os.path.exists(path))
+
+    def compact(self):
+        """
+        Reclaim free space: checkpoint and truncate the WAL, VACUUM and refresh planner statistics.
+
+        Returns:
+            tuple: (size_before, size_after) in bytes, see file_size()
+        """
+        if self._batch_depth:
+            raise RuntimeError('Cannot compact the database inside a batch')
+
+        size_before = self.file_size()
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.execute('VACUUM')
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.execute('PRAGMA optimize')
+        size_after = self.file_size()
+        logger.info(f"Compacted database from {size_before / 1024:.0f} KB to {size_after / 1024:.0f} KB")
+        return size_before, size_after
+
+    def maintain(self):
+        """Apply retention and compact the file; run periodically by the monitor."""
+        with PHASE_SECONDS.time(phase='db_maintenance'):
+            rolled = self.apply_retention()
+            self.compact()
+        return rolled
+
+    def brand_refreshed_at(self, brand_url):
+        """Unix time the brand's venues were last discovered, or None if never."""
+        row = self.conn.execute('SELECT refreshed_at FROM brands WHERE url = ?', (brand_url,)).fetchone()
+        return row['refreshed_at'] if row else None
+
+    def get_venues(self, brand_url=None, include_inactive=False):
+        """
+        Get discovered venues.
+
+        Args:
+            brand_url: Only venues of this brand
+            include_inactive: Also venues no longer listed on their brand page
+
+        Returns:
+            list: Dicts with 'name', 'url', 'brand_url', 'first_seen_at', 'last_seen_at' and 'active'
+        """
+        conditions = []
+        params = []
+        if brand_url is not None:
+            conditions.append('b.url = ?')
+            params.append(brand_url)
+        if not include_inactive:
+            conditions.append('v.active = 1')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        cursor = self.conn.execute(f'''
+            SELECT v.name, v.url, b.url AS brand_url, v.first_seen_at, v.last_seen_at, v.active
+            FROM venues v
+            JOIN brands b ON b.id = v.brand_id
+            {where}
+            ORDER BY v.id
+        ''', params)
+        return [dict(row, active=bool(row['active'])) for row in cursor]
+
+    def update_venues(self, brand_url, locations, now=None):
+        """
+        Merge a fresh listing of a brand's venues into the stored ones.
+
+        New venues are inserted, known ones get their name and last-seen time
+        updated, and venues missing from the listing are marked inactive
+        (they come back as active when listed again).
+
+        Args:
+            brand_url: Brand page the listing came from
+            locations: Dicts with the venue 'name' and 'url'
+            now: Unix timestamp of the listing (default: the current time)
+
+        Returns:
+            tuple: (added, removed) lists of venue URLs
+        """
+        now = int(time.time()) if now is None else int(now)
+        with self.batch():
+            self.conn.execute('INSERT OR IGNORE INTO brands (url) VALUES (?)', (brand_url,))
+            brand_id = self.conn.execute('SELECT id FROM brands WHERE url = ?', (brand_url,)).fetchone()['id']
+
+            # Venue URL -> (id, name, active) of what is stored for the brand
+            known = {row['url']: (row['id'], row['name'], row['active']) for row in self.conn.execute(
+                'SELECT id, url, name, active FROM venues WHERE brand_id = ?', (brand_id,))}
+
+            added = []
+            listed = set()
+            for location in locations:
+                url = location['url']
+                listed.add(url)
+                stored = known.get(url)
+                if stored is None:
+                    # A venue moved over from another brand keeps its row
+                    self.conn.execute('''
+                        INSERT INTO venues (brand_id, url, name, first_seen_at, last_seen_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (url) DO UPDATE SET
+                            brand_id = excluded.brand_id, name = excluded.name,
+                            last_seen_at = excluded.last_seen_at, active = 1
+                    ''', (brand_id, url, location['name'], now, now))
+                    added.append(url)
+                else:
+                    if not stored[2]:
+                        added.append(url)
+                    self.conn.execute('UPDATE venues SET name = ?, last_seen_at = ?, active = 1 WHERE id = ?',
+                                      (location['name'], now, stored[0]))
+
+            removed = [url for url, (_, _, active) in known.items() if active and url not in listed]
+            self.conn.executemany('UPDATE venues SET active = 0 WHERE url = ?', [(url,) for url in removed])
+            self.conn.execute('UPDATE brands SET refreshed_at = ? WHERE id = ?', (now, brand_id))
+        return added, removed
+
+    def set_opening_hours(self, venue_url, timezone, intervals, now=None):
+        """
+        Replace the stored opening hours of a venue.
+
+        Args:
+            venue_url: Venue page URL
+            timezone: IANA timezone name the hours are in (may be None)
+            intervals: (weekday, opens_at, closes_at) tuples in minutes after
+                local midnight, weekday 0 being Monday
+            now: Unix timestamp of the fetch (default: the current time)
+        """
+        now = int(time.time()) if now is None else int(now)
+        with self.batch():
+            self.conn.execute('''
+                INSERT INTO venue_schedules (venue_url, timezone, fetched_at) VALUES (?, ?, ?)
+                ON CONFLICT (venue_url) DO UPDATE SET timezone = excluded.timezone, fetched_at = excluded.fetched_at
+            ''', (venue_url, timezone, now))
+            self.conn.execute('DELETE FROM opening_hours WHERE venue_url = ?', (venue_url,))
+            self.conn.executemany('INSERT OR IGNORE INTO opening_hours VALUES (?, ?, ?, ?)',
+                                  [(venue_url, weekday, opens_at, closes_at)
+                                   for weekday, opens_at, closes_at in intervals])
+
+    def get_opening_hours(self):
+        """
+        Get the stored opening hours of all venues.
+
+        Returns:
+            dict: Venue URL -> (timezone, list of (weekday, opens_at, closes_at), fetched_at)
+        """
+        schedules = {row['venue_url']: (row['timezone'], [], row['fetched_at'])
+                     for row in self.conn.execute('SELECT * FROM venue_schedules')}
+        for row in self.conn.execute('SELECT * FROM opening_hours ORDER BY venue_url, weekday, opens_at'):
+            schedules[row['venue_url']][1].append((row['weekday'], row['opens_at'], row['closes_at']))
+        return schedules
+
+    def get_setting(self, key, default=None):
+        """Value of a stored monitor setting (e.g. when maintenance last ran), or ``default``."""
+        row = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_setting(self, key, value):
+        """Store a monitor setting."""
+        self.conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, str(value)))
+        self._commit()
+
+    def add_subscription(self, chat_id, venue_url=ANY, product_name=ANY, name=None, now=None):
+        """
+        Subscribe a Telegram chat to availability alerts.
+
+        Args:
+            chat_id: Telegram chat to notify
+            venue_url: Venue page URL, or ANY for every venue
+            product_name: Tracked item name, or ANY for every item
+            name: Label of the subscriber, e.g. their Telegram username
+            now: Unix timestamp of the subscription (default: the current time)
+
+        Returns:
+            bool: False if the chat already had this subscription
+        """
+        now = int(time.time()) if now is None else int(now)
+        chat_id = str(chat_id)
+        with self.batch():
+            self.conn.execute('''
+                INSERT INTO subscribers (chat_id, name, created_at) VALUES (?, ?, ?)
+                ON CONFLICT (chat_id) DO UPDATE SET name = COALESCE(excluded.name, name)
+            ''', (chat_id, name, now))
+            subscriber_id = self.conn.execute('SELECT id FROM subscribers WHERE chat_id = ?',
+                                              (chat_id,)).fetchone()['id']
+            cursor = self.conn.execute('INSERT OR IGNORE INTO subscriptions VALUES (?, ?, ?, ?)',
+                                       (venue_url, product_name, subscriber_id, now))
+        return cursor.rowcount > 0
+
+    def remove_subscription(self, chat_id, venue_url=None, product_name=None):
+        """
+        Unsubscribe a chat; ``venue_url`` and ``product_name`` narrow down which
+        subscriptions go (by default all of them, and the subscriber with them).
+
+        Returns:
+            int: Number of subscriptions removed
+        """
+        row = self.conn.execute('SELECT id FROM subscribers WHERE chat_id = ?', (str(chat_id),)).fetchone()
+        if row is None:
+            return 0
+        conditions = ['subscriber_id = ?']
+        params = [row['id']]
+        if venue_url is not None:
+            conditions.append('venue_url = ?')
+            params.append(venue_url)
+        if product_name is not None:
+            conditions.append('product_name = ?')
+            params.append(product_name)
+        with self.batch():
+            removed = self.conn.execute(f"DELETE FROM subscriptions WHERE {' AND '.join(conditions)}",
+                                        params).rowcount
+            self.conn.execute('''
+                DELETE FROM subscribers
+                WHERE id = ? AND NOT EXISTS (SELECT 1 FROM subscriptions WHERE subscriber_id = ?)
+            ''', (row['id'], row['id']))
+        return removed
+
+    def get_subscriptions(self, chat_id=None):
+        """
+        List subscriptions.
+
+        Returns:
+            list: Dicts with 'chat_id', 'name', 'venue_url', 'product_name' and 'created_at'
+        """
+        where = 'WHERE s.chat_id = ?' if chat_id is not None else ''
+        cursor = self.conn.execute(f'''
+            SELECT s.chat_id, s.name, x.venue_url, x.product_name, x.created_at
+            FROM subscriptions x
+            JOIN subscribers s ON s.id = x.subscriber_id
+            {where}
+            ORDER BY s.id, x.venue_url, x.product_name
+        ''', () if chat_id is None else (str(chat_id),))
+        return [dict(row) for row in cursor]
+
+    def get_subscribers(self, venue_url, product_name):
+        """
+        Chats subscribed to an item at a venue, directly or through a ``*`` subscription.
+
+        Resolved from the subscriptions primary key in one indexed query.
+
+        Returns:
+            list: Chat ids, in subscription order
+        """
+        cursor = self.conn.execute('''
+            SELECT s.chat_id
+            FROM subscriptions x
+            JOIN subscribers s ON s.id = x.subscriber_id
+            WHERE x.venue_url IN (?, ?) AND x.product_name IN (?, ?)
+            GROUP BY s.id
+            ORDER BY s.id
+        ''', (venue_url, ANY, product_name, ANY))
+        return [row['chat_id'] for row in cursor]
+
+    def pending_notifications(self):
+        """Number of alerts left undelivered in the notification outbox."""
+        try:
+            return self.conn.execute('SELECT COUNT(*) FROM notification_outbox').fetchone()[0]
+        except sqlite3.OperationalError:
+            # No alert was ever queued with this database
+            return 0
 
     def close(self):
         """Close the database connection."""
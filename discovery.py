@@ -0,0 +1,118 @@
+"""Venue discovery: track every venue of a brand without listing them by hand.
+
+Brands are configured in ``Config.DISCOVERY`` with the items to track at
+each of their venues. Their brand pages are scraped on a slow schedule
+(``DISCOVERY_REFRESH_HOURS``) and the venues found are stored in the
+database, so restarts reuse the known venues instead of loading the brand
+page again. Each refresh is merged incrementally: new venues are added and
+venues no longer listed are retired.
+
+    python fetch_locations.py [BRAND_URL ...] [--refresh]
+"""
+import logging
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class VenueDiscovery:
+    """Keeps the venues of the configured brands up to date in the database."""
+
+    def __init__(self, db, brands=None, refresh_hours=None):
+        """
+        Args:
+            db: Database storing the discovered venues
+            brands: Brand entries (default: Config.DISCOVERY), each with a
+                'brand_url', the 'items' to track and an optional 'backend'
+            refresh_hours: Age after which a brand is discovered again
+                (default: Config.DISCOVERY_REFRESH_HOURS)
+        """
+        self.db = db
+        self.brands = Config.DISCOVERY if brands is None else brands
+        self.refresh_hours = Config.DISCOVERY_REFRESH_HOURS if refresh_hours is None else refresh_hours
+
+    def stale_brands(self, now=None):
+        """URLs of the brands never discovered or last discovered more than refresh_hours ago."""
+        now = time.time() if now is None else now
+        stale = []
+        for brand in self.brands:
+            refreshed_at = self.db.brand_refreshed_at(brand['brand_url'])
+            if refreshed_at is None or now - refreshed_at >= self.refresh_hours * 3600:
+                stale.append(brand['brand_url'])
+        return stale
+
+    def fetch(self, brand_urls):
+        """
+        Scrape the brand pages, without touching the database.
+
+        A browser is started only for the duration of the call, as refreshes
+        are hours apart.
+
+        Returns:
+            dict: Brand URL -> list of {'name', 'url'} venues; brands whose
+            page listed no venues are left out
+        """
+        listings = {}
+        if not brand_urls:
+            return listings
+        from scraper import WoltScraper, ResourceFilter
+        with WoltScraper(headless=True, resource_filter=ResourceFilter()) as scraper:
+            for brand_url in brand_urls:
+                locations = scraper.get_brand_locations(brand_url)
+                if locations:
+                    listings[brand_url] = locations
+                else:
+                    # An empty listing is far more likely a broken page than a closed brand
+                    logger.warning(f"No venues found at {brand_url}, keeping the known ones")
+        return listings
+
+    def store(self, listings):
+        """
+        Merge fetched listings into the database.
+
+        Returns:
+            tuple: (added, removed) lists of venue URLs over all brands
+        """
+        added = []
+        removed = []
+        for brand_url, locations in listings.items():
+            brand_added, brand_removed = self.db.update_venues(brand_url, locations)
+            logger.info(f"Discovered {len(locations)} venue(s) at {brand_url}: "
+                        f"{len(brand_added)} new, {len(brand_removed)} gone")
+            added.extend(brand_added)
+            removed.extend(brand_removed)
+        return added, removed
+
+    def refresh(self, force=False):
+        """
+        Discover the stale brands (or all of them with ``force``) and store the result.
+
+        Returns:
+            tuple: (added, removed) lists of venue URLs
+        """
+        brand_urls = [brand['brand_url'] for brand in self.brands] if force else self.stale_brands()
+        return self.store(self.fetch(brand_urls))
+
+    def locations(self):
+        """
+        The known venues of the configured brands as Config.LOCATIONS entries.
+
+        Returns:
+            list: Location dicts with 'name', 'url', 'items' and 'backend'
+        """
+        locations = []
+        for brand in self.brands:
+            for venue in self.db.get_venues(brand['brand_url']):
+                items = []
+                for item in brand['items']:
+                    # 'path' is the item part of a product URL, e.g. 'losos-150g-itemid-08c0...'
+                    url = f"{venue['url']}/{item['path']}" if item.get('path') else venue['url']
+                    items.append({'id': item.get('id'), 'name': item.get('name'), 'url': url})
+                locations.append({
+                    'name': venue['name'],
+                    'url': venue['url'],
+                    'backend': brand.get('backend'),
+                    'items': items
+                })
+        return locations
@@ -0,0 +1,125 @@
+"""Export the check history to CSV or Parquet.
+
+Checks are streamed from Database.iter_checks() and written as they arrive,
+so memory use stays constant regardless of the history size. Parquet export
+needs the optional ``pyarrow`` package.
+
+    python export.py history.csv [--location NAME] [--since 2024-01-01] [--until 2024-02-01]
+    python export.py history.parquet
+"""
+import argparse
+import csv
+import logging
+from datetime import datetime
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'location_name', 'location_url', 'product_name', 'is_available', 'price', 'checked_at')
+FORMATS = ('csv', 'parquet')
+
+
+def export_csv(checks, path):
+    """
+    Write checks to a CSV file, one row at a time.
+
+    Returns:
+        int: Number of checks written
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for check in checks:
+            writer.writerow([getattr(check, column) for column in COLUMNS])
+            count += 1
+    return count
+
+
+def export_parquet(checks, path, row_group_size=50000):
+    """
+    Write checks to a Parquet file, one row group of ``row_group_size`` checks at a time.
+
+    Returns:
+        int: Number of checks written
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export needs pyarrow: pip install pyarrow')
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('location_name', pa.string()),
+        ('location_url', pa.string()),
+        ('product_name', pa.string()),
+        ('is_available', pa.bool_()),
+        ('price', pa.string()),
+        ('checked_at', pa.string())
+    ])
+
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        columns = {column: [] for column in COLUMNS}
+        for check in checks:
+            for column in COLUMNS:
+                columns[column].append(getattr(check, column))
+            count += 1
+            if len(columns['id']) >= row_group_size:
+                writer.write_table(pa.table(columns, schema=schema))
+                columns = {column: [] for column in COLUMNS}
+        if columns['id']:
+            writer.write_table(pa.table(columns, schema=schema))
+    return count
+
+
+def export_checks(db, path, format=None, **filters):
+    """
+    Export stored checks to a file.
+
+    Args:
+        db: Database to read from
+        path: Output file
+        format: 'csv' or 'parquet' (default: from the file extension, else csv)
+        **filters: Passed to Database.iter_checks (location_name, product_name, since, until)
+
+    Returns:
+        int: Number of checks written
+    """
+    if format is None:
+        format = 'parquet' if path.lower().endswith('.parquet') else 'csv'
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format '{format}', expected one of {', '.join(FORMATS)}")
+
+    checks = db.iter_checks(**filters)
+    count = export_parquet(checks, path) if format == 'parquet' else export_csv(checks, path)
+    logger.info(f"Exported {count} check(s) to {path}")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the check history to CSV or Parquet')
+    parser.add_argument('path', help='Output file (.csv or .parquet)')
+    parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the file extension)')
+    parser.add_argument('--location', help='Only checks of this location')
+    parser.add_argument('--product', help='Only checks of this product')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Only checks at or after this UTC date/time')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='Only checks before this UTC date/time')
+    parser.add_argument('--db', help=f'Database file (default: {Config.DATABASE_PATH})')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        count = export_checks(db, args.path, args.format, location_name=args.location,
+                              product_name=args.product, since=args.since, until=args.until)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        db.close()
+    print(f"Exported {count} check(s) to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Targeted extraction of product price and stock state.
+
+Instead of serializing and scanning the whole page, only the text of the
+product itself is pulled out: the product dialog on a product page, or the
+card of each tracked item on a venue page. Inside the browser this runs as
+a single page.evaluate() call; saved HTML is handled with lxml.
+"""
+import re
+from lxml import html as lxml_html
+
+DEFAULT_OUT_OF_STOCK_INDICATORS = (
+    'sold out',
+    'rasprodano',
+    'nije dostupno',
+    'out of stock',
+    'not available'
+)
+
+# Matches "12,99 €", "12.99€", "€12.99" and "€ 5"
+DEFAULT_PRICE_PATTERN = r'€\s*\d+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?\s*€'
+
+# Where a product page shows the product; if none match the product counts
+# as not found, as the rest of the page lists other products and their states
+DEFAULT_CONTAINER_SELECTORS = (
+    '[data-test-id="product-modal"]',
+    '[role="dialog"]'
+)
+
+# Page-side helpers of READY_SCRIPT and EXTRACT_SCRIPT. The product is the
+# first element matching a container selector. An item is found by an
+# attribute containing its id or an element whose text is its name; its card
+# is the closest ancestor that shows a price. Ids are compared as strings,
+# never spliced into a query.
+_PAGE_HELPERS = """
+    const cardText = anchor => {
+        let el = anchor;
+        for (let depth = 0; el && depth < maxDepth; depth++, el = el.parentElement) {
+            if (el.textContent.includes('€')) {
+                return el.innerText;
+            }
+        }
+        return null;
+    };
+    const byId = id => {
+        for (const el of document.querySelectorAll('*')) {
+            for (const attr of el.attributes) {
+                if (attr.value.includes(id)) {
+                    return el;
+                }
+            }
+        }
+        return null;
+    };
+    const byName = name => {
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            if (walker.currentNode.nodeValue.trim().toLowerCase() === name) {
+                return walker.currentNode.parentElement;
+            }
+        }
+        return null;
+    };
+
+    const container = () => {
+        for (const selector of containers) {
+            const root = document.querySelector(selector);
+            if (root) {
+                return root;
+            }
+        }
+        return null;
+    };
+    const anchorOf = item => (item.id && byId(item.id)) || (item.name && byName(item.name));
+"""
+
+# Runs in the page while it loads. True once the product container (product
+# pages) or the card of at least one tracked item (venue pages) shows a
+# price or a sold-out badge; text elsewhere on the page, such as the venue
+# menu behind a product dialog, does not count
+READY_SCRIPT = """
+({containers, maxDepth, items, indicators}) => {
+""" + _PAGE_HELPERS + """
+    const shows = text => {
+        const lower = (text || '').toLowerCase();
+        return /\\d\\s*€|€\\s*\\d/.test(lower) || indicators.some(indicator => lower.includes(indicator));
+    };
+    if (!items.length) {
+        const root = container();
+        return root !== null && shows(root.innerText);
+    }
+    return items.some(item => {
+        const anchor = anchorOf(item);
+        return Boolean(anchor) && shows(cardText(anchor));
+    });
+}
+"""
+
+# Runs in the page. Returns the text of the product container (null when
+# there is none) and, per tracked item, the text of its card or null when it
+# is not on the page
+EXTRACT_SCRIPT = """
+({containers, maxDepth, items}) => {
+""" + _PAGE_HELPERS + """
+    const root = container();
+    return {
+        product: root ? root.innerText : null,
+        items: items.map(item => {
+            const anchor = anchorOf(item);
+            return anchor ? cardText(anchor) : null;
+        })
+    };
+}
+"""
+
+
+class ExtractionRules:
+    """Compiled rules for finding the product and reading its state."""
+
+    def __init__(self, out_of_stock_indicators=DEFAULT_OUT_OF_STOCK_INDICATORS,
+                 price_pattern=DEFAULT_PRICE_PATTERN, container_selectors=DEFAULT_CONTAINER_SELECTORS,
+                 max_card_depth=8):
+        self.out_of_stock_indicators = tuple(indicator.lower() for indicator in out_of_stock_indicators)
+        self.out_of_stock_re = re.compile('|'.join(re.escape(i) for i in self.out_of_stock_indicators), re.IGNORECASE)
+        self.price_re = re.compile(price_pattern)
+        self.container_selectors = tuple(container_selectors)
+        self.max_card_depth = max_card_depth
+
+    def script_args(self, items=()):
+        """Arguments for READY_SCRIPT and EXTRACT_SCRIPT."""
+        return {
+            'containers': list(self.container_selectors),
+            'maxDepth': self.max_card_depth,
+            'items': [item_query(item) for item in items],
+            'indicators': list(self.out_of_stock_indicators)
+        }
+
+    def status(self, text):
+        """
+        Work out availability and price from the text of a product or item card.
+
+        Returns:
+            dict: {'available': bool, 'price': str or None, 'out_of_stock': bool}
+        """
+        is_out_of_stock = self.out_of_stock_re.search(text) is not None
+        match = self.price_re.search(text)
+        price = match.group(0).strip() if match else None
+        return {
+            'available': price is not None and not is_out_of_stock,
+            'price': price,
+            'out_of_stock': is_out_of_stock
+        }
+
+
+def item_query(item):
+    """What to look for on the page for a tracked item (names of id-only items are their id)."""
+    name = item['name'] if item['name'] != item['id'] else None
+    return {
+        'id': item['id'],
+        'name': name.strip().lower() if name else None
+    }
+
+
+def _card_text(anchor, max_depth):
+    element = anchor
+    for _ in range(max_depth):
+        if element is None:
+            break
+        text = element.text_content()
+        if '€' in text:
+            return text
+        element = element.getparent()
+    return None
+
+
+def _find_by_name(doc, name):
+    for text in doc.xpath('//body//text()'):
+        if text.strip().lower() == name:
+            parent = text.getparent()
+            return parent.getparent() if text.is_tail else parent
+    return None
+
+
+def extract_fragments(content, rules, items=()):
+    """
+    Pull the product and item card texts out of saved HTML with lxml.
+
+    Returns the same structure as EXTRACT_SCRIPT does in the browser.
+    """
+    doc = lxml_html.fromstring(content)
+
+    root = None
+    for selector in rules.container_selectors:
+        found = doc.cssselect(selector)
+        if found:
+            root = found[0]
+            break
+
+    item_texts = []
+    for query in (item_query(item) for item in items):
+        anchor = None
+        if query['id']:
+            hits = doc.xpath('//*[@*[contains(., $id)]]', id=query['id'])
+            anchor = hits[0] if hits else None
+        if anchor is None and query['name']:
+            anchor = _find_by_name(doc, query['name'])
+        item_texts.append(_card_text(anchor, rules.max_card_depth) if anchor is not None else None)
+
+    return {
+        'product': root.text_content() if root is not None else None,
+        'items': item_texts
+    }
+
+
+def product_result(fragments, rules):
+    """Result dict for a product page from extracted fragments."""
+    if fragments['product'] is None:
+        return {
+            'available': False,
+            'price': None,
+            'error': 'Product not found on page'
+        }
+    status = rules.status(fragments['product'])
+    del status['out_of_stock']
+    status['error'] = None
+    return status
+
+
+def venue_results(fragments, items, rules):
+    """One result dict per tracked item from the card texts of a venue page."""
+    results = []
+    for item, text in zip(items, fragments['items']):
+        if text is None:
+            results.append({
+                'available': False,
+                'price': None,
+                'error': f"Item {item['id'] or item['name']} not found on venue page"
+            })
+            continue
+        status = rules.status(text)
+        del status['out_of_stock']
+        status['error'] = None
+        results.append(status)
+    return results
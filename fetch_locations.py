@@ -1,50 +1,49 @@
-"""Utility script to fetch all Fisherija locations and generate product URLs."""
+"""Utility script to discover the locations of a brand and store them in the database."""
+import argparse
 import logging
-from scraper import WoltScraper
+from config import Config
+from database import Database
+from discovery import VenueDiscovery
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def main():
-    """Fetch all Fisherija locations and generate config."""
-    print("\n" + "=" * 60)
-    print("Fetching all Fisherija locations...")
-    print("=" * 60 + "\n")
-
-    with WoltScraper(headless=True) as scraper:
-        # Get all locations from the brand page
-        locations = scraper.get_all_fisherija_locations()
-
-        if not locations:
-            print("❌ No locations found. The page structure might have changed.")
-            return
-
-        print(f"✅ Found {len(locations)} locations:\n")
-
-        # Product item ID from the example URL
-        product_item_id = "divlji-crveni-losos-fileti-s-kozom-msc-150g-itemid-08c0c9d79b5528337e4ce2b1"
-
-        print("Copy this configuration to your config.py file:\n")
-        print("LOCATIONS = [")
 
-        for i, location in enumerate(locations):
-            # Extract venue slug from URL
-            # Example: https://wolt.com/hr/hrv/zagreb/venue/fisherija-maksimir
-            venue_slug = location['url'].split('/venue/')[-1].split('?')[0]
-
-            # Construct product URL for this location
-            product_url = f"https://wolt.com/hr/hrv/zagreb/venue/{venue_slug}/{product_item_id}"
-
-            print(f"    {{")
-            print(f"        'name': '{location['name']}',")
-            print(f"        'url': '{product_url}'")
-            print(f"    }},")
-
-        print("]")
-
-        print(f"\n{'=' * 60}")
-        print("✅ Configuration generated successfully!")
+def main():
+    """Discover the venues of the configured (or given) brands and list them."""
+    parser = argparse.ArgumentParser(description='Discover the venues of Wolt brands')
+    parser.add_argument('brand_urls', nargs='*', metavar='BRAND_URL',
+                        help='Brand pages to discover (default: the brands in Config.DISCOVERY)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Load the brand pages even if discovered less than DISCOVERY_REFRESH_HOURS ago')
+    parser.add_argument('--db', help=f'Database file (default: {Config.DATABASE_PATH})')
+    args = parser.parse_args()
+
+    brands = [{'brand_url': url, 'items': []} for url in args.brand_urls] or Config.DISCOVERY
+    if not brands:
+        parser.exit(1, "No brands to discover: pass a brand URL or configure Config.DISCOVERY\n")
+
+    db = Database(args.db)
+    try:
+        discovery = VenueDiscovery(db, brands)
+        added, removed = discovery.refresh(force=args.refresh)
+
+        print("\n" + "=" * 60)
+        for brand in brands:
+            venues = db.get_venues(brand['brand_url'])
+            print(f"{brand['brand_url']}: {len(venues)} location(s)")
+            for venue in venues:
+                marker = '+' if venue['url'] in added else ' '
+                print(f"  {marker} {venue['name']} - {venue['url']}")
+        for url in removed:
+            print(f"  - {url} (no longer listed)")
         print("=" * 60)
+        if Config.DISCOVERY:
+            print("The monitor picks these venues up automatically.")
+        else:
+            print("Add the brand to Config.DISCOVERY to monitor its venues automatically.")
+    finally:
+        db.close()
 
 
 if __name__ == '__main__':
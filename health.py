@@ -0,0 +1,136 @@
+"""Per-venue health: observed latencies, failure backoff and a circuit breaker.
+
+LoadTimeTracker sizes each page's or request's timeout from its own recent
+latencies, so a venue that stopped responding fails in seconds rather than
+after the full default timeout. VenueHealth counts consecutive failed checks
+per venue and says when a venue may be checked again: after exponentially
+growing delays at first, and once it keeps failing its circuit opens and it
+is only probed every ``probe_interval`` until a check succeeds again.
+"""
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LoadTimeTracker:
+    """Recent load durations per URL, used to size adaptive timeouts.
+
+    Once a URL has a few samples its timeout becomes ``factor`` times its
+    90th percentile duration, clamped between ``min_timeout`` and the
+    caller's default.
+    """
+
+    def __init__(self, window=20, factor=3.0, min_timeout=5000, min_samples=3):
+        self.window = window
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self._samples = {}
+
+    def record(self, key, ms):
+        """Record how long a successful load of ``key`` took, in milliseconds."""
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(ms)
+
+    def timeout_for(self, key, default):
+        """Timeout in milliseconds for ``key``."""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return default
+        ordered = sorted(samples)
+        p90 = ordered[int(0.9 * (len(ordered) - 1))]
+        return int(min(default, max(self.min_timeout, p90 * self.factor)))
+
+
+class VenueState:
+    """Failure count and breaker state of one venue."""
+
+    __slots__ = ('failures', 'state', 'next_attempt')
+
+    def __init__(self):
+        self.failures = 0
+        self.state = CLOSED
+        self.next_attempt = 0.0
+
+
+class VenueHealth:
+    """Consecutive failures per venue, with exponential backoff and a circuit breaker."""
+
+    def __init__(self, base_delay=300, max_delay=3600, failure_threshold=5, probe_interval=3600):
+        """
+        Args:
+            base_delay: Seconds to wait after the first failure; doubled per further failure
+            max_delay: Longest backoff in seconds
+            failure_threshold: Consecutive failures that open the circuit (0 never opens it)
+            probe_interval: Seconds between probe checks of a venue with an open circuit
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._venues = {}
+
+    def allow(self, key, now=None):
+        """Whether the venue may be checked now; an allowed check of a parked venue is its probe."""
+        venue = self._venues.get(key)
+        if venue is None or venue.failures == 0:
+            return True
+        now = time.monotonic() if now is None else now
+        if now < venue.next_attempt:
+            return False
+        if venue.state == OPEN:
+            venue.state = HALF_OPEN
+        return True
+
+    def record(self, key, ok, now=None):
+        """Record the outcome of a check of the venue."""
+        venue = self._venues.setdefault(key, VenueState())
+        if ok:
+            if venue.state != CLOSED:
+                logger.info(f"{key} is responding again after {venue.failures} failed check(s)")
+            venue.failures = 0
+            venue.state = CLOSED
+            venue.next_attempt = 0.0
+            return
+
+        now = time.monotonic() if now is None else now
+        venue.failures += 1
+        if self.failure_threshold and venue.failures >= self.failure_threshold:
+            if venue.state == CLOSED:
+                logger.warning(f"{key} failed {venue.failures} checks in a row, "
+                               f"only probing it every {self.probe_interval / 60:.0f} min")
+            venue.state = OPEN
+            venue.next_attempt = now + self.probe_interval
+        else:
+            venue.next_attempt = now + self.retry_delay(key)
+
+    def wait_time(self, key, now=None):
+        """Seconds until the venue may be checked again (see allow()), 0 if it may be now."""
+        venue = self._venues.get(key)
+        if venue is None or venue.failures == 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        return max(0.0, venue.next_attempt - now)
+
+    def retry_delay(self, key):
+        """Seconds to wait before the next check of a failing venue, 0 if it is healthy."""
+        venue = self._venues.get(key)
+        if venue is None or venue.failures == 0:
+            return 0
+        if venue.state != CLOSED:
+            return self.probe_interval
+        return min(self.max_delay, self.base_delay * 2 ** (venue.failures - 1))
+
+    def state(self, key):
+        """Breaker state of the venue: 'closed', 'open' or 'half_open'."""
+        venue = self._venues.get(key)
+        return venue.state if venue else CLOSED
+
+    def parked(self):
+        """Keys of the venues whose circuit is open."""
+        return [key for key, venue in self._venues.items() if venue.state != CLOSED]
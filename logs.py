@@ -0,0 +1,222 @@
+"""Logging for the monitor: file and console output on a background thread.
+
+Records are put on an in-process queue by a QueueHandler and written by a
+QueueListener thread, so checks never wait for the disk or the console;
+they are not even formatted on the caller's thread. The log file is rotated
+by size (LOG_MAX_MB) or time (LOG_ROTATE_WHEN) with rotated files gzipped,
+can be written in a compact JSON-lines format (LOG_FORMAT=compact), and
+repetitive per-item lines can be sampled (LOG_SAMPLE_EVERY).
+
+Worker processes (sharded mode) send their records to the monitor's
+listener over a multiprocessing queue, see listen() and setup_worker_logging().
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from config import Config
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Handlers the listeners write to, set by setup_logging()
+_handlers = []
+_listeners = []
+# (listener, handler) of handlers serving a single logger, see queued()
+_own_listeners = []
+
+
+class LocalQueueHandler(QueueHandler):
+    """Queues records as they are: the queue stays in this process, so the
+    listener thread can do the formatting that QueueHandler.prepare would
+    otherwise do on the caller's thread."""
+
+    def prepare(self, record):
+        return record
+
+
+class CompactFormatter(logging.Formatter):
+    """One JSON object per line with short keys: {"t": unix time, "l": level
+    initial, "n": logger name, "m": message}, plus "x" for an exception."""
+
+    def format(self, record):
+        entry = {'t': round(record.created, 3), 'l': record.levelname[0], 'n': record.name, 'm': record.getMessage()}
+        if record.exc_info:
+            entry['x'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through one in ``every`` repetitive records of the same kind.
+
+    Records logged with ``extra={'sample_key': key, 'sampled': True}`` (e.g.
+    "not available" for one item at one venue) are sampled per key: the
+    first of a run passes, then every ``every``-th, noting how many were
+    left out. A record with the same key but not ``sampled`` (the item
+    became available) passes and starts a new run.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self._counts = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if key is None:
+            return True
+        if not getattr(record, 'sampled', False):
+            self._counts.pop(key, None)
+            return True
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.msg = f"{record.msg} ({self.every - 1} similar line(s) skipped)"
+        return True
+
+
+def _gzip_namer(name):
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source, dest):
+    """Compress a rotated log file; runs on the listener thread."""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def file_handler(path, max_mb=None, when=None, backups=None, compress=None):
+    """
+    Build the rotating log file handler.
+
+    Args:
+        path: Log file
+        max_mb: Rotate once the file reaches this size (0: never; default: Config.LOG_MAX_MB)
+        when: Rotate on time instead, e.g. 'midnight' or 'H' (default: Config.LOG_ROTATE_WHEN)
+        backups: Rotated files to keep (default: Config.LOG_BACKUP_COUNT)
+        compress: Gzip rotated files (default: Config.LOG_COMPRESS)
+    """
+    max_mb = Config.LOG_MAX_MB if max_mb is None else max_mb
+    when = Config.LOG_ROTATE_WHEN if when is None else when
+    backups = Config.LOG_BACKUP_COUNT if backups is None else backups
+    compress = Config.LOG_COMPRESS if compress is None else compress
+    if when:
+        handler = TimedRotatingFileHandler(path, when=when, backupCount=backups, encoding='utf-8', delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=int(max_mb * 1024 * 1024), backupCount=backups,
+                                      encoding='utf-8', delay=True)
+    if compress:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(path=None, level=logging.INFO, log_format=None, sample_every=None, console=True, **rotation):
+    """
+    Route the root logger through a queue to the file and console handlers
+    on a listener thread, stopped (and flushed) at exit.
+
+    Args:
+        path: Log file (default: Config.LOG_FILE)
+        log_format: 'text' or 'compact' for the file (default: Config.LOG_FORMAT); the console is always text
+        sample_every: Sample rate of repetitive lines, 0 or 1 logs all (default: Config.LOG_SAMPLE_EVERY)
+        console: Also log to the console
+        rotation: max_mb, when, backups and compress for file_handler()
+
+    Returns:
+        QueueListener: The running listener
+    """
+    if _listeners:
+        return _listeners[0]
+    log_format = Config.LOG_FORMAT if log_format is None else log_format
+    sample_every = Config.LOG_SAMPLE_EVERY if sample_every is None else sample_every
+
+    handler = file_handler(path or Config.LOG_FILE, **rotation)
+    handler.setFormatter(CompactFormatter() if log_format == 'compact' else logging.Formatter(TEXT_FORMAT))
+    _handlers.append(handler)
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        _handlers.append(stream)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    if sample_every > 1:
+        # Dropped before they are queued, so skipped lines cost next to nothing
+        queue_handler.addFilter(SamplingFilter(sample_every))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    listener = listen(log_queue)
+    atexit.register(stop_logging)
+    return listener
+
+
+def listen(log_queue):
+    """
+    Write the records arriving on ``log_queue`` (e.g. from worker processes)
+    with the handlers set up by setup_logging().
+
+    Returns:
+        QueueListener: The running listener, or None if logging was not set up
+    """
+    if not _handlers:
+        return None
+    listener = QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return listener
+
+
+def unlisten(listener):
+    """Stop a listener started by listen(), writing out what it has queued."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+        listener.stop()
+
+
+def queued(handler):
+    """
+    Put ``handler`` on a listener thread of its own, for a logger that
+    writes somewhere else than the log file (e.g. the JSON metrics log).
+    Stopped and closed by stop_logging().
+
+    Returns:
+        LocalQueueHandler: The handler to add to the logger instead
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    _own_listeners.append((listener, handler))
+    atexit.register(stop_logging)
+    return LocalQueueHandler(log_queue)
+
+
+def setup_worker_logging(log_queue, level=logging.INFO):
+    """Send a worker process's records to the monitor over a multiprocessing queue (see listen())."""
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+
+def stop_logging():
+    """Write out the queued records and close the handlers."""
+    while _listeners:
+        _listeners.pop().stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    while _handlers:
+        _handlers.pop().close()
+    while _own_listeners:
+        listener, handler = _own_listeners.pop()
+        listener.stop()
+        handler.close()
@@ -1,70 +1,562 @@
-"""Main product availability monitor."""
+"""Main product availability monitor.
+
+    python main.py          # run continuously, every venue on its own interval
+    python main.py --once   # one check cycle, e.g. from cron or a systemd timer
+
+Playwright, requests and the other heavy modules are imported only when
+first needed, so a one-shot run that uses the API backend and has nothing
+to send never loads the browser or the Telegram client.
+"""
+import argparse
+import hashlib
+import json
 import logging
+import threading
 import time
-import schedule
 from datetime import datetime
+import logs
 from database import Database
-from scraper import WoltScraper
-from notifier import TelegramNotifier
+from backends import FingerprintCache
 from config import Config
+from venues import load_venues
+from analytics import in_restock_window
+from discovery import VenueDiscovery
+from health import VenueHealth
+from opening_hours import OpeningHours, parse_opening_times
+from metrics import (REGISTRY, MetricsServer, CHECKS, CYCLE_SECONDS, VENUE_CHECK_SECONDS,
+                     VENUE_INTERVAL_SECONDS, VENUES_PARKED, CHECKS_SKIPPED)
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('product_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configured in main() (see logs.setup_logging), not on import
 logger = logging.getLogger(__name__)
 
 
+def startup_fingerprint():
+    """Hash of the settings the startup check and message depend on, to tell whether they changed."""
+    settings = [Config.TELEGRAM_BOT_TOKEN, Config.TELEGRAM_CHAT_ID, Config.PRODUCT_NAME,
+                Config.CHECK_INTERVAL_MINUTES, Config.LOCATIONS, Config.DISCOVERY]
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def venue_label(venue):
+    """Metric label of a venue: its slug, or its URL when it has none."""
+    return venue.get('slug') or venue['url']
+
+
+class ScraperSet:
+    """The scraper backends of one process, each created on first use.
+
+    Used by ProductMonitor directly, and by every worker process in sharded
+    mode (see sharding.ShardPool, which offers the same scrape() / close()).
+    """
+
+    def __init__(self, fingerprints=None, profile_dir=None):
+        self.browser = None
+        self.api = None
+        # Shared by both backends; their keys (venue slug / page URL) never clash
+        self.fingerprints = fingerprints
+        # Persistent browser profile directory, None for a fresh profile per browser start
+        self.profile_dir = profile_dir
+        # Venue jobs call get() from several executor threads at once
+        self._lock = threading.Lock()
+
+    def scrape(self, venues):
+        """
+        Check the given venues with their backends.
+
+        Returns:
+            list: (venue, item results) pairs for the venues that could be checked
+        """
+        # Group venues by backend so each backend checks its share concurrently
+        by_backend = {}
+        for venue in venues:
+            by_backend.setdefault(venue['backend'] or Config.SCRAPER_BACKEND, []).append(venue)
+
+        checked = []
+        for backend, venues in by_backend.items():
+            try:
+                results = self.get(backend).check_venues(venues)
+            except Exception as e:
+                logger.error(f"Error running {backend} backend: {e}")
+                continue
+            checked.extend(zip(venues, results))
+        return checked
+
+    def get(self, name):
+        """Return the ready-to-use scraper for a backend name ('browser', 'api' or 'auto')."""
+        if name == 'browser':
+            scraper = self._get_browser()
+            scraper.ensure_healthy()
+            return scraper
+
+        with self._lock:
+            if self.api is None:
+                from api_scraper import WoltApiScraper
+                self.api = WoltApiScraper(max_concurrency=Config.MAX_CONCURRENT_CHECKS,
+                                          fingerprints=self.fingerprints)
+            self.api.ensure_healthy()
+
+        if name == 'api':
+            return self.api
+        # The browser is only launched once the API actually fails
+        from backends import FallbackScraper
+        return FallbackScraper(self.api, self._get_browser())
+
+    def _get_browser(self):
+        """Return the long-lived browser scraper without starting it."""
+        with self._lock:
+            if self.browser is None:
+                from scraper import WoltScraper, BrowserProfile
+                from extraction import ExtractionRules, DEFAULT_OUT_OF_STOCK_INDICATORS, DEFAULT_CONTAINER_SELECTORS
+                self.browser = WoltScraper(
+                    headless=True,
+                    max_concurrency=Config.MAX_CONCURRENT_CHECKS,
+                    max_per_host=Config.MAX_CHECKS_PER_HOST,
+                    host_delay=Config.HOST_DELAY_SECONDS,
+                    max_pages=Config.BROWSER_MAX_PAGES or None,
+                    max_rss_mb=Config.BROWSER_MAX_RSS_MB or None,
+                    resource_filter=self._build_resource_filter(),
+                    extraction_rules=ExtractionRules(
+                        out_of_stock_indicators=Config.split_list(Config.OUT_OF_STOCK_INDICATORS) or DEFAULT_OUT_OF_STOCK_INDICATORS,
+                        container_selectors=Config.split_list(Config.PRODUCT_CONTAINER_SELECTORS) or DEFAULT_CONTAINER_SELECTORS
+                    ),
+                    fingerprints=self.fingerprints,
+                    profile=BrowserProfile(self.profile_dir, Config.BROWSER_PROFILE_MAX_MB) if self.profile_dir else None
+                )
+            return self.browser
+
+    def _build_resource_filter(self):
+        """Build the browser's resource filter from the configuration."""
+        if not Config.BLOCK_RESOURCES:
+            return None
+        from scraper import ResourceFilter
+        blocked_domains = ResourceFilter.DEFAULT_BLOCKED_DOMAINS + tuple(Config.split_list(Config.BLOCKED_DOMAINS))
+        return ResourceFilter(
+            blocked_types=Config.split_list(Config.BLOCKED_RESOURCE_TYPES),
+            blocked_domains=blocked_domains,
+            allowed_domains=Config.split_list(Config.ALLOWED_DOMAINS)
+        )
+
+    def log_stats(self):
+        """Log browser traffic, cache and unchanged-page totals."""
+        if self.browser:
+            totals = self.browser.page_totals
+            logger.info(f"Browser traffic so far: {totals.requests} requests, "
+                        f"{totals.requests_blocked} blocked, {totals.bytes_loaded / 1024:.0f} KB loaded")
+            if totals.responses:
+                logger.info(f"Browser cache so far: {totals.cache_hit_ratio:.0%} of {totals.responses} responses "
+                            f"from cache, {totals.bytes_fetched / totals.pages / 1024:.0f} KB fetched per page")
+        if self.fingerprints:
+            logger.info(f"Unchanged pages so far: {self.fingerprints.hits} skipped, "
+                        f"{self.fingerprints.misses} parsed")
+
+    def close(self):
+        """Close the backends that were started."""
+        if self.browser:
+            self.browser.close()
+        if self.api:
+            self.api.close()
+
+
 class ProductMonitor:
     """Main product monitoring class."""
 
     def __init__(self):
         self.db = Database()
-        self.notifier = TelegramNotifier()
-        self.scraper = None
+        # Created on first use, see the notifier and alerts properties
+        self._notifier = None
+        self._alerts = None
+        if Config.SHARDS > 1:
+            # Worker processes scrape, this process stays the only database writer
+            from sharding import ShardPool
+            self.scrapers = ShardPool(Config.SHARDS, max_restarts=Config.SHARD_MAX_RESTARTS,
+                                      venue_timeout=Config.SHARD_VENUE_TIMEOUT_SECONDS,
+                                      concurrency=Config.MAX_CONCURRENT_CHECKS)
+        else:
+            self.scrapers = ScraperSet(FingerprintCache() if Config.SKIP_UNCHANGED_PAGES else None,
+                                       profile_dir=Config.BROWSER_PROFILE_DIR or None)
+        self.discovery = VenueDiscovery(self.db) if Config.DISCOVERY else None
+        self.venues = self._load_venues()
+        self.scheduler = None
+        # Venue URL -> monotonic time of its last availability change
+        self.last_change = {}
+        self.started_at = time.monotonic()
+        # Scheduler mode: start of the current round and the venues yet to run in it
+        self._round_started = None
+        self._round_left = set()
+        # Location name -> hours of the week it has repeatedly restocked in
+        self.restock_windows = {}
+        self.metrics_server = None
+        self.health = VenueHealth(
+            base_delay=Config.FAILURE_BACKOFF_MINUTES * 60,
+            max_delay=Config.FAILURE_BACKOFF_MAX_MINUTES * 60,
+            failure_threshold=Config.CIRCUIT_BREAKER_FAILURES,
+            probe_interval=Config.CIRCUIT_BREAKER_PROBE_MINUTES * 60
+        )
+        # Venue URL -> OpeningHours, for the venues whose hours are known
+        self.opening_hours = {}
+        # Venue URL -> (failed fetches, time of the next attempt), for venues
+        # whose hours could not be read or are not listed
+        self._hours_retry = {}
+        self._hours_api = None
+        self._load_opening_hours()
+
+    @property
+    def notifier(self):
+        """The Telegram notifier, created (and requests imported) on first use."""
+        if self._notifier is None:
+            from notifier import TelegramNotifier
+            self._notifier = TelegramNotifier()
+        return self._notifier
+
+    @notifier.setter
+    def notifier(self, notifier):
+        self._notifier = notifier
+
+    @property
+    def alerts(self):
+        """The alert outbox and its delivery thread, created on first use."""
+        if self._alerts is None:
+            from notifier import NotificationQueue
+            self._alerts = NotificationQueue(self.notifier, digest_window=Config.NOTIFICATION_DIGEST_SECONDS)
+        return self._alerts
+
+    @alerts.setter
+    def alerts(self, alerts):
+        self._alerts = alerts
+
+    def _load_venues(self):
+        """Venues to check: the configured locations plus the known venues of discovered brands."""
+        locations = list(Config.LOCATIONS)
+        if self.discovery:
+            locations.extend(self.discovery.locations())
+        return load_venues(locations, Config.PRODUCT_NAME)
 
     def check_all_locations(self):
         """Check product availability at all configured locations."""
         logger.info(f"Starting check cycle at {datetime.now()}")
 
-        # Initialize scraper for this check cycle
-        with WoltScraper(headless=True) as scraper:
-            for location in Config.LOCATIONS:
-                try:
-                    self._check_location(location, scraper)
-                    time.sleep(2)  # Be nice to the server
-                except Exception as e:
-                    logger.error(f"Error checking location {location['name']}: {e}")
+        if Config.OPENING_HOURS:
+            self._store_opening_hours(*self._fetch_opening_hours(self._stale_opening_hours()))
 
+        # Closed venues and failing ones sitting out their backoff are not loaded
+        venues = []
+        closed = backoff = 0
+        for venue in self.venues:
+            if self._closed_wait(venue):
+                closed += 1
+            elif not self.health.allow(venue['url']):
+                backoff += 1
+            else:
+                venues.append(venue)
+        if closed or backoff:
+            CHECKS_SKIPPED.inc(closed, reason='closed')
+            CHECKS_SKIPPED.inc(backoff, reason='backoff')
+            logger.info(f"Skipped {closed + backoff} of {len(self.venues)} venue check(s): "
+                        f"{closed} closed, {backoff} failing")
+
+        with CYCLE_SECONDS.time():
+            self._process(self._scrape(venues))
+            if self._alerts:
+                self._alerts.flush()
+
+        self.scrapers.log_stats()
         logger.info("Check cycle completed")
 
-    def _check_location(self, location, scraper):
-        """Check a single location for product availability."""
-        location_name = location['name']
-        location_url = location['url']
+    def _scrape(self, venues):
+        """
+        Check the given venues with their backends.
+
+        Returns:
+            list: (venue, item results) pairs for the venues that could be checked
+        """
+        return self.scrapers.scrape(venues)
+
+    def _process(self, checked):
+        """Store scraped results and send notifications, remembering which venues changed."""
+        unchanged = 0
+        total = 0
+        # One transaction for all results of the cycle
+        with self.db.batch():
+            for venue, item_results in checked:
+                # A venue fails when none of its items could be checked; no
+                # results say nothing about it
+                if item_results:
+                    self.health.record(venue['url'], not all(result['error'] for result in item_results))
+                for item, result in zip(venue['items'], item_results):
+                    total += 1
+                    if result.get('unchanged'):
+                        # Same page as last time: nothing to store or notify
+                        unchanged += 1
+                        CHECKS.inc(location=venue_label(venue), result='unchanged')
+                        continue
+                    if result['error']:
+                        outcome = 'error'
+                    else:
+                        outcome = 'available' if result['available'] else 'sold_out'
+                    CHECKS.inc(location=venue_label(venue), result=outcome)
+                    try:
+                        if self._check_item(venue, item, result):
+                            self.last_change[venue['url']] = time.monotonic()
+                    except Exception as e:
+                        logger.error(f"Error checking {item['name']} at {venue['name']}: {e}")
+        if unchanged:
+            logger.info(f"Skipped {unchanged} of {total} result(s) unchanged since the last check")
+        VENUES_PARKED.set(len(self.health.parked()))
+
+    def _interval_for(self, venue):
+        """
+        Polling interval for a venue in seconds.
+
+        Venues whose availability changed recently, or that are around an
+        hour of the week they usually restock in, are polled faster; ones
+        that have not changed for a long time slower, keeping the total
+        request volume about the same while catching flips sooner.
+        """
+        changed_at = self.last_change.get(venue['url'])
+        if changed_at is not None and time.monotonic() - changed_at < Config.HOT_PERIOD_MINUTES * 60:
+            return Config.CHECK_INTERVAL_HOT_MINUTES * 60
+        if in_restock_window(self.restock_windows, venue['name']):
+            return Config.CHECK_INTERVAL_HOT_MINUTES * 60
+        if self._around_opening(venue):
+            return Config.CHECK_INTERVAL_HOT_MINUTES * 60
+        if time.monotonic() - (changed_at or self.started_at) > Config.STALE_AFTER_HOURS * 3600:
+            return Config.CHECK_INTERVAL_STALE_MINUTES * 60
+        return Config.CHECK_INTERVAL_MINUTES * 60
+
+    async def _check_venue_job(self, venue):
+        """Scheduled check of a single venue."""
+        wait = self._closed_wait(venue)
+        if wait:
+            CHECKS_SKIPPED.inc(reason='closed')
+            if Config.CLOSED_CHECK_INTERVAL_MINUTES:
+                wait = min(wait, Config.CLOSED_CHECK_INTERVAL_MINUTES * 60)
+            logger.info(f"{venue['name']} is closed, next check in {wait / 60:.0f} min")
+            self.scheduler.postpone(venue['url'], wait)
+            self._count_round(venue['url'])
+            return
+
+        # A run that came early during a backoff (e.g. after a shorter
+        # interval was set) waits; an allowed check of a parked venue is its
+        # probe, moving its circuit to half-open
+        if not self.health.allow(venue['url']):
+            CHECKS_SKIPPED.inc(reason='backoff')
+            self.scheduler.postpone(venue['url'], self.health.wait_time(venue['url']))
+            self._count_round(venue['url'])
+            return
+
+        # Scraping blocks, so it runs on a worker thread; results are
+        # processed here on the event loop, one venue at a time
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with VENUE_CHECK_SECONDS.time(location=venue_label(venue)):
+            checked = await loop.run_in_executor(None, self._scrape, [venue])
+            self._process(checked)
+        interval = self._interval_for(venue)
+        VENUE_INTERVAL_SECONDS.set(interval, location=venue_label(venue))
+        self.scheduler.set_interval(venue['url'], interval)
+        # A failing venue waits out its backoff (or its next probe) first
+        delay = self.health.retry_delay(venue['url'])
+        if delay:
+            self.scheduler.postpone(venue['url'], delay)
+        self._count_round(venue['url'])
+
+    def _count_round(self, url):
+        """Mark a venue's job as run; once every venue's has, observe the round in CYCLE_SECONDS."""
+        self._round_left.discard(url)
+        if not self._round_left and self._round_started is not None:
+            now = time.monotonic()
+            CYCLE_SECONDS.observe(now - self._round_started)
+            self._start_round(now)
+
+    def _start_round(self, now=None):
+        self._round_started = time.monotonic() if now is None else now
+        self._round_left = {venue['url'] for venue in self.venues}
+
+    def _update_restock_windows(self):
+        """Recompute the likely restock windows from the history."""
+        if not Config.RESTOCK_MIN_EVENTS:
+            return
+        from analytics import AvailabilityAnalytics
+        self.restock_windows = AvailabilityAnalytics(self.db).restock_windows()
+        if self.restock_windows:
+            logger.info(f"Likely restock windows known for {len(self.restock_windows)} location(s)")
 
-        logger.info(f"Checking {location_name}...")
+    async def _maintenance_job(self):
+        """Scheduled history retention and compaction, then a refresh of the restock windows."""
+        # Runs on the event loop like _process, so it never shares the
+        # connection with a write in progress
+        self.db.maintain()
+        self.db.set_setting('last_maintenance', time.time())
+        self._update_restock_windows()
 
-        # Get the last check for this location
-        last_check = self.db.get_last_check(location_name)
+    def _closed_wait(self, venue):
+        """
+        Seconds until a closed venue is worth checking again (its opening minus
+        the ramp-up time); 0 when it is open, opening soon or its hours are unknown.
+        """
+        hours = self.opening_hours.get(venue['url'])
+        if not Config.OPENING_HOURS or hours is None:
+            return 0
+        wait = hours.seconds_until_open()
+        if wait is None:
+            # Listed without any opening hours: closed until they are refreshed
+            return Config.OPENING_HOURS_REFRESH_HOURS * 3600
+        return max(0, wait - Config.OPENING_RAMP_MINUTES * 60)
 
-        # Check current availability
-        result = scraper.check_product_availability(location_url)
+    def _around_opening(self, venue):
+        """Whether the venue opens within, or opened less than, OPENING_RAMP_MINUTES ago."""
+        hours = self.opening_hours.get(venue['url'])
+        if not Config.OPENING_HOURS or hours is None:
+            return False
+        ramp = Config.OPENING_RAMP_MINUTES * 60
+        since = hours.seconds_since_open()
+        if since is not None:
+            return since < ramp
+        wait = hours.seconds_until_open()
+        return wait is not None and wait <= ramp
+
+    def _load_opening_hours(self):
+        """Read the stored opening hours of all venues."""
+        self.opening_hours = {url: OpeningHours(intervals, tz)
+                              for url, (tz, intervals, _) in self.db.get_opening_hours().items()}
+
+    def _stale_opening_hours(self):
+        """
+        Venues whose opening hours were never fetched or are older than
+        OPENING_HOURS_REFRESH_HOURS, leaving out those waiting to retry a
+        fetch that found no hours.
+        """
+        fetched = {url: fetched_at for url, (_, _, fetched_at) in self.db.get_opening_hours().items()}
+        now = time.time()
+        cutoff = now - Config.OPENING_HOURS_REFRESH_HOURS * 3600
+        return [venue for venue in self.venues
+                if venue.get('slug') and fetched.get(venue['url'], 0) < cutoff
+                and self._hours_retry.get(venue['url'], (0, 0))[1] <= now]
+
+    def _fetch_opening_hours(self, venues):
+        """
+        Fetch the opening hours of venues from the venue info endpoint, without touching the database.
+
+        Returns:
+            tuple: (schedules, missing): (venue URL, timezone, intervals)
+            for the venues whose hours could be read, and the URLs of the
+            others with whether the fetch failed (False: no hours listed)
+        """
+        if self._hours_api is None:
+            from api_scraper import WoltApiScraper
+            self._hours_api = WoltApiScraper()
+        schedules = []
+        missing = []
+        for venue in venues:
+            try:
+                parsed = parse_opening_times(self._hours_api.fetch_venue_info(venue['slug']))
+            except Exception as e:
+                logger.warning(f"Could not fetch opening hours of {venue['name']}: {e}")
+                missing.append((venue['url'], True))
+                continue
+            if parsed is None:
+                logger.info(f"No opening hours listed for {venue['name']}")
+                missing.append((venue['url'], False))
+                continue
+            schedules.append((venue['url'], parsed[0], parsed[1]))
+        return schedules, missing
+
+    def _store_opening_hours(self, schedules, missing=()):
+        """
+        Store fetched opening hours and start using them. Venues in
+        ``missing`` stay unrestricted; a failed fetch is retried with
+        exponential backoff from FAILURE_BACKOFF_MINUTES, unlisted hours
+        after OPENING_HOURS_REFRESH_HOURS.
+        """
+        for url, tz, intervals in schedules:
+            self._hours_retry.pop(url, None)
+            self.db.set_opening_hours(url, tz, intervals)
+            hours = self.opening_hours[url] = OpeningHours(intervals, tz)
+            logger.info(f"Opening hours of {url}: {hours.describe()}")
+        refresh = Config.OPENING_HOURS_REFRESH_HOURS * 3600
+        for url, failed in missing:
+            failures = self._hours_retry.get(url, (0, 0))[0] + 1
+            delay = min(Config.FAILURE_BACKOFF_MINUTES * 60 * 2 ** (failures - 1), refresh) if failed else refresh
+            self._hours_retry[url] = (failures, time.time() + delay)
+
+    async def _opening_hours_job(self):
+        """Scheduled refresh of the opening hours that are missing or out of date."""
+        stale = self._stale_opening_hours()
+        if not stale:
+            return
+        # Fetched on a worker thread, stored on the event loop like the check results
+        import asyncio
+        loop = asyncio.get_running_loop()
+        schedules, missing = await loop.run_in_executor(None, self._fetch_opening_hours, stale)
+        self._store_opening_hours(schedules, missing)
+
+    async def _discovery_job(self):
+        """Scheduled venue discovery: rescrape stale brand pages and (un)schedule the venues that changed."""
+        stale = self.discovery.stale_brands()
+        if not stale:
+            return
+        # Brand pages are scraped on a worker thread; the database is only
+        # written here on the event loop, like the check results
+        import asyncio
+        loop = asyncio.get_running_loop()
+        listings = await loop.run_in_executor(None, self.discovery.fetch, stale)
+        added, removed = self.discovery.store(listings)
+        if added or removed:
+            self._sync_venues()
+
+    def _sync_venues(self):
+        """Reload the venue list and schedule new venues, unscheduling ones that are gone."""
+        venues = self._load_venues()
+        known = {venue['url'] for venue in self.venues}
+        current = {venue['url'] for venue in venues}
+        for venue in venues:
+            if venue['url'] not in known:
+                self._schedule_venue(venue)
+        for url in known - current:
+            self.scheduler.remove(url)
+            self._round_left.discard(url)
+        self.venues = venues
+        logger.info(f"Now monitoring {len(self.venues)} venue(s): "
+                    f"{len(current - known)} added, {len(known - current)} removed")
+
+    def _schedule_venue(self, venue):
+        self.scheduler.add(
+            venue['url'],
+            lambda venue=venue: self._check_venue_job(venue),
+            Config.CHECK_INTERVAL_MINUTES * 60
+        )
+
+    def _recipients(self, venue, product_name):
+        """Chats to alert about an item: the configured chat, then the item's subscribers."""
+        chat_ids = [str(Config.TELEGRAM_CHAT_ID)] if Config.TELEGRAM_CHAT_ID else []
+        chat_ids.extend(self.db.get_subscribers(venue['url'], product_name))
+        return list(dict.fromkeys(chat_ids))
+
+    def _check_item(self, venue, item, result):
+        """
+        Process the check result for a single tracked item at a venue.
+
+        Returns:
+            bool: True if the item's availability changed since the last check
+        """
+        location_name = venue['name']
+        location_url = item['url']
+        product_name = item['name']
+
+        logger.info(f"Checking {product_name} at {location_name}...")
+
+        # Get the last check for this item
+        last_check = self.db.get_last_check(location_name, product_name)
 
         if result['error']:
             logger.error(f"Error checking {location_name}: {result['error']}")
-            return
+            return False
 
         # Save to database
         self.db.add_check(
             location_name=location_name,
             location_url=location_url,
-            product_name=Config.PRODUCT_NAME,
+            product_name=product_name,
             is_available=result['available'],
             price=result['price']
         )
@@ -79,16 +571,24 @@ class ProductMonitor:
         )
 
         if should_notify:
-            logger.info(f"🎉 Product became available at {location_name}!")
-            self.notifier.send_availability_alert_sync(
-                location_name=location_name,
-                location_url=location_url,
-                product_name=Config.PRODUCT_NAME,
-                price=result['price']
-            )
+            logger.info(f"🎉 {product_name} became available at {location_name}!")
+            alert = {
+                'location_name': location_name,
+                'location_url': location_url,
+                'product_name': product_name,
+                'price': result['price'],
+                'chat_ids': self._recipients(venue, product_name)
+            }
+            # The outbox is written on its own connection, which would wait
+            # on the cycle's write lock, so the alert is queued after commit
+            self.db.after_commit(lambda: self.alerts.enqueue(**alert))
         else:
             status = "available" if result['available'] else "not available"
-            logger.info(f"{location_name}: {status}")
+            # Repeated "not available" lines of an item are sampled with LOG_SAMPLE_EVERY
+            logger.info(f"{location_name} - {product_name}: {status}",
+                        extra={'sample_key': (location_url, product_name), 'sampled': not result['available']})
+
+        return last_check is not None and last_check.is_available != result['available']
 
     def run(self):
         """Run the monitoring loop."""
@@ -103,34 +603,28 @@ class ProductMonitor:
             logger.error(f"Configuration error: {e}")
             return
 
-        # Test Telegram connection
-        if not self.notifier.test_connection_sync():
-            logger.error("Failed to connect to Telegram. Please check your bot token and chat ID.")
+        # Test the Telegram connection and send the startup notification
+        if not self._announce_startup():
             return
 
-        # Send startup notification
-        self.notifier.send_startup_message_sync()
+        # Deliver alerts in the background, starting with any left from the last run
+        self.alerts.start()
+
+        self._start_metrics()
 
-        logger.info(f"Monitoring {len(Config.LOCATIONS)} location(s)")
+        item_count = sum(len(venue['items']) for venue in self.venues)
+        logger.info(f"Monitoring {item_count} item(s) at {len(self.venues)} venue(s)")
         logger.info(f"Check interval: {Config.CHECK_INTERVAL_MINUTES} minutes")
+        logger.info(f"Concurrent checks: {Config.MAX_CONCURRENT_CHECKS}")
+        logger.info(f"Scraper backend: {Config.SCRAPER_BACKEND}")
         logger.info(f"Product: {Config.PRODUCT_NAME}")
 
-        # Do an initial check immediately
-        try:
-            self.check_all_locations()
-        except Exception as e:
-            logger.error(f"Error in initial check: {e}")
-
-        # Schedule periodic checks
-        schedule.every(Config.CHECK_INTERVAL_MINUTES).minutes.do(self.check_all_locations)
-
         logger.info("Entering monitoring loop... (Press Ctrl+C to stop)")
 
         # Run the scheduler
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(10)
+            import asyncio
+            asyncio.run(self._run_scheduler())
         except KeyboardInterrupt:
             logger.info("Monitoring stopped by user")
         except Exception as e:
@@ -138,15 +632,125 @@ class ProductMonitor:
         finally:
             self.cleanup()
 
+    def run_once(self):
+        """
+        Run a single check cycle and return, for cron or systemd timers.
+
+        The Telegram connection test and startup message are skipped while
+        the settings they depend on are unchanged since the last start, and
+        discovery and maintenance only run when they are due.
+
+        Returns:
+            int: Exit status, 0 on success
+        """
+        try:
+            Config.validate()
+        except ValueError as e:
+            logger.error(f"Configuration error: {e}")
+            return 2
+
+        try:
+            if not self._announce_startup(only_if_changed=True):
+                return 1
+            if Config.METRICS_JSON_LOG:
+                REGISTRY.enable_json_log(Config.METRICS_JSON_LOG)
+
+            if self.discovery and any(self.discovery.refresh()):
+                self.venues = self._load_venues()
+            self.check_all_locations()
+
+            last_maintenance = float(self.db.get_setting('last_maintenance', 0))
+            if Config.MAINTENANCE_INTERVAL_HOURS and \
+                    time.time() - last_maintenance >= Config.MAINTENANCE_INTERVAL_HOURS * 3600:
+                self.db.maintain()
+                self.db.set_setting('last_maintenance', time.time())
+
+            # Alerts an earlier run could not deliver are retried now
+            if self._alerts is None and self.db.pending_notifications():
+                self.alerts.start()
+            return 0
+        finally:
+            # Delivers the queued alerts before returning
+            self.cleanup()
+
+    def _announce_startup(self, only_if_changed=False):
+        """
+        Test the Telegram connection and send the startup message.
+
+        Args:
+            only_if_changed: Skip both when the settings are the same as at the last start
+
+        Returns:
+            bool: False if Telegram could not be reached
+        """
+        fingerprint = startup_fingerprint()
+        if only_if_changed and self.db.get_setting('startup_fingerprint') == fingerprint:
+            logger.info("Settings unchanged since the last start, skipping the Telegram check")
+            return True
+
+        if not self.notifier.test_connection_sync():
+            logger.error("Failed to connect to Telegram. Please check your bot token and chat ID.")
+            return False
+        self.notifier.send_startup_message_sync()
+        self.db.set_setting('startup_fingerprint', fingerprint)
+        return True
+
+    async def _run_scheduler(self):
+        """Schedule every venue on its own interval and run until interrupted."""
+        from scheduler import AsyncScheduler
+        self.scheduler = AsyncScheduler(
+            jitter=Config.SCHEDULE_JITTER,
+            start_jitter=Config.SCHEDULE_START_JITTER_SECONDS,
+            missed_run_policy=Config.MISSED_RUN_POLICY
+        )
+        self._update_restock_windows()
+        for venue in self.venues:
+            self._schedule_venue(venue)
+        self._start_round()
+        if self.discovery:
+            # Its first run, within the start jitter, discovers brands not seen before
+            self.scheduler.add('discovery', self._discovery_job, Config.DISCOVERY_REFRESH_HOURS * 3600)
+        if Config.OPENING_HOURS:
+            self.scheduler.add('opening_hours', self._opening_hours_job, Config.OPENING_HOURS_REFRESH_HOURS * 3600)
+        if Config.MAINTENANCE_INTERVAL_HOURS:
+            self.scheduler.add('maintenance', self._maintenance_job, Config.MAINTENANCE_INTERVAL_HOURS * 3600)
+        await self.scheduler.run()
+
+    def _start_metrics(self):
+        """Serve /metrics and write the JSON metrics log if configured."""
+        if Config.METRICS_JSON_LOG:
+            REGISTRY.enable_json_log(Config.METRICS_JSON_LOG)
+        if Config.METRICS_PORT:
+            try:
+                self.metrics_server = MetricsServer(Config.METRICS_HOST, Config.METRICS_PORT)
+                self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Could not start metrics endpoint on port {Config.METRICS_PORT}: {e}")
+
     def cleanup(self):
         """Clean up resources."""
         logger.info("Cleaning up...")
+        if self.metrics_server:
+            self.metrics_server.close()
+        self.scrapers.close()
+        if self._hours_api:
+            self._hours_api.close()
+        if self._alerts:
+            self._alerts.close()
         self.db.close()
 
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Wolt product availability monitor')
+    parser.add_argument('--once', action='store_true',
+                        help='Run one check cycle and exit, e.g. from cron or a systemd timer')
+    args = parser.parse_args()
+
+    logs.setup_logging()
     monitor = ProductMonitor()
+    if args.once:
+        raise SystemExit(monitor.run_once())
     monitor.run()
 
 
@@ -0,0 +1,314 @@
+"""In-process performance metrics with a Prometheus-style HTTP endpoint.
+
+Counters, gauges and histograms are kept in a Registry and rendered in the
+Prometheus text format by MetricsServer (``/metrics``). Every observation
+can also be written as one JSON line to a separate log file, for offline
+analysis without a Prometheus server.
+
+The metrics the monitor records are defined at the bottom of this module;
+time a block with ``with PHASE_SECONDS.time(phase='page_goto', location=slug):``.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+import logs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Base class of the metric types: a value per combination of label values."""
+
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"Unknown label(s) for {self.name}: {', '.join(sorted(unknown))}")
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        """Lines of this metric in the Prometheus text format, without HELP/TYPE."""
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                    for key, value in sorted(self._values.items())]
+
+    def drain(self):
+        """Take the values recorded since the last drain (see Registry.drain)."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. errors seen."""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.emit(self.name, labels, amount)
+
+    def merge(self, values, source=None):
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that is set to the current reading, e.g. memory in use."""
+
+    type = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        super().__init__(registry, name, documentation, labelnames)
+        # Source -> its latest merged readings
+        self._sources = {}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        self.registry.emit(self.name, labels, value)
+
+    def drain(self):
+        # A reading stays current until it is set again
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, values, source=None):
+        """Set each reading to the sum of the latest ones of every source."""
+        with self._lock:
+            previous = self._sources.pop(source, {})
+            if values:
+                self._sources[source] = values
+            for key in set(previous) | set(values):
+                self._values[key] = sum(readings.get(key, 0) for readings in self._sources.values())
+
+
+class Histogram(Metric):
+    """Observed values counted into cumulative buckets, with their sum and count."""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._values[key] = (counts, total + value)
+        self.registry.emit(self.name, labels, value)
+
+    def merge(self, values, source=None):
+        with self._lock:
+            for key, (counts, total) in values.items():
+                merged, merged_total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+                self._values[key] = ([a + b for a, b in zip(merged, counts)], merged_total + total)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent in the block, in seconds (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds metrics, renders them and optionally logs every observation as JSON."""
+
+    def __init__(self):
+        self.metrics = []
+        self._json_logger = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def drain(self):
+        """
+        Take what was recorded since the last drain, for merging into the
+        registry of another process: {metric name: {label values: value}}.
+        Counters and histograms start again from zero.
+        """
+        return {metric.name: values for metric in self.metrics for values in [metric.drain()] if values}
+
+    def merge(self, drained, source=None):
+        """
+        Add values drained from another process's registry. Gauges read
+        the sum over sources of each one's latest readings; merge an empty
+        dict to drop a source that is gone.
+        """
+        for metric in self.metrics:
+            if metric.name in drained or isinstance(metric, Gauge):
+                metric.merge(drained.get(metric.name, {}), source)
+
+    def enable_json_log(self, path):
+        """
+        Append every observation to ``path`` as a JSON line: {"ts", "metric", "value", labels...}.
+        Lines are written on a listener thread (see logs.queued()), so observing never waits for the disk.
+        """
+        if self._json_logger is not None:
+            return
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        json_logger = logging.getLogger(f'{__name__}.json')
+        json_logger.setLevel(logging.INFO)
+        json_logger.propagate = False
+        json_logger.addHandler(logs.queued(handler))
+        self._json_logger = json_logger
+
+    def emit(self, name, labels, value):
+        if self._json_logger is not None:
+            self._json_logger.info(json.dumps(dict(labels, ts=round(time.time(), 3), metric=name, value=value),
+                                              ensure_ascii=False))
+
+
+class MetricsHandler:
+    """Serves the registry at /metrics (mixed into BaseHTTPRequestHandler by MetricsServer)."""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class MetricsServer:
+    """Runs the metrics HTTP endpoint on a background thread."""
+
+    def __init__(self, host='127.0.0.1', port=9108, registry=None):
+        # Imported here: http.server is slow to import and only the endpoint needs it
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        handler = type('MetricsHandler', (MetricsHandler, BaseHTTPRequestHandler), {})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.registry = registry or REGISTRY
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """Start serving in the background."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        logger.info(f"Metrics available at {self.url}")
+
+    def close(self):
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+REGISTRY = Registry()
+
+# Phases: browser_start, page_open, page_goto, page_ready, page_extract,
+# api_fetch, parse, db_write, db_commit, db_maintenance, telegram_send
+PHASE_SECONDS = REGISTRY.histogram(
+    'wolt_phase_seconds', 'Time spent per phase of a check, by location (venue slug) where known',
+    ('phase', 'location'))
+VENUE_CHECK_SECONDS = REGISTRY.histogram(
+    'wolt_venue_check_seconds', 'Duration of a scheduled check of one venue, scraping and processing',
+    ('location',))
+VENUE_INTERVAL_SECONDS = REGISTRY.gauge(
+    'wolt_venue_interval_seconds', 'Current polling interval of a venue', ('location',))
+CYCLE_SECONDS = REGISTRY.histogram(
+    'wolt_cycle_seconds', 'Duration of a full check cycle over all venues; with the scheduler, '
+    'of a round in which every venue had its turn')
+CHECKS = REGISTRY.counter(
+    'wolt_checks_total', 'Item checks by outcome (available, sold_out, unchanged, error)', ('location', 'result'))
+ERRORS = REGISTRY.counter(
+    'wolt_errors_total', 'Errors by component (browser, api, telegram) and kind (timeout, error, rate_limited)',
+    ('component', 'kind'))
+BROWSER_RSS_BYTES = REGISTRY.gauge(
+    'wolt_browser_rss_bytes', 'Resident memory of the browser and Playwright driver processes')
+BROWSER_PAGES = REGISTRY.gauge(
+    'wolt_browser_pages_served', 'Pages opened since the browser was (re)started')
+BROWSER_RESPONSES = REGISTRY.counter(
+    'wolt_browser_responses_total', 'Responses received by the browser, by source (cache, network)', ('source',))
+BROWSER_FETCHED_BYTES = REGISTRY.counter(
+    'wolt_browser_fetched_bytes_total', 'Bytes the browser received over the network, headers included')
+BROWSER_PROFILE_BYTES = REGISTRY.gauge(
+    'wolt_browser_profile_cache_bytes', 'Size of the persistent browser profile caches at the last browser start')
+CHECKS_SKIPPED = REGISTRY.counter(
+    'wolt_checks_skipped_total', 'Venue checks skipped, by reason (closed, backoff)', ('reason',))
+VENUES_PARKED = REGISTRY.gauge(
+    'wolt_venues_parked', 'Venues whose circuit breaker is open after repeated failed checks')
+SHARD_VENUES = REGISTRY.counter(
+    'wolt_shard_venues_total', 'Venues checked per scraper shard (sharded mode)', ('shard',))
+SHARD_BUSY_SECONDS = REGISTRY.counter(
+    'wolt_shard_busy_seconds_total', 'Time each scraper shard spent checking venues', ('shard',))
+SHARD_RESTARTS = REGISTRY.counter(
+    'wolt_shard_restarts_total', 'Scraper shard worker deaths', ('shard',))
+SHARD_WORKERS = REGISTRY.gauge(
+    'wolt_shard_workers', 'Scraper shard worker processes currently up')
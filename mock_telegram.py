@@ -0,0 +1,189 @@
+"""Local mock of the Telegram Bot API, enforcing Telegram's flood limits.
+
+Answers getMe and sendMessage for any bot token and records every accepted
+message. Messages beyond ``rate`` per second overall, or sent to a chat
+less than ``chat_interval`` seconds after its previous one, are refused with
+HTTP 429 and a retry_after, like Telegram does. Chats listed in ``blocked``
+answer 403 as if they had blocked the bot, chats in ``failing`` answer 500,
+and messages containing one of the ``rejected`` strings are refused with
+400 as if their markup could not be parsed. Point the monitor at it with:
+
+    python mock_telegram.py --port 8766
+    TELEGRAM_API_URL=http://127.0.0.1:8766 python main.py
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class MockTelegramHandler(BaseHTTPRequestHandler):
+    """Serves /bot<token>/getMe and /bot<token>/sendMessage."""
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(body or '{}')
+        else:
+            params = {key: values[0] for key, values in parse_qs(body).items()}
+        self._handle(params)
+
+    def _handle(self, params):
+        method = self.path.split('?')[0].rsplit('/', 1)[-1]
+        if not self.path.startswith('/bot'):
+            self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        elif method == 'getMe':
+            self._reply(200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'username': 'mock_bot'}})
+        elif method == 'sendMessage':
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self._reply(*self.server.mock.send_message(str(params.get('chat_id')), params.get('text', '')))
+        else:
+            self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class MockTelegram:
+    """Runs the mock Bot API on a background thread and keeps what it received."""
+
+    def __init__(self, host='127.0.0.1', port=0, rate=30.0, chat_interval=1.0, blocked=(),
+                 latency=0.0, tolerance=0.1, failing=(), rejected=()):
+        """
+        Args:
+            rate: Messages accepted per second overall (0: unlimited)
+            chat_interval: Minimum seconds between two messages to one chat
+            blocked: Chat ids that answer 403
+            latency: Seconds every sendMessage takes
+            tolerance: Fraction of slack on both limits, for network jitter
+            failing: Chat ids that answer 500
+            rejected: Texts refused with 400 when a message contains them
+        """
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self.blocked = {str(chat_id) for chat_id in blocked}
+        self.failing = {str(chat_id) for chat_id in failing}
+        self.rejected = list(rejected)
+        self.tolerance = tolerance
+        # (monotonic time, chat id, text) of every accepted message
+        self.messages = []
+        self.rate_limited = 0
+        self.forbidden = 0
+        self.failed = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._last_by_chat = {}
+        self.httpd = ThreadingHTTPServer((host, port), MockTelegramHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.httpd.latency = latency
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def send_message(self, chat_id, text):
+        """
+        Accept or refuse one message.
+
+        Returns:
+            tuple: (HTTP status, response JSON)
+        """
+        with self._lock:
+            if chat_id in self.blocked:
+                self.forbidden += 1
+                return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+            if chat_id in self.failing:
+                self.failed += 1
+                return 500, {'ok': False, 'error_code': 500, 'description': 'Internal Server Error'}
+            if any(marker in text for marker in self.rejected):
+                self.refused += 1
+                return 400, {'ok': False, 'error_code': 400,
+                             'description': "Bad Request: can't parse entities"}
+
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            last = self._last_by_chat.get(chat_id)
+            too_fast = self.rate and len(self._recent) >= self.rate * (1 + self.tolerance)
+            chat_too_fast = last is not None and now - last < self.chat_interval * (1 - self.tolerance)
+            if too_fast or chat_too_fast:
+                self.rate_limited += 1
+                return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                             'parameters': {'retry_after': 1}}
+
+            self._recent.append(now)
+            self._last_by_chat[chat_id] = now
+            self.messages.append((now, chat_id, text))
+            return 200, {'ok': True, 'result': {'message_id': len(self.messages), 'chat': {'id': chat_id}}}
+
+    def chats(self):
+        """Chat id -> number of messages it received."""
+        with self._lock:
+            received = {}
+            for _, chat_id, _ in self.messages:
+                received[chat_id] = received.get(chat_id, 0) + 1
+            return received
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """Start serving in the background."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-telegram', daemon=True)
+        self.thread.start()
+        logger.info(f"Mock Telegram listening on {self.url}")
+
+    def close(self):
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--rate', type=float, default=30.0, help='Messages per second overall')
+    parser.add_argument('--chat-interval', type=float, default=1.0, help='Seconds between messages to one chat')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mock = MockTelegram(port=args.port, rate=args.rate, chat_interval=args.chat_interval)
+    print(f"Mock Telegram Bot API on {mock.url} (Ctrl+C to stop)")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.httpd.server_close()
+        print(f"{len(mock.messages)} message(s) accepted, {mock.rate_limited} rate limited")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,87 @@
 """Telegram notification handler using simple requests."""
+import html
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from config import Config
+from metrics import PHASE_SECONDS, ERRORS
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+# Seconds to wait for the monitor's writes to release the database, and
+# before the delivery thread retries after a database error
+BUSY_TIMEOUT = 30.0
+DATABASE_RETRY_SECONDS = 5.0
+
+
+class ChatUnavailable(Exception):
+    """The chat cannot receive messages: the bot was blocked or removed, or the chat does not exist."""
+
+
+class MessageRejected(Exception):
+    """Telegram refused the message itself (HTTP 4xx other than 429), so resending it cannot help."""
+
+
+class RateLimiter:
+    """Spaces out messages to stay within Telegram's flood limits.
+
+    At most ``rate`` messages per second go out overall, one per
+    ``chat_interval`` seconds to a private chat and one per
+    ``group_interval`` seconds to a group or channel (negative chat ids).
+    Thread-safe: every sender thread takes its slot from the same limiter.
+    """
+
+    def __init__(self, rate=30.0, chat_interval=1.0, group_interval=3.0):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        # Chat id -> earliest monotonic time of its next message
+        self._next_chat = {}
+
+    def acquire(self, chat_id):
+        """Wait until a message may be sent to ``chat_id``, and take that slot."""
+        chat_id = str(chat_id)
+        # Waiting for the chat first keeps its wait from holding up the global slots
+        wait = self._next_chat.get(chat_id, 0.0) - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + self.interval
+            interval = self.group_interval if chat_id.startswith('-') else self.chat_interval
+            self._next_chat[chat_id] = slot + interval
+            if len(self._next_chat) > 10000:
+                self._next_chat = {chat: at for chat, at in self._next_chat.items() if at > now}
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold every slot back for ``seconds``, e.g. for Telegram's retry_after."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def format_availability_alert(location_name, location_url, product_name, price=None):
+    """Format the body of one availability alert, escaped for parse_mode='HTML'."""
+    price_text = f"\n💰 Price: {html.escape(price)}" if price else ""
+    return (
+        f"📦 {html.escape(product_name)}\n"
+        f"📍 Location: {html.escape(location_name)}{price_text}\n\n"
+        f"🔗 <a href='{html.escape(location_url)}'>Order Now!</a>"
+    )
+
 
 class TelegramNotifier:
     """Handles sending notifications via Telegram using simple HTTP requests."""
@@ -12,7 +89,13 @@ class TelegramNotifier:
     def __init__(self):
         self.token = Config.TELEGRAM_BOT_TOKEN
         self.chat_id = Config.TELEGRAM_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self.base_url = f"{Config.TELEGRAM_API_URL.rstrip('/')}/bot{self.token}"
+        # One pooled session keeps the HTTPS connections to Telegram open,
+        # one per sender thread of the notification queue
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(10, Config.NOTIFICATION_SENDERS))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def send_message(self, message, parse_mode='HTML'):
         """
@@ -25,39 +108,89 @@ class TelegramNotifier:
         Returns:
             bool: True if successful, False otherwise
         """
+        try:
+            return self.deliver(message, parse_mode)[0]
+        except (ChatUnavailable, MessageRejected) as e:
+            logger.error(f"Failed to send message: {e}")
+            return False
+
+    def deliver(self, message, parse_mode='HTML', chat_id=None):
+        """
+        Send a message and report whether Telegram asked us to slow down.
+
+        Args:
+            chat_id: Chat to send to (default: the configured chat)
+
+        Returns:
+            tuple: (sent, retry_after) where retry_after is the number of
+            seconds Telegram asked to wait on HTTP 429, otherwise None
+
+        Raises:
+            ChatUnavailable: If the chat will never accept the message
+            MessageRejected: If Telegram refused this message, e.g. for
+                markup it cannot parse
+        """
+        chat_id = chat_id or self.chat_id
         try:
             url = f"{self.base_url}/sendMessage"
             data = {
-                'chat_id': self.chat_id,
+                'chat_id': chat_id,
                 'text': message
             }
             if parse_mode:
                 data['parse_mode'] = parse_mode
 
-            response = requests.post(url, data=data, timeout=10)
+            with PHASE_SECONDS.time(phase='telegram_send'):
+                response = self.session.post(url, data=data, timeout=10)
 
             if response.status_code == 200:
-                logger.info(f"Notification sent successfully")
-                return True
+                logger.debug(f"Notification sent to chat {chat_id}")
+                return True, None
+            elif response.status_code == 403 or (response.status_code == 400 and 'chat not found' in response.text):
+                ERRORS.inc(component='telegram', kind='chat_unavailable')
+                raise ChatUnavailable(f"chat {chat_id}: {response.text}")
+            elif response.status_code == 429:
+                try:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+                logger.warning(f"Telegram rate limit hit, retry after {retry_after}s")
+                ERRORS.inc(component='telegram', kind='rate_limited')
+                return False, retry_after
+            elif 400 <= response.status_code < 500:
+                ERRORS.inc(component='telegram', kind='rejected')
+                raise MessageRejected(f"HTTP {response.status_code}: {response.text}")
             else:
                 logger.error(f"Failed to send message. Status: {response.status_code}, Response: {response.text}")
-                return False
+                ERRORS.inc(component='telegram', kind='error')
+                return False, None
 
         except requests.RequestException as e:
             logger.error(f"Error sending Telegram message: {e}")
-            return False
+            ERRORS.inc(component='telegram', kind='timeout' if isinstance(e, requests.Timeout) else 'error')
+            return False, None
 
     def send_availability_alert(self, location_name, location_url, product_name, price=None):
         """Send a formatted availability alert."""
-        price_text = f"\n💰 Price: {price}" if price else ""
         message = (
             f"🎉 <b>PRODUCT AVAILABLE!</b> 🎉\n\n"
-            f"📦 {product_name}\n"
-            f"📍 Location: {location_name}{price_text}\n\n"
-            f"🔗 <a href='{location_url}'>Order Now!</a>"
+            + format_availability_alert(location_name, location_url, product_name, price)
         )
         return self.send_message(message)
 
+    def format_digest(self, alerts):
+        """Combine one or more availability alerts into a single message."""
+        if len(alerts) == 1:
+            header = "🎉 <b>PRODUCT AVAILABLE!</b> 🎉"
+        else:
+            header = f"🎉 <b>{len(alerts)} PRODUCTS AVAILABLE!</b> 🎉"
+        bodies = [
+            format_availability_alert(alert['location_name'], alert['location_url'],
+                                      alert['product_name'], alert.get('price'))
+            for alert in alerts
+        ]
+        return "\n\n".join([header] + bodies)
+
     def send_startup_message(self):
         """Send a message when the monitor starts."""
         message = (
@@ -72,7 +205,7 @@ class TelegramNotifier:
         """Test the Telegram bot connection."""
         try:
             url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -105,3 +238,264 @@ class TelegramNotifier:
     def test_connection_sync(self):
         """Test connection (compatibility method)."""
         return self.test_connection()
+
+
+class NotificationQueue:
+    """Delivers availability alerts from a background thread.
+
+    Alerts are written to an outbox table first, one row per recipient
+    chat, so they survive a restart until Telegram has accepted them.
+    Alerts arriving within ``digest_window`` seconds of each other are sent
+    to each chat as one digest message. Chats are served in parallel by
+    ``senders`` threads sharing one RateLimiter, so a fan-out to thousands
+    of subscribers stays within Telegram's limits. On HTTP 429 delivery
+    waits for Telegram's ``retry_after``; other failures are retried with
+    exponential backoff per chat, so one failing chat never holds up the
+    others. Chats that blocked the bot are unsubscribed, and alerts
+    Telegram refuses outright are logged and dropped.
+    """
+
+    def __init__(self, notifier, db_path=None, digest_window=10.0, max_backoff=300.0,
+                 senders=None, rate_limiter=None):
+        self.notifier = notifier
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.digest_window = digest_window
+        self.max_backoff = max_backoff
+        self.senders = Config.NOTIFICATION_SENDERS if senders is None else senders
+        self.rate_limiter = rate_limiter or RateLimiter(
+            rate=Config.TELEGRAM_RATE_LIMIT,
+            chat_interval=Config.TELEGRAM_CHAT_INTERVAL_SECONDS,
+            group_interval=Config.TELEGRAM_GROUP_INTERVAL_SECONDS
+        )
+        self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                chat_id TEXT
+            )
+        ''')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(notification_outbox)')]
+        if 'chat_id' not in columns:
+            # Outboxes from before subscriptions only held alerts for the configured chat
+            self.conn.execute('ALTER TABLE notification_outbox ADD COLUMN chat_id TEXT')
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush = threading.Event()
+        self._stop = threading.Event()
+        self._abort = threading.Event()
+        self._thread = None
+        self._pool = None
+        # Chat id -> monotonic time of its next attempt / its next backoff, for failing chats
+        self._retry_at = {}
+        self._backoff = {}
+
+    def start(self):
+        """Start the delivery thread; alerts left in the outbox are sent first."""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._worker, name='notification-queue', daemon=True)
+        self._thread.start()
+        if self.pending():
+            logger.info(f"Resending {self.pending()} alert(s) left in the outbox")
+            self._wakeup.set()
+
+    def enqueue(self, location_name, location_url, product_name, price=None, chat_ids=None):
+        """
+        Queue an availability alert for delivery; returns immediately.
+
+        Args:
+            chat_ids: Chats to send it to (default: the configured chat)
+        """
+        if self._thread is None:
+            self.start()
+        payload = json.dumps({
+            'location_name': location_name,
+            'location_url': location_url,
+            'product_name': product_name,
+            'price': price
+        })
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                'INSERT INTO notification_outbox (payload, created_at, chat_id) VALUES (?, ?, ?)',
+                [(payload, now, chat_id) for chat_id in (chat_ids or [None])]
+            )
+            self.conn.commit()
+        self._wakeup.set()
+
+    def flush(self):
+        """Send queued alerts now instead of waiting for the digest window to close."""
+        self._flush.set()
+        self._wakeup.set()
+
+    def pending(self):
+        """Number of alerts waiting in the outbox, counting each recipient."""
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM notification_outbox').fetchone()[0]
+
+    def close(self, timeout=15.0):
+        """Try to deliver what is queued, then stop; undelivered alerts stay in the outbox."""
+        if self._thread:
+            self._stop.set()
+            self.flush()
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Sender threads give up after their current message
+                self._abort.set()
+                logger.warning(f"{self.pending()} alert(s) left in the outbox for the next start")
+                return
+        if self._pool:
+            self._pool.shutdown()
+        self.conn.close()
+
+    def _worker(self):
+        while True:
+            # Woken by new alerts, or when a failing chat is due for a retry
+            if self._wakeup.wait(self._retry_wait()) and not self._stop.is_set():
+                # Let alerts from the same round of checks gather into one digest
+                self._flush.wait(self.digest_window)
+            self._wakeup.clear()
+            self._flush.clear()
+
+            while True:
+                try:
+                    rows = self._due_rows()
+                    if not rows:
+                        break
+                    if not self._send_digests(rows) and self._stop.is_set():
+                        break
+                except Exception as e:
+                    # Usually the database still locked after BUSY_TIMEOUT; the thread must outlive it
+                    ERRORS.inc(component='outbox', kind='database' if isinstance(e, sqlite3.Error) else 'error')
+                    logger.error(f"Alert delivery failed, retrying in {DATABASE_RETRY_SECONDS:.0f}s: {e}",
+                                 exc_info=not isinstance(e, sqlite3.OperationalError))
+                    if self._stop.wait(DATABASE_RETRY_SECONDS):
+                        break
+
+            if self._stop.is_set():
+                return
+
+    def _retry_wait(self):
+        """Seconds until the next failing chat is due, None if there is none."""
+        if not self._retry_at:
+            return None
+        return max(0.0, min(self._retry_at.values()) - time.monotonic())
+
+    def _due_rows(self):
+        """Outbox rows, leaving out those of chats waiting out a backoff."""
+        with self._lock:
+            rows = self.conn.execute('SELECT id, chat_id, payload FROM notification_outbox ORDER BY id').fetchall()
+        now = time.monotonic()
+        return [row for row in rows if self._retry_at.get(row[1] or self.notifier.chat_id, 0.0) <= now]
+
+    def _send_digests(self, rows):
+        """
+        Send outbox rows to their chats, each chat's as digests no longer
+        than Telegram allows; chats are served in parallel by the sender pool.
+        A chat that could not be served is retried on its own, after
+        Telegram's retry_after or its backoff.
+
+        Returns:
+            bool: Whether every chat got its digests
+        """
+        by_chat = {}
+        for row_id, chat_id, payload in rows:
+            by_chat.setdefault(chat_id or self.notifier.chat_id, []).append((row_id, json.loads(payload)))
+
+        if len(by_chat) == 1 or self.senders <= 1:
+            outcomes = [self._send_chat(chat_id, alerts) for chat_id, alerts in by_chat.items()]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.senders, thread_name_prefix='notification-sender')
+            outcomes = list(self._pool.map(lambda chat: self._send_chat(*chat), by_chat.items()))
+
+        delivered = 0
+        for chat_id, (sent, retry_after) in zip(by_chat, outcomes):
+            if sent:
+                delivered += 1
+                self._retry_at.pop(chat_id, None)
+                self._backoff.pop(chat_id, None)
+                continue
+            if self._stop.is_set():
+                # Left in the outbox for the next start
+                continue
+            delay = retry_after if retry_after is not None else self._backoff.get(chat_id, 1.0)
+            if retry_after is None:
+                self._backoff[chat_id] = min(delay * 2, self.max_backoff)
+            self._retry_at[chat_id] = time.monotonic() + delay
+            logger.warning(f"{len(by_chat[chat_id])} alert(s) to chat {chat_id} not delivered, "
+                           f"retrying in {delay:.0f}s")
+        if len(by_chat) > 1:
+            logger.info(f"Delivered alerts to {delivered} of {len(by_chat)} chat(s)")
+        return delivered == len(by_chat)
+
+    def _send_chat(self, chat_id, alerts):
+        """
+        Send one chat's (row id, alert) pairs as digests, removing each
+        digest's rows once it is delivered.
+
+        Returns:
+            tuple: (sent, retry_after) like TelegramNotifier.deliver
+        """
+        groups = [[]]
+        for row_id, alert in alerts:
+            candidate = [alert for _, alert in groups[-1]] + [alert]
+            if groups[-1] and len(self.notifier.format_digest(candidate)) > MAX_MESSAGE_LENGTH:
+                groups.append([])
+            groups[-1].append((row_id, alert))
+
+        groups = deque(groups)
+        while groups:
+            group = groups.popleft()
+            if self._abort.is_set():
+                return False, None
+            self.rate_limiter.acquire(chat_id)
+            try:
+                sent, retry_after = self.notifier.deliver(
+                    self.notifier.format_digest([alert for _, alert in group]), chat_id=chat_id)
+            except ChatUnavailable as e:
+                undelivered = [row_id for entries in [group, *groups] for row_id, _ in entries]
+                logger.warning(f"Dropping {len(undelivered)} alert(s) and the subscriptions of chat {chat_id}: {e}")
+                # Unsubscribed first: if that fails the alerts stay queued and it is tried again
+                self._unsubscribe(chat_id)
+                self._delete(undelivered)
+                return True, None
+            except MessageRejected as e:
+                if len(group) > 1:
+                    # Send the digest's alerts one by one to find the one refused
+                    groups.extendleft(reversed([[entry] for entry in group]))
+                    continue
+                row_id, alert = group[0]
+                logger.error(f"Dropping an alert for chat {chat_id} that Telegram refused ({e}): {alert}")
+                self._delete([row_id])
+                continue
+            if not sent:
+                if retry_after is not None:
+                    # Every sender waits, not just this chat's
+                    self.rate_limiter.pause(retry_after)
+                return False, retry_after
+            self._delete([row_id for row_id, _ in group])
+        return True, None
+
+    def _delete(self, row_ids):
+        with self._lock:
+            self.conn.executemany('DELETE FROM notification_outbox WHERE id = ?', [(row_id,) for row_id in row_ids])
+            self.conn.commit()
+
+    def _unsubscribe(self, chat_id):
+        """Remove every subscription of a chat that can no longer receive alerts."""
+        with self._lock:
+            try:
+                self.conn.execute('''
+                    DELETE FROM subscriptions
+                    WHERE subscriber_id IN (SELECT id FROM subscribers WHERE chat_id = ?)
+                ''', (str(chat_id),))
+                self.conn.execute('DELETE FROM subscribers WHERE chat_id = ?', (str(chat_id),))
+                self.conn.commit()
+            except sqlite3.OperationalError as e:
+                if 'no such table' not in str(e):
+                    raise
+                # Outbox used without the monitor's database: no subscriptions to remove
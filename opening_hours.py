@@ -0,0 +1,157 @@
+"""Venue opening hours, used to skip checks while a venue is closed.
+
+Opening hours come from Wolt's venue info endpoint (``WOLT_VENUE_API_URL``),
+which lists per weekday when the venue opens and closes, in milliseconds
+after local midnight, together with the venue's timezone::
+
+    {"results": [{"timezone": "Europe/Zagreb",
+                  "opening_times": {"monday": [{"type": "open", "value": {"$date": 28800000}},
+                                               {"type": "close", "value": {"$date": 72000000}}], ...}}]}
+
+They are stored in the database per venue (see Database.set_opening_hours)
+as (weekday, opens_at, closes_at) intervals in minutes after local midnight,
+weekday 0 being Monday.
+"""
+import logging
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+
+def _minutes(entry):
+    value = entry.get('value')
+    if isinstance(value, dict):
+        value = value.get('$date')
+    return int(value) // 60000
+
+
+def parse_opening_times(data):
+    """
+    Read the opening hours from a venue info document.
+
+    Returns:
+        tuple: (timezone name or None, list of (weekday, opens_at, closes_at)
+        intervals in minutes), or None when the document has no opening
+        hours. A venue closing after midnight has its interval end past
+        1440 minutes, whether Wolt lists the close on the same day (before
+        the open) or at the start of the next day
+    """
+    venue = data
+    if isinstance(data, dict) and data.get('results'):
+        venue = data['results'][0]
+    opening_times = venue.get('opening_times') if isinstance(venue, dict) else None
+    if not isinstance(opening_times, dict):
+        return None
+
+    intervals = []
+    # Weekday -> index of its interval still open at midnight / the close
+    # a day starts with, which ends the previous day's interval
+    open_at_midnight = {}
+    leading_closes = {}
+    for weekday, name in enumerate(WEEKDAYS):
+        opens_at = None
+        for entry in opening_times.get(name) or []:
+            if entry.get('type') == 'open':
+                opens_at = _minutes(entry)
+            elif entry.get('type') == 'close':
+                closes_at = _minutes(entry)
+                if opens_at is None:
+                    leading_closes[weekday] = closes_at
+                    continue
+                if closes_at <= opens_at:
+                    closes_at += DAY_MINUTES
+                intervals.append((weekday, opens_at, closes_at))
+                opens_at = None
+        if opens_at is not None:
+            open_at_midnight[weekday] = len(intervals)
+            intervals.append((weekday, opens_at, DAY_MINUTES))
+
+    # Open past the end of the day: Wolt lists the close on the next day
+    # (Monday's for Sunday night)
+    for weekday, closes_at in leading_closes.items():
+        index = open_at_midnight.get((weekday - 1) % len(WEEKDAYS))
+        if index is not None:
+            day, opens_at, _ = intervals[index]
+            intervals[index] = (day, opens_at, DAY_MINUTES + closes_at)
+    return venue.get('timezone'), intervals
+
+
+def _clock(minutes):
+    """'HH:MM' of minutes after midnight; past midnight (not midnight itself) wraps to the next day."""
+    if minutes > DAY_MINUTES:
+        minutes -= DAY_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class OpeningHours:
+    """A venue's weekly opening hours in its own timezone."""
+
+    def __init__(self, intervals, tz=None):
+        """
+        Args:
+            intervals: (weekday, opens_at, closes_at) tuples, minutes after local midnight
+            tz: IANA timezone name of the venue (default: UTC)
+        """
+        self.intervals = sorted(intervals)
+        try:
+            self.tz = ZoneInfo(tz) if tz else timezone.utc
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Unknown timezone '{tz}', reading opening hours as UTC")
+            self.tz = timezone.utc
+        # Minutes after Monday midnight, as (start, end, opened) ranges; Sunday
+        # night ranges running past the week's end wrap around to Monday, and
+        # keep the Sunday opening time (negative) in ``opened``
+        self._ranges = []
+        for weekday, opens_at, closes_at in self.intervals:
+            start = weekday * DAY_MINUTES + opens_at
+            end = weekday * DAY_MINUTES + closes_at
+            self._ranges.append((start, min(end, WEEK_MINUTES), start))
+            if end > WEEK_MINUTES:
+                self._ranges.append((0, end - WEEK_MINUTES, start - WEEK_MINUTES))
+
+    def _week_minute(self, moment):
+        local = moment.astimezone(self.tz)
+        return local.weekday() * DAY_MINUTES + local.hour * 60 + local.minute + local.second / 60
+
+    def is_open(self, moment=None):
+        """Whether the venue is open at ``moment`` (an aware datetime, default: now)."""
+        minute = self._week_minute(moment or datetime.now(timezone.utc))
+        return any(start <= minute < end for start, end, _ in self._ranges)
+
+    def seconds_until_open(self, moment=None):
+        """
+        Seconds from ``moment`` until the venue next opens.
+
+        Returns:
+            float: 0 while it is open, None if it never opens
+        """
+        if not self._ranges:
+            return None
+        minute = self._week_minute(moment or datetime.now(timezone.utc))
+        if any(start <= minute < end for start, end, _ in self._ranges):
+            return 0.0
+        waits = [(start - minute) % WEEK_MINUTES for start, _, _ in self._ranges]
+        return min(waits) * 60
+
+    def seconds_since_open(self, moment=None):
+        """Seconds since the venue opened, or None while it is closed."""
+        minute = self._week_minute(moment or datetime.now(timezone.utc))
+        for start, end, opened in self._ranges:
+            if start <= minute < end:
+                return (minute - opened) * 60
+        return None
+
+    def describe(self):
+        """Human-readable weekly schedule, e.g. 'Mon 08:00-20:00, Tue closed, ...'."""
+        days = []
+        for weekday, name in enumerate(WEEKDAYS):
+            spans = [f"{_clock(opens_at)}-{_clock(closes_at)}"
+                     for day, opens_at, closes_at in self.intervals if day == weekday]
+            days.append(f"{name[:3].title()} {' '.join(spans) or 'closed'}")
+        return ', '.join(days)
+
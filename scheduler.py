@@ -0,0 +1,149 @@
+"""Asyncio scheduler running jobs on their own, adjustable intervals."""
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# What to do when a job is found more than one interval late (e.g. after the
+# machine slept or a run took longer than its interval):
+#   'skip'     - drop the missed runs and wait for the next regular slot
+#   'run_once' - run once right away, then continue one interval from now
+#   'catch_up' - run every missed slot, back to back
+MISSED_RUN_POLICIES = ('skip', 'run_once', 'catch_up')
+
+
+class Job:
+    """A coroutine function run every ``interval`` seconds."""
+
+    def __init__(self, key, func, interval, next_run):
+        self.key = key
+        self.func = func
+        self.interval = interval
+        self.next_run = next_run
+        self.task = None
+        self.runs = 0
+        self.overlaps_skipped = 0
+        self.missed_runs = 0
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def __repr__(self):
+        return f"<Job(key='{self.key}', interval={self.interval:.0f}s, runs={self.runs})>"
+
+
+class AsyncScheduler:
+    """Runs coroutine jobs on per-job intervals.
+
+    - First runs are spread at random over ``start_jitter`` seconds and
+      every later run is shifted by up to ``jitter`` (a fraction of the
+      interval), so jobs with equal intervals do not fire together.
+    - A job is never started while its previous run is still going; that
+      run is skipped and counted in ``overlaps_skipped``.
+    - Runs missed by more than one interval are handled per
+      ``missed_run_policy`` (see MISSED_RUN_POLICIES).
+    """
+
+    def __init__(self, jitter=0.1, start_jitter=30.0, missed_run_policy='run_once', tick=1.0):
+        if missed_run_policy not in MISSED_RUN_POLICIES:
+            raise ValueError(f"Unknown missed run policy '{missed_run_policy}'")
+        self.jitter = jitter
+        self.start_jitter = start_jitter
+        self.missed_run_policy = missed_run_policy
+        self.tick = tick
+        self.jobs = {}
+        self._stopping = False
+
+    def add(self, key, func, interval):
+        """Schedule ``func()`` (a coroutine function) every ``interval`` seconds."""
+        first_run = time.monotonic() + random.uniform(0, self.start_jitter)
+        self.jobs[key] = Job(key, func, interval, first_run)
+
+    def remove(self, key):
+        """Stop scheduling a job; a run in progress is left to finish."""
+        self.jobs.pop(key, None)
+
+    def set_interval(self, key, interval):
+        """Change a job's interval, moving its next run earlier if needed."""
+        job = self.jobs.get(key)
+        if job is None or job.interval == interval:
+            return
+        job.interval = interval
+        job.next_run = min(job.next_run, time.monotonic() + self._jittered(interval))
+
+    def postpone(self, key, delay):
+        """Run a job no earlier than ``delay`` seconds from now, keeping its interval."""
+        job = self.jobs.get(key)
+        if job is not None:
+            job.next_run = max(job.next_run, time.monotonic() + delay)
+
+    def _jittered(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _reschedule(self, job, now):
+        late_by = now - job.next_run
+        if late_by <= job.interval:
+            job.next_run += self._jittered(job.interval)
+            return
+
+        missed = int(late_by // job.interval)
+        job.missed_runs += missed
+        if self.missed_run_policy == 'catch_up':
+            job.next_run += job.interval
+        elif self.missed_run_policy == 'skip':
+            job.next_run += (missed + 1) * job.interval
+        else:
+            job.next_run = now + self._jittered(job.interval)
+        logger.warning(f"Job {job.key} missed {missed} run(s), policy: {self.missed_run_policy}")
+
+    def _start(self, job, now):
+        if job.running and self.missed_run_policy == 'catch_up':
+            # Keep the slot pending until the current run has finished
+            return
+        if job.running:
+            job.overlaps_skipped += 1
+            logger.warning(f"Job {job.key} is still running, skipping this run")
+        elif self.missed_run_policy == 'skip' and now - job.next_run > job.interval:
+            # Too late for this slot; the next regular one is set below
+            pass
+        else:
+            job.runs += 1
+            job.task = asyncio.ensure_future(self._run_job(job))
+        self._reschedule(job, now)
+
+    async def _run_job(self, job):
+        try:
+            await job.func()
+        except Exception as e:
+            logger.error(f"Error in scheduled job {job.key}: {e}")
+
+    async def run(self):
+        """Run jobs until stop() is called."""
+        self._stopping = False
+        while not self._stopping:
+            now = time.monotonic()
+            for job in list(self.jobs.values()):
+                if job.next_run <= now:
+                    self._start(job, now)
+
+            # A job held back until its current run finishes ('catch_up') is
+            # due already: wait for its run instead of spinning on its slot
+            now = time.monotonic()
+            held = [job for job in self.jobs.values() if job.running and job.next_run <= now]
+            upcoming = min((job.next_run for job in self.jobs.values() if job not in held), default=now + self.tick)
+            timeout = min(self.tick, max(0.0, upcoming - now))
+            if held:
+                await asyncio.wait([job.task for job in held], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(timeout)
+
+        running = [job.task for job in self.jobs.values() if job.running]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def stop(self):
+        """Ask run() to return once the running jobs have finished."""
+        self._stopping = True
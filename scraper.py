@@ -1,54 +1,506 @@
 """Web scraper for Wolt product availability."""
+import asyncio
 import logging
+import os
+import shutil
+import threading
 import time
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from bs4 import BeautifulSoup
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import psutil
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from backends import BaseScraper, error_result, fingerprint, venue_key
+from extraction import EXTRACT_SCRIPT, READY_SCRIPT, ExtractionRules, product_result, venue_results
+from health import LoadTimeTracker
+from metrics import (PHASE_SECONDS, ERRORS, BROWSER_RSS_BYTES, BROWSER_PAGES, BROWSER_RESPONSES,
+                     BROWSER_FETCHED_BYTES, BROWSER_PROFILE_BYTES)
+from venues import parse_product_url, get_venue_url
 
 logger = logging.getLogger(__name__)
 
-class WoltScraper:
-    """Scrapes Wolt website for product availability."""
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+
+class HostThrottle:
+    """Per-host politeness budget shared by all pages of one scraper.
+
+    Limits how many pages may be loading from the same host at once and
+    keeps a minimum delay between consecutive navigations to that host.
+    """
+
+    def __init__(self, max_per_host=2, min_delay=0.5):
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self._slots = {}
+        self._locks = {}
+        self._last_start = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Hold one of the host's slots while a page is being loaded."""
+        host = urlparse(url).netloc
+        if host not in self._slots:
+            self._slots[host] = asyncio.Semaphore(self.max_per_host)
+            self._locks[host] = asyncio.Lock()
+
+        async with self._slots[host]:
+            async with self._locks[host]:
+                wait = self._last_start.get(host, 0) + self.min_delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_start[host] = time.monotonic()
+            yield
+
+
+class ResourceFilter:
+    """Decides which requests a page may make while it is being scraped.
+
+    Requests are aborted when their resource type is blocked (images,
+    fonts, media by default), when their host is on the deny list, or
+    when an allow list is set and their host is not on it. Domains match
+    themselves and all of their subdomains.
+    """
+
+    DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+    DEFAULT_BLOCKED_DOMAINS = (
+        'google-analytics.com',
+        'googletagmanager.com',
+        'doubleclick.net',
+        'facebook.net',
+        'facebook.com',
+        'hotjar.com',
+        'segment.io',
+        'sentry.io',
+        'braze.com',
+        'appsflyer.com',
+    )
+    # File extensions standing in for the resource types when the filter is
+    # applied as URL patterns (see url_patterns)
+    TYPE_EXTENSIONS = {
+        'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico'),
+        'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+        'media': ('mp4', 'webm', 'mp3', 'm4a', 'ogg', 'm3u8'),
+    }
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_domains=DEFAULT_BLOCKED_DOMAINS,
+                 allowed_domains=None):
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_domains = tuple(allowed_domains) if allowed_domains else None
+
+    @staticmethod
+    def _matches(host, domains):
+        return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+    def should_block(self, resource_type, url):
+        """Return True if a request of this type to this URL should be aborted."""
+        if resource_type in self.blocked_types:
+            return True
+        host = urlparse(url).hostname or ''
+        if self._matches(host, self.blocked_domains):
+            return True
+        if self.allowed_domains is not None and not self._matches(host, self.allowed_domains):
+            return True
+        return False
+
+    def url_patterns(self):
+        """
+        The filter as URL patterns for Chromium's Network.setBlockedURLs,
+        which unlike request interception leaves the HTTP cache on.
+
+        Resource types are matched by file extension.
+
+        Returns:
+            list: Patterns, or None if the filter needs request interception
+            (an allow list, or a resource type without known extensions)
+        """
+        if self.allowed_domains is not None or not self.blocked_types <= self.TYPE_EXTENSIONS.keys():
+            return None
+        patterns = []
+        for domain in self.blocked_domains:
+            patterns.extend((f'*://{domain}/*', f'*://*.{domain}/*'))
+        for resource_type in sorted(self.blocked_types):
+            for extension in self.TYPE_EXTENSIONS[resource_type]:
+                patterns.extend((f'*.{extension}', f'*.{extension}?*'))
+        return patterns
+
+
+class BrowserProfile:
+    """A browser user-data directory kept between runs.
+
+    Chromium keeps its HTTP cache, compiled code cache, service worker
+    storage and cookies (e.g. the cookie consent) there, so a restarted
+    browser loads Wolt's scripts and styles from disk instead of the
+    network. Half of ``max_mb`` is given to the HTTP cache, which Chromium
+    keeps under its cap itself; before every launch the cache stores are
+    trimmed to ``max_mb`` in total, least recently used first.
+    """
+
+    # Cache stores under the profile's Default directory; every entry of
+    # one of these directories is evicted as a whole
+    CACHE_DIRS = ('Cache', 'Code Cache', 'GPUCache', os.path.join('Service Worker', 'CacheStorage'),
+                  os.path.join('Service Worker', 'ScriptCache'))
+
+    def __init__(self, path, max_mb=256):
+        self.path = os.path.abspath(path)
+        self.max_mb = max_mb
+
+    def launch_args(self):
+        """Chromium command line switches for the profile."""
+        return [f'--disk-cache-size={int(self.max_mb * 1024 * 1024) // 2}']
+
+    @staticmethod
+    def _usage(path):
+        """(bytes, last modification time) of a file or directory tree."""
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime
+        size = 0
+        latest = os.stat(path).st_mtime
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                size += stat.st_size
+                latest = max(latest, stat.st_mtime)
+        return size, latest
+
+    def cache_entries(self):
+        """
+        The evictable cache entries of the profile.
+
+        Returns:
+            list: (path, bytes, last modification time) tuples
+        """
+        entries = []
+        for cache_dir in self.CACHE_DIRS:
+            directory = os.path.join(self.path, 'Default', cache_dir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                try:
+                    entries.append((path,) + self._usage(path))
+                except OSError:
+                    continue
+        return entries
+
+    def trim(self):
+        """
+        Evict the least recently used cache entries until the caches fit in
+        ``max_mb``; only call while no browser uses the profile.
+
+        Returns:
+            int: Bytes of cache left in the profile
+        """
+        entries = self.cache_entries()
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_mb * 1024 * 1024
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= limit:
+                break
+            logger.info(f"Evicting {size / 1024:.0f} KB of browser cache: {os.path.relpath(path, self.path)}")
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            total -= size
+        BROWSER_PROFILE_BYTES.set(total)
+        return total
+
+
+class PageStats:
+    """Request, byte and timing counters for one page load."""
+
+    def __init__(self):
+        self.pages = 0
+        self.requests = 0
+        self.requests_blocked = 0
+        self.bytes_loaded = 0
+        self.load_ms = 0.0
+        self.ready_ms = 0.0
+        # From the DevTools protocol, with a browser profile only: responses,
+        # how many of them came from a cache and the bytes actually received
+        # over the network
+        self.responses = 0
+        self.cache_hits = 0
+        self.bytes_fetched = 0
+        self._served_from_cache = set()
+
+    @property
+    def cache_hit_ratio(self):
+        return self.cache_hits / self.responses if self.responses else 0.0
+
+    def on_request(self, request):
+        self.requests += 1
+
+    def on_served_from_cache(self, params):
+        # Memory cache hits are announced before their response
+        self._served_from_cache.add(params['requestId'])
+
+    def on_cdp_response(self, params):
+        self.responses += 1
+        response = params['response']
+        if (response.get('fromDiskCache') or response.get('fromServiceWorker') or response.get('fromPrefetchCache')
+                or params['requestId'] in self._served_from_cache):
+            self.cache_hits += 1
+
+    def on_loading_finished(self, params):
+        self.bytes_fetched += int(params.get('encodedDataLength') or 0)
+
+    def on_loading_failed(self, params):
+        # Requests refused by Network.setBlockedURLs
+        if params.get('blockedReason'):
+            self.requests_blocked += 1
+
+    def on_response(self, response):
+        # Compressed transfer size as announced by the server; chunked
+        # responses without a Content-Length are not counted
+        try:
+            self.bytes_loaded += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    def __repr__(self):
+        return (f"<PageStats(requests={self.requests}, blocked={self.requests_blocked}, "
+                f"bytes={self.bytes_loaded}, fetched={self.bytes_fetched}, "
+                f"cached={self.cache_hits}/{self.responses}, load_ms={self.load_ms:.0f}, ready_ms={self.ready_ms:.0f})>")
+
+
+class WoltScraper(BaseScraper):
+    """Scrapes Wolt website for product availability.
+
+    The browser is driven through Playwright's async API on a private event
+    loop thread, so a single browser context can serve several pages at
+    once. The public methods stay synchronous and may be called from any
+    thread.
+
+    A scraper can be kept running across check cycles; call
+    ensure_healthy() before each cycle to have it (re)started when the
+    browser has crashed, grown past ``max_rss_mb`` or served ``max_pages``.
+
+    With a ``resource_filter`` every page intercepts its requests and aborts
+    the ones the filter rejects. Totals of the per-page counters are kept
+    in ``page_totals``.
+
+    With a ``profile`` (BrowserProfile) the browser runs on a persistent
+    user-data directory, so its caches and cookies outlive restarts. As
+    request interception turns the HTTP cache off, the resource filter is
+    then applied as blocked URL patterns where it can be.
 
-    def __init__(self, headless=True):
+    With a ``fingerprints`` cache (backends.FingerprintCache) the extracted
+    product text or item cards are hashed; when they match the last check
+    of the page the previous results are returned, marked unchanged.
+    """
+
+    def __init__(self, headless=True, max_concurrency=1, max_per_host=None, host_delay=0.0,
+                 max_pages=None, max_rss_mb=None, resource_filter=None, extraction_rules=None, fingerprints=None,
+                 profile=None):
         self.headless = headless
+        self.fingerprints = fingerprints
+        self.rules = extraction_rules or ExtractionRules()
+        self.resource_filter = resource_filter
+        self.profile = profile
+        # Network.setBlockedURLs patterns replacing request interception, or None to intercept
+        self.blocked_urls = None
+        if profile and resource_filter:
+            self.blocked_urls = resource_filter.url_patterns()
+            if self.blocked_urls is None:
+                logger.warning("The resource filter needs request interception, "
+                               "which keeps the browser profile's HTTP cache from being used")
+        self.page_totals = PageStats()
+        # Readiness waits and navigations are timed separately per URL, so a
+        # venue that stops responding fails fast on either
+        self.load_times = LoadTimeTracker()
+        self.goto_times = LoadTimeTracker()
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_host = max_per_host or self.max_concurrency
+        self.host_delay = host_delay
+        # Created by _start: its semaphores and locks belong to the event loop of one browser run
+        self.throttle = None
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
         self.playwright = None
         self.browser = None
         self.context = None
-
-    def __enter__(self):
-        """Context manager entry."""
-        self.start()
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit."""
-        self.close()
+        self.pages_served = 0
+        self._loop = None
+        self._thread = None
+        self._page_slots = None
+        self._crashed = False
+        # Set while close() shuts the browser down, which is no disconnect
+        self._closing = False
+        # Threads calling check_* share the browser; a restart waits until
+        # none of them is using it and holds back new ones meanwhile
+        self._users = threading.Condition()
+        self._active = 0
+        self._restarting = False
+
+    def _run(self, coro):
+        """Run a coroutine on the scraper's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _use(self, method, *args):
+        """Run ``method(*args)`` on the event loop, starting the browser if needed; safe across threads."""
+        with self._users:
+            self._users.wait_for(lambda: not self._restarting)
+            if not self.context:
+                self.start()
+            self._active += 1
+        try:
+            return self._run(method(*args))
+        finally:
+            with self._users:
+                self._active -= 1
+                self._users.notify_all()
+
+    def _stop_loop(self):
+        """Stop the event loop thread."""
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        self._loop = None
+        self._thread = None
 
     def start(self):
         """Initialize the browser."""
         try:
-            self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(headless=self.headless)
-            self.context = self.browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='wolt-scraper', daemon=True)
+            self._thread.start()
+            self._run(self._start())
             logger.info("Browser initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize browser: {e}")
+            self._stop_loop()
             raise
 
+    async def _start(self):
+        self._page_slots = asyncio.Semaphore(self.max_concurrency)
+        self.throttle = HostThrottle(self.max_per_host, self.host_delay)
+        self.pages_served = 0
+        self._crashed = False
+        self._closing = False
+        with PHASE_SECONDS.time(phase='browser_start'):
+            self.playwright = await async_playwright().start()
+            if self.profile:
+                cache_bytes = self.profile.trim()
+                logger.info(f"Using browser profile {self.profile.path} ({cache_bytes / 1024 / 1024:.1f} MB cached)")
+                # The persistent context is the browser: it has no Browser object of its own
+                self.context = await self.playwright.chromium.launch_persistent_context(
+                    self.profile.path,
+                    headless=self.headless,
+                    user_agent=USER_AGENT,
+                    args=self.profile.launch_args()
+                )
+                self.context.on('close', self._on_disconnected)
+                return
+            self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        self.browser.on('disconnected', self._on_disconnected)
+        self.context = await self.browser.new_context(user_agent=USER_AGENT)
+
     def close(self):
         """Close the browser."""
+        if not self._loop:
+            return
+        self._closing = True
         try:
-            if self.context:
-                self.context.close()
-            if self.browser:
-                self.browser.close()
-            if self.playwright:
-                self.playwright.stop()
+            self._run(self._close())
             logger.info("Browser closed")
         except Exception as e:
             logger.error(f"Error closing browser: {e}")
+        finally:
+            self.context = None
+            self.browser = None
+            self.playwright = None
+            self._stop_loop()
+
+    async def _close(self):
+        if self.profile:
+            # Closing the persistent context shuts the browser down and flushes the profile
+            if self.context and not self._crashed:
+                await self.context.close()
+        elif self.browser and self.browser.is_connected():
+            if self.context:
+                await self.context.close()
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+    def _on_disconnected(self, browser_or_context):
+        if self._closing:
+            return
+        self._crashed = True
+        logger.warning("Browser disconnected")
+
+    def restart(self):
+        """Close the browser and launch a fresh one."""
+        self.close()
+        self.start()
+
+    def browser_rss_mb(self):
+        """
+        Resident memory of the Playwright driver and browser processes.
+
+        Returns:
+            float: RSS in megabytes, summed over all child processes
+        """
+        total = 0
+        for child in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def health_check(self):
+        """
+        Check whether the running browser can keep serving pages.
+
+        Returns:
+            str or None: Reason the browser should be restarted, or None
+            if it is healthy
+        """
+        if not self.context:
+            return 'not started'
+        if self._crashed or (self.browser and not self.browser.is_connected()):
+            return 'browser crashed'
+        BROWSER_PAGES.set(self.pages_served)
+        if self.max_pages and self.pages_served >= self.max_pages:
+            return f'served {self.pages_served} pages'
+        rss = self.browser_rss_mb()
+        BROWSER_RSS_BYTES.set(int(rss * 1024 * 1024))
+        if self.max_rss_mb and rss > self.max_rss_mb:
+            return f'RSS {rss:.0f} MB over {self.max_rss_mb} MB limit'
+        return None
+
+    def ensure_healthy(self):
+        """
+        Start the browser, or restart it if the health check fails.
+
+        Safe to call from several threads: a restart waits for the checks
+        in progress on other threads to finish, and only one thread restarts.
+        """
+        with self._users:
+            self._users.wait_for(lambda: not self._restarting)
+            reason = self.health_check()
+            if reason is None:
+                return
+            self._restarting = True
+            try:
+                self._users.wait_for(lambda: not self._active)
+                if self.context:
+                    logger.warning(f"Restarting browser: {reason}")
+                    self.restart()
+                else:
+                    self.start()
+            finally:
+                self._restarting = False
+                self._users.notify_all()
 
     def check_product_availability(self, url, timeout=30000):
         """
@@ -65,126 +517,253 @@ class WoltScraper:
                 'error': str or None
             }
         """
-        if not self.context:
-            self.start()
+        return self._use(self._check_product_availability, url, timeout)
 
-        page = None
-        try:
-            page = self.context.new_page()
-            logger.info(f"Navigating to: {url}")
-
-            # Navigate to the page
-            page.goto(url, wait_until='networkidle', timeout=timeout)
-
-            # Wait a bit for dynamic content to load
-            time.sleep(2)
-
-            # Get the page content
-            content = page.content()
-            soup = BeautifulSoup(content, 'html.parser')
-
-            # Check for "out of stock" indicators
-            # Wolt typically shows "Sold out" or similar text
-            page_text = soup.get_text().lower()
-
-            # Common indicators that product is NOT available
-            out_of_stock_indicators = [
-                'sold out',
-                'rasprodano',
-                'nije dostupno',
-                'out of stock',
-                'not available'
-            ]
-
-            is_out_of_stock = any(indicator in page_text for indicator in out_of_stock_indicators)
-
-            # Try to find price (if available, product is likely in stock)
-            price = None
-            # Look for price patterns (e.g., "€12.99" or "12,99 €")
-            price_elements = soup.find_all(text=lambda text: text and '€' in text)
-            if price_elements:
-                for elem in price_elements:
-                    if any(char.isdigit() for char in elem):
-                        price = elem.strip()
-                        break
-
-            # Determine availability
-            # If we found a price and no out-of-stock indicators, it's likely available
-            available = price is not None and not is_out_of_stock
-
-            logger.info(f"Check result - Available: {available}, Price: {price}, Out of stock indicator: {is_out_of_stock}")
-
-            return {
-                'available': available,
-                'price': price,
-                'error': None
-            }
+    def check_many(self, urls, timeout=30000):
+        """
+        Check several product URLs concurrently.
 
-        except PlaywrightTimeout:
-            logger.error(f"Timeout loading page: {url}")
-            return {
-                'available': False,
-                'price': None,
-                'error': 'Timeout loading page'
-            }
-        except Exception as e:
-            logger.error(f"Error checking product availability: {e}")
-            return {
-                'available': False,
-                'price': None,
-                'error': str(e)
-            }
-        finally:
-            if page:
-                page.close()
+        At most ``max_concurrency`` pages are open at once, and the per-host
+        budget is respected across all of them.
 
-    def get_all_fisherija_locations(self, brand_url="https://wolt.com/hr/hrv/zagreb/brand/fisherija"):
+        Returns:
+            list: One result dict (see check_product_availability) per URL,
+            in the same order as ``urls``
+        """
+        return self._use(self._check_many, urls, timeout)
+
+    async def _check_many(self, urls, timeout):
+        return await asyncio.gather(*(self._check_product_availability(url, timeout) for url in urls))
+
+    def check_venues(self, venues, timeout=30000):
         """
-        Scrape all Fisherija locations from the brand page.
+        Check several venues concurrently, loading each venue page once for
+        all of its tracked items.
 
         Returns:
-            list: List of dicts with location info
+            list: One list of item results per venue, in the same order
         """
-        if not self.context:
-            self.start()
+        return self._use(self._check_venues, venues, timeout)
+
+    def check_venue(self, venue, timeout=30000):
+        return self.check_venues([venue], timeout)[0]
+
+    async def _check_venues(self, venues, timeout):
+        return await asyncio.gather(*(self._check_venue(venue, timeout) for venue in venues))
+
+    async def _extract(self, url, timeout, items=()):
+        """
+        Load a page within the concurrency and per-host budget and extract
+        the product text and the card text of each of ``items``.
+
+        Extraction starts as soon as the page shows a price or a sold-out
+        badge (and, for venue pages, at least one tracked item name) instead
+        of waiting for the network to go idle.
 
-        page = None
+        Returns:
+            dict: Fragments as returned by extraction.EXTRACT_SCRIPT
+        """
+        location = parse_product_url(url)[0] or url
+        async with self._page_slots, self.throttle.slot(url):
+            page = None
+            stats = PageStats()
+            started = time.monotonic()
+            try:
+                with PHASE_SECONDS.time(phase='page_open', location=location):
+                    page = await self._new_page(stats)
+                logger.info(f"Navigating to: {url}")
+
+                # Navigate to the page
+                goto_timeout = self.goto_times.timeout_for(url, timeout)
+                goto_started = time.monotonic()
+                with PHASE_SECONDS.time(phase='page_goto', location=location):
+                    await page.goto(url, wait_until='domcontentloaded', timeout=goto_timeout)
+                self.goto_times.record(url, (time.monotonic() - goto_started) * 1000)
+
+                # Wait until the product's or an item's own state is rendered
+                script_args = self.rules.script_args(items)
+                ready_timeout = self.load_times.timeout_for(url, timeout)
+                ready_started = time.monotonic()
+                await page.wait_for_function(
+                    READY_SCRIPT,
+                    arg=script_args,
+                    timeout=ready_timeout,
+                    polling=100
+                )
+                stats.ready_ms = (time.monotonic() - ready_started) * 1000
+                PHASE_SECONDS.observe(stats.ready_ms / 1000, phase='page_ready', location=location)
+                self.load_times.record(url, stats.ready_ms)
+                logger.info(f"Page ready after {stats.ready_ms:.0f} ms (timeout {ready_timeout} ms)")
+
+                with PHASE_SECONDS.time(phase='page_extract', location=location):
+                    return await page.evaluate(EXTRACT_SCRIPT, script_args)
+            finally:
+                stats.load_ms = (time.monotonic() - started) * 1000
+                self._record_page_stats(stats)
+                logger.info(f"Page stats for {url}: {stats}")
+                if page:
+                    await page.close()
+
+    async def _new_page(self, stats):
+        """Open a page that counts its traffic and applies the resource filter."""
+        page = await self.context.new_page()
+        self.pages_served += 1
+        page.on('request', stats.on_request)
+        page.on('response', stats.on_response)
+        if self.profile:
+            # Cache hits and received bytes are only reported by the DevTools
+            # protocol, and only worth a session per page when there is a cache
+            cdp = await self.context.new_cdp_session(page)
+            cdp.on('Network.requestServedFromCache', stats.on_served_from_cache)
+            cdp.on('Network.responseReceived', stats.on_cdp_response)
+            cdp.on('Network.loadingFinished', stats.on_loading_finished)
+            cdp.on('Network.loadingFailed', stats.on_loading_failed)
+            await cdp.send('Network.enable')
+            if self.blocked_urls is not None:
+                await cdp.send('Network.setBlockedURLs', {'urls': self.blocked_urls})
+                return page
+        if self.resource_filter:
+            await page.route('**/*', lambda route: self._route(route, stats))
+        return page
+
+    async def _route(self, route, stats):
+        request = route.request
+        if self.resource_filter.should_block(request.resource_type, request.url):
+            stats.requests_blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _record_page_stats(self, stats):
+        totals = self.page_totals
+        totals.pages += 1
+        totals.requests += stats.requests
+        totals.requests_blocked += stats.requests_blocked
+        totals.bytes_loaded += stats.bytes_loaded
+        totals.load_ms += stats.load_ms
+        totals.ready_ms += stats.ready_ms
+        totals.responses += stats.responses
+        totals.cache_hits += stats.cache_hits
+        totals.bytes_fetched += stats.bytes_fetched
+        BROWSER_RESPONSES.inc(stats.cache_hits, source='cache')
+        BROWSER_RESPONSES.inc(stats.responses - stats.cache_hits, source='network')
+        BROWSER_FETCHED_BYTES.inc(stats.bytes_fetched)
+
+    async def _check_product_availability(self, url, timeout):
         try:
-            page = self.context.new_page()
-            logger.info(f"Fetching locations from: {brand_url}")
+            fragments = await self._extract(url, timeout)
+            if self.fingerprints is not None:
+                page_fingerprint = fingerprint(fragments['product'])
+                cached = self.fingerprints.lookup(venue_key(url, ()), page_fingerprint)
+                if cached is not None:
+                    logger.info(f"Product unchanged since last check: {url}")
+                    return cached[0]
+
+            with PHASE_SECONDS.time(phase='parse', location=parse_product_url(url)[0] or url):
+                result = product_result(fragments, self.rules)
+            if self.fingerprints is not None and not result['error']:
+                self.fingerprints.store(venue_key(url, ()), page_fingerprint, [result])
+            logger.info(f"Check result - Available: {result['available']}, Price: {result['price']}")
+            return result
 
-            page.goto(brand_url, wait_until='networkidle', timeout=30000)
-            time.sleep(3)  # Wait for dynamic content
+        except PlaywrightTimeout:
+            logger.error(f"Timeout loading page: {url}")
+            ERRORS.inc(component='browser', kind='timeout')
+            return error_result('Timeout loading page')
+        except Exception as e:
+            logger.error(f"Error checking product availability: {e}")
+            ERRORS.inc(component='browser', kind='error')
+            return error_result(str(e))
 
-            content = page.content()
-            soup = BeautifulSoup(content, 'html.parser')
+    async def _check_venue(self, venue, timeout):
+        items = venue['items']
 
-            locations = []
+        # A single item with its own product page is checked on that page
+        if len(items) == 1 and items[0]['url'] != venue['url']:
+            return [await self._check_product_availability(items[0]['url'], timeout)]
 
-            # Find location links - these are typically in <a> tags with venue links
-            venue_links = soup.find_all('a', href=lambda href: href and '/venue/' in href)
+        key = venue_key(venue['url'], items)
+        try:
+            fragments = await self._extract(venue['url'], timeout, items)
+            if self.fingerprints is not None:
+                # Only the tracked items' cards count, not the rest of the page
+                page_fingerprint = fingerprint(fragments['items'])
+                cached = self.fingerprints.lookup(key, page_fingerprint)
+                if cached is not None:
+                    logger.info(f"Venue unchanged since last check: {venue['name']}")
+                    return cached
+
+            with PHASE_SECONDS.time(phase='parse', location=venue.get('slug') or venue['url']):
+                results = venue_results(fragments, items, self.rules)
+            if self.fingerprints is not None:
+                # Not cached when items had to be looked up on their own pages
+                self.fingerprints.store(key, page_fingerprint, results)
+            logger.info(f"Venue check result - {sum(r['available'] for r in results)}/{len(results)} item(s) available")
+        except PlaywrightTimeout:
+            logger.error(f"Timeout loading page: {venue['url']}")
+            ERRORS.inc(component='browser', kind='timeout')
+            return [error_result('Timeout loading page') for _ in items]
+        except Exception as e:
+            logger.error(f"Error checking venue {venue['name']}: {e}")
+            ERRORS.inc(component='browser', kind='error')
+            return [error_result(str(e)) for _ in items]
 
-            for link in venue_links:
-                href = link.get('href')
-                # Make absolute URL if needed
-                if href.startswith('/'):
-                    href = f"https://wolt.com{href}"
+        # Items not shown on the venue page are looked up on their own product page
+        missing = [i for i, result in enumerate(results) if result['error'] and items[i]['url'] != venue['url']]
+        if missing:
+            retried = await asyncio.gather(*(self._check_product_availability(items[i]['url'], timeout) for i in missing))
+            for i, result in zip(missing, retried):
+                results[i] = result
 
-                # Extract location name from the link text or nearby elements
-                name = link.get_text(strip=True)
+        return results
 
-                if href and name and href not in [loc['url'] for loc in locations]:
-                    locations.append({
-                        'name': name,
-                        'url': href
-                    })
+    def get_brand_locations(self, brand_url):
+        """
+        Scrape all locations (venues) listed on a Wolt brand page.
 
-            logger.info(f"Found {len(locations)} locations")
-            return locations
+        Returns:
+            list: Dicts with the venue 'name' and 'url', one per venue
+        """
+        return self._use(self._get_brand_locations, brand_url)
 
-        except Exception as e:
-            logger.error(f"Error fetching locations: {e}")
-            return []
-        finally:
-            if page:
-                page.close()
+    def get_all_fisherija_locations(self, brand_url="https://wolt.com/hr/hrv/zagreb/brand/fisherija"):
+        """Scrape all Fisherija locations from the brand page (see get_brand_locations)."""
+        return self.get_brand_locations(brand_url)
+
+    async def _get_brand_locations(self, brand_url):
+        # A page like any other: counted against the concurrency and the host's pacing
+        async with self._page_slots, self.throttle.slot(brand_url):
+            page = None
+            try:
+                page = await self._new_page(PageStats())
+                logger.info(f"Fetching locations from: {brand_url}")
+
+                await page.goto(brand_url, wait_until='domcontentloaded', timeout=30000)
+                # Wait for the venue list to render
+                await page.wait_for_selector('a[href*="/venue/"]', timeout=30000)
+
+                # Absolute link targets and texts, read in the page instead of re-parsing its HTML
+                links = await page.eval_on_selector_all('a[href*="/venue/"]', LINKS_SCRIPT)
+
+                # Venue URL -> location; a venue is usually linked more than once
+                locations = {}
+                for href, name in links:
+                    url = get_venue_url(href)
+                    if name and url not in locations:
+                        locations[url] = {'name': name, 'url': url}
+
+                logger.info(f"Found {len(locations)} locations")
+                return list(locations.values())
+
+            except Exception as e:
+                logger.error(f"Error fetching locations: {e}")
+                return []
+            finally:
+                if page:
+                    await page.close()
+
+
+# Page-side link listing: [absolute href, visible text] of every matched link
+LINKS_SCRIPT = """
+links => links.map(link => [link.href, (link.innerText || '').trim()])
+"""
@@ -0,0 +1,318 @@
+"""Sharded scraping: venues are split across worker processes.
+
+Every worker process runs its own scraper backends (and so its own
+browser), which spreads page rendering and parsing over several CPU cores.
+Workers only scrape; their results come back to the coordinating
+ProductMonitor, which stays the only process writing to the database.
+
+A venue always goes to the same shard (hash of its URL over the live
+shards), so each worker's browser and unchanged-page cache keep serving the
+same venues. When a worker dies, its outstanding venues are handed to the
+other shards and the worker is restarted; after ``max_restarts`` restarts it
+stays down and its venues are redistributed over the remaining shards. A
+worker that has not answered by its deadline is taken for hung, killed and
+handled like a dead one.
+
+Workers record metrics in their own registry, which is drained into the
+result of every task and merged into the coordinator's, so /metrics covers
+every shard. Gauges such as the browser's memory are summed over shards;
+observations made in workers are not written to the JSON metrics log.
+"""
+import itertools
+import logging
+import math
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+import zlib
+from concurrent.futures import Future, TimeoutError
+import logs
+from metrics import REGISTRY, SHARD_VENUES, SHARD_BUSY_SECONDS, SHARD_RESTARTS, SHARD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+def _shard_worker(slot, tasks, results, log_queue=None):
+    """
+    Worker process: scrape the venues of each task until told to stop.
+
+    Args:
+        slot: Shard number
+        tasks: Queue of (request_id, venues) tasks; None stops the worker
+        results: Queue receiving (slot, request_id, [(venue index, item results)], busy seconds,
+            metrics drained from the worker's registry)
+        log_queue: Queue the worker's log records are sent to, written by the coordinator
+    """
+    # Ctrl+C reaches the whole process group; the coordinator stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if log_queue is not None:
+        logs.setup_worker_logging(log_queue)
+
+    import os
+    from backends import FingerprintCache
+    from config import Config
+    from main import ScraperSet
+
+    # A browser profile can only be open in one browser, so every shard keeps its own
+    profile_dir = os.path.join(Config.BROWSER_PROFILE_DIR, f'shard-{slot}') if Config.BROWSER_PROFILE_DIR else None
+    scrapers = ScraperSet(FingerprintCache() if Config.SKIP_UNCHANGED_PAGES else None, profile_dir=profile_dir)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, venues = task
+            started = time.perf_counter()
+            index = {id(venue): i for i, venue in enumerate(venues)}
+            checked = [(index[id(venue)], items) for venue, items in scrapers.scrape(venues)]
+            results.put((slot, request_id, checked, time.perf_counter() - started, REGISTRY.drain()))
+    finally:
+        scrapers.close()
+
+
+class Shard:
+    """One worker process and its throughput counters."""
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.process = None
+        self.tasks = None
+        self.alive = False
+        self.restarts = 0
+        self.venues = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Venues checked per busy second."""
+        return self.venues / self.busy_seconds if self.busy_seconds else 0.0
+
+
+class ShardPool:
+    """Scrapes venues in worker processes; a drop-in for main.ScraperSet."""
+
+    def __init__(self, workers, max_restarts=3, poll_interval=1.0, venue_timeout=120.0, concurrency=1):
+        """
+        Start the worker processes.
+
+        Args:
+            workers: Number of worker processes
+            max_restarts: Restarts per shard before it is given up
+            poll_interval: Seconds between checks for dead or hung workers
+            venue_timeout: Seconds a worker may spend on a round of
+                ``concurrency`` venues before it is taken for hung
+            concurrency: Venues a worker checks at a time
+        """
+        # spawn: a fresh interpreter per worker, never a fork of a thread-holding parent
+        self._context = mp.get_context('spawn')
+        self._results = self._context.Queue()
+        # Worker log records go through the coordinator's log handlers, so
+        # only one process writes (and rotates) the log file
+        self._log_queue = self._context.Queue()
+        self._log_listener = logs.listen(self._log_queue)
+        self._lock = threading.Lock()
+        self._requests = itertools.count()
+        # request_id -> [shard, venues, future, attempts, deadline]
+        self._pending = {}
+        self._closed = False
+        self.max_restarts = max_restarts
+        self.poll_interval = poll_interval
+        self.venue_timeout = venue_timeout
+        self.concurrency = max(1, concurrency)
+
+        self.shards = [Shard(slot) for slot in range(workers)]
+        for shard in self.shards:
+            self._spawn(shard)
+        SHARD_WORKERS.set(workers)
+
+        self._collector = threading.Thread(target=self._collect, name='shard-collector', daemon=True)
+        self._collector.start()
+        logger.info(f"Started {workers} scraper shards")
+
+    def _spawn(self, shard):
+        shard.tasks = self._context.Queue()
+        log_queue = self._log_queue if self._log_listener else None
+        shard.process = self._context.Process(target=_shard_worker,
+                                              args=(shard.slot, shard.tasks, self._results, log_queue),
+                                              name=f'shard-{shard.slot}', daemon=True)
+        shard.process.start()
+        shard.alive = True
+
+    def _owner(self, venue, shards):
+        return shards[zlib.crc32(venue['url'].encode('utf-8')) % len(shards)]
+
+    def _budget(self, venues):
+        """Seconds a worker may take for ``venues``, one round on top for starting its browser."""
+        return self.venue_timeout * (math.ceil(len(venues) / self.concurrency) + 1)
+
+    def _submit(self, venues, shards, attempts=0):
+        """Send venues to their owning shards; must hold the lock. Returns the new futures."""
+        by_shard = {}
+        for venue in venues:
+            by_shard.setdefault(self._owner(venue, shards).slot, []).append(venue)
+
+        futures = []
+        now = time.monotonic()
+        for slot, venues in by_shard.items():
+            shard = self.shards[slot]
+            # Tasks queue up behind the ones the shard already has
+            queued = max((pending[4] for pending in self._pending.values() if pending[0] is shard), default=now)
+            request_id = next(self._requests)
+            future = Future()
+            self._pending[request_id] = [shard, venues, future, attempts, max(now, queued) + self._budget(venues)]
+            shard.tasks.put((request_id, venues))
+            futures.append(future)
+        return futures
+
+    def scrape(self, venues):
+        """
+        Check the given venues on their shards and wait for the results.
+
+        Returns:
+            list: (venue, item results) pairs for the venues that could be checked
+        """
+        with self._lock:
+            alive = [shard for shard in self.shards if shard.alive]
+            if self._closed or not alive:
+                logger.error(f"No scraper shard available, skipping {len(venues)} venue(s)")
+                return []
+            futures = self._submit(venues, alive)
+            # The collector kills a shard past its deadline, and its venues get
+            # another budget elsewhere; this wait only guards against the collector
+            wait_until = max(pending[4] for pending in self._pending.values()) + 2 * self._budget(venues)
+
+        checked = []
+        for future in futures:
+            try:
+                checked.extend(future.result(timeout=max(0.0, wait_until - time.monotonic())))
+            except TimeoutError:
+                logger.error("No result from a shard by its deadline, skipping its venues")
+            except Exception as e:
+                logger.error(f"Error scraping on a shard: {e}")
+        return checked
+
+    def _collect(self):
+        """Collector thread: resolve results and watch for dead workers."""
+        while not self._closed:
+            try:
+                slot, request_id, checked, elapsed, metrics = self._results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break
+            else:
+                REGISTRY.merge(metrics, source=slot)
+                self._resolve(slot, request_id, checked, elapsed)
+            self._check_workers()
+
+    def _resolve(self, slot, request_id, checked, elapsed):
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+        if pending is None:
+            # Already answered by the shard it was handed to after a worker death
+            return
+        venues, future = pending[1], pending[2]
+
+        shard = self.shards[slot]
+        items = sum(len(results) for _, results in checked)
+        shard.venues += len(checked)
+        shard.items += items
+        shard.busy_seconds += elapsed
+        SHARD_VENUES.inc(len(checked), shard=slot)
+        SHARD_BUSY_SECONDS.inc(elapsed, shard=slot)
+        future.set_result([(venues[i], results) for i, results in checked])
+
+    def _check_workers(self):
+        now = time.monotonic()
+        with self._lock:
+            for shard in self.shards:
+                if not shard.alive or self._closed:
+                    continue
+                if shard.process.is_alive():
+                    overdue = [pending for pending in self._pending.values() if pending[0] is shard and pending[4] < now]
+                    if not overdue:
+                        continue
+                    logger.error(f"Shard {shard.slot} worker missed the deadline for "
+                                 f"{sum(len(pending[1]) for pending in overdue)} venue(s), killing it")
+                    shard.process.kill()
+                    shard.process.join(timeout=5)
+                self._handle_death(shard)
+
+    def _handle_death(self, shard):
+        """Restart or retire a dead worker and hand its outstanding venues on; must hold the lock."""
+        shard.alive = False
+        shard.restarts += 1
+        SHARD_RESTARTS.inc(shard=shard.slot)
+        # Its browser is gone along with the readings of its gauges
+        REGISTRY.merge({}, source=shard.slot)
+        lost = [(request_id, pending) for request_id, pending in self._pending.items() if pending[0] is shard]
+
+        if shard.restarts <= self.max_restarts:
+            logger.warning(f"Shard {shard.slot} worker died (exit code {shard.process.exitcode}), "
+                           f"restarting ({shard.restarts}/{self.max_restarts})")
+            self._spawn(shard)
+        else:
+            logger.error(f"Shard {shard.slot} worker died (exit code {shard.process.exitcode}) "
+                         f"after {self.max_restarts} restarts, redistributing its venues")
+        alive = [s for s in self.shards if s.alive]
+        SHARD_WORKERS.set(len(alive))
+
+        # Outstanding venues go to the other shards; one retry only, so a venue
+        # that crashes its worker cannot take down every shard in turn
+        targets = [s for s in alive if s is not shard] or alive
+        for request_id, (_, venues, future, attempts, _) in lost:
+            del self._pending[request_id]
+            if attempts or not targets:
+                future.set_exception(RuntimeError(
+                    f"shard {shard.slot} died while checking {len(venues)} venue(s)"))
+                continue
+            retried = self._submit(venues, targets, attempts + 1)
+            self._chain(retried, future)
+
+    def _chain(self, futures, future):
+        """Resolve ``future`` with the combined results of ``futures``."""
+        remaining = [len(futures)]
+        checked = []
+        lock = threading.Lock()
+
+        def done(part):
+            with lock:
+                if part.exception() is None:
+                    checked.extend(part.result())
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    future.set_result(checked)
+
+        for part in futures:
+            part.add_done_callback(done)
+
+    def log_stats(self):
+        """Log per-shard throughput."""
+        for shard in self.shards:
+            state = 'up' if shard.alive else 'down'
+            logger.info(f"Shard {shard.slot} ({state}, pid {shard.process.pid}): {shard.venues} venues, "
+                        f"{shard.items} items in {shard.busy_seconds:.1f} s busy "
+                        f"({shard.throughput:.2f} venues/s), {shard.restarts} restart(s)")
+
+    def close(self):
+        """Stop the workers and fail any outstanding requests."""
+        with self._lock:
+            self._closed = True
+            for shard in self.shards:
+                if shard.alive:
+                    shard.tasks.put(None)
+        for shard in self.shards:
+            shard.process.join(timeout=10)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            shard.alive = False
+        with self._lock:
+            for _, _, future, _, _ in self._pending.values():
+                future.set_exception(RuntimeError('shard pool closed'))
+            self._pending.clear()
+        SHARD_WORKERS.set(0)
+        if self._log_listener:
+            logs.unlisten(self._log_listener)
@@ -0,0 +1,168 @@
+"""Local stub server that replays recorded Wolt responses from the fixtures directory.
+
+Point the scraper at it instead of wolt.com, e.g.:
+
+    python stub_server.py --port 8765
+    WOLT_API_URL=http://127.0.0.1:8765/v4/venues/slug/{slug}/menu python main.py
+
+Besides the recorded venues, any venue slug starting with ``available-``,
+``sold-out-`` or ``slow-`` is served (menu JSON, product page and venue
+page) in that variant, so benchmarks can simulate any number of locations.
+Slow responses are delayed by the server's ``slow_delay`` seconds. Venue
+info (opening hours) lists every venue as always open, except slugs
+starting with ``closed-``, which never open. Any script under ``/static/``
+is served as a generated stand-in bundle that browsers may cache for a year.
+"""
+import argparse
+import functools
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+JSON = 'application/json'
+HTML = 'text/html; charset=utf-8'
+JS = 'application/javascript'
+
+# (URL path pattern, fixture file template, content type, slow); the first
+# matching route wins. Templates are filled in with the pattern's groups
+ROUTES = [
+    (re.compile(r'^/v4/venues/slug/available-[^/]+/menu$'), 'api/fisherija-maksimir.json', JSON, False),
+    (re.compile(r'^/v4/venues/slug/sold-out-[^/]+/menu$'), 'api/fisherija-dubrava.json', JSON, False),
+    (re.compile(r'^/v4/venues/slug/slow-[^/]+/menu$'), 'api/fisherija-maksimir.json', JSON, True),
+    (re.compile(r'^/v4/venues/slug/closed-[^/]+/menu$'), 'api/fisherija-dubrava.json', JSON, False),
+    (re.compile(r'^/v4/venues/slug/(?P<slug>[^/]+)/menu$'), 'api/{slug}.json', JSON, False),
+    (re.compile(r'^/v3/venues/slug/closed-[^/]+$'), 'api/venue-info-closed.json', JSON, False),
+    (re.compile(r'^/v3/venues/slug/[^/]+$'), 'api/venue-info.json', JSON, False),
+    (re.compile(r'/venue/available-[^/]+/[^/]*itemid-[0-9a-f]+$'), 'html/product-available.html', HTML, False),
+    (re.compile(r'/venue/sold-out-[^/]+/[^/]*itemid-[0-9a-f]+$'), 'html/product-sold-out.html', HTML, False),
+    (re.compile(r'/venue/slow-[^/]+/[^/]*itemid-[0-9a-f]+$'), 'html/product-available.html', HTML, True),
+    (re.compile(r'/venue/slow-[^/]+/?$'), 'html/venue.html', HTML, True),
+    (re.compile(r'/venue/[^/]+/?$'), 'html/venue.html', HTML, False),
+    (re.compile(r'/brand/[^/]+/?$'), 'html/brand.html', HTML, False),
+]
+
+STATIC_SCRIPT = re.compile(r'^/static/(?P<name>[^/]+)\.js$')
+# Size of a stand-in bundle, about that of one of Wolt's script chunks
+BUNDLE_KB = 50
+
+
+@functools.lru_cache(maxsize=None)
+def stand_in_bundle(name, size_kb=BUNDLE_KB):
+    """A script of about ``size_kb`` KB for ``/static/<name>.js``, the same on every request."""
+    seed = hashlib.sha256(name.encode('utf-8')).hexdigest()
+    chunks = [f'        "chunk-{i:04d}:{hashlib.sha256(f"{seed}{i}".encode()).hexdigest()}",'
+              for i in range(size_kb * 1024 // 84)]
+    lines = ['(function () {',
+             '    window.__bundlesLoaded = (window.__bundlesLoaded || 0) + 1;',
+             '    var chunks = [', *chunks, '    ];',
+             '    window.__bundleChunks = chunks.length;',
+             '})();', '']
+    return '\n'.join(lines).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves fixture files matching the request path, with an ETag and 304 support."""
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        match = STATIC_SCRIPT.search(path)
+        if match:
+            self._send(stand_in_bundle(match.group('name')), JS, 'public, max-age=31536000, immutable')
+            return
+        for pattern, template, content_type, slow in ROUTES:
+            match = pattern.search(path)
+            if not match:
+                continue
+            fixture = os.path.join(self.server.fixtures_dir, template.format(**match.groupdict()))
+            if os.path.exists(fixture):
+                with open(fixture, 'rb') as f:
+                    body = f.read()
+                if slow:
+                    time.sleep(self.server.slow_delay)
+                self._send(body, content_type)
+                return
+        self.send_error(404)
+
+    def _send(self, body, content_type, cache_control=None):
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            if cache_control:
+                self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class StubServer:
+    """Runs the stub HTTP server on a background thread."""
+
+    def __init__(self, host='127.0.0.1', port=0, fixtures_dir=FIXTURES_DIR, slow_delay=2.0):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.fixtures_dir = fixtures_dir
+        self.httpd.slow_delay = slow_delay
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """Start serving in the background."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='stub-server', daemon=True)
+        self.thread.start()
+        logger.info(f"Stub server listening on {self.url}")
+
+    def close(self):
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--slow-delay', type=float, default=2.0, help='Delay of slow-* venues in seconds')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StubServer(port=args.port, fixtures_dir=args.fixtures, slow_delay=args.slow_delay)
+    print(f"Serving {args.fixtures} on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Utility script to manage who gets availability alerts.
+
+Every alert goes to TELEGRAM_CHAT_ID and to the chats subscribed to its
+item at its venue. A subscription names a venue page URL and a tracked
+item name; leaving either out subscribes to every venue or every item.
+Chats that block the bot are unsubscribed automatically.
+
+    python subscribe.py add CHAT_ID [--venue URL] [--product NAME] [--name LABEL]
+    python subscribe.py remove CHAT_ID [--venue URL] [--product NAME]
+    python subscribe.py list [CHAT_ID]
+"""
+import argparse
+import logging
+from config import Config
+from database import Database, ANY
+from venues import get_venue_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Add, remove or list subscriptions."""
+    parser = argparse.ArgumentParser(description='Manage alert subscriptions')
+    parser.add_argument('--db', help=f'Database file (default: {Config.DATABASE_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='Subscribe a chat')
+    remove = commands.add_parser('remove', help='Unsubscribe a chat (from everything unless narrowed down)')
+    for command in (add, remove):
+        command.add_argument('chat_id', help='Telegram chat id')
+        command.add_argument('--venue', help='Venue (or product) URL (default: every venue)')
+        command.add_argument('--product', help='Tracked item name (default: every item)')
+    add.add_argument('--name', help='Label of the subscriber')
+    listing = commands.add_parser('list', help='List subscriptions')
+    listing.add_argument('chat_id', nargs='?', help='Only this chat')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        venue_url = get_venue_url(args.venue) if getattr(args, 'venue', None) else None
+        if args.command == 'add':
+            added = db.add_subscription(args.chat_id, venue_url or ANY, args.product or ANY, name=args.name)
+            print("Subscribed" if added else "Already subscribed")
+        elif args.command == 'remove':
+            removed = db.remove_subscription(args.chat_id, venue_url, args.product)
+            print(f"Removed {removed} subscription(s)")
+        else:
+            subscriptions = db.get_subscriptions(args.chat_id)
+            for subscription in subscriptions:
+                label = f" ({subscription['name']})" if subscription['name'] else ''
+                venue = 'every venue' if subscription['venue_url'] == ANY else subscription['venue_url']
+                product = 'every item' if subscription['product_name'] == ANY else subscription['product_name']
+                print(f"{subscription['chat_id']}{label}: {product} at {venue}")
+            print(f"{len(subscriptions)} subscription(s)")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Shared fixtures: the monitor's modules live at the repository root."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'monitor.db')
+
+
+@pytest.fixture
+def db(db_path):
+    database = Database(db_path, changes_only=False)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def stub():
+    with StubServer(slow_delay=0.1) as server:
+        yield server
@@ -0,0 +1,66 @@
+from api_scraper import WoltApiScraper, item_status
+from backends import FingerprintCache
+
+AVAILABLE_ID = '08c0c9d79b5528337e4ce2b1'
+SOLD_OUT_ID = '5f2a1c0e7d4b9a3c2e1f0a9b'
+
+
+def venue(slug, *item_ids):
+    return {'name': slug, 'slug': slug,
+            'items': [{'id': item_id, 'name': item_id, 'url': f'https://wolt.com/venue/{slug}/itemid-{item_id}'}
+                      for item_id in item_ids]}
+
+
+def test_item_status_restaurant_menu():
+    assert item_status({'baseprice': 899, 'enabled': True}) == {'available': True, 'price': '8,99 €'}
+    assert item_status({'baseprice': 899, 'enabled': False})['available'] is False
+    assert item_status({'baseprice': 899, 'quantity_left': 0})['available'] is False
+    assert item_status({'baseprice': 899, 'quantity_left': 3})['available'] is True
+
+
+def test_item_status_retail_assortment():
+    item = {'price': {'amount': 1149}, 'purchasable_balance': 2}
+    assert item_status(item) == {'available': True, 'price': '11,49 €'}
+    assert item_status(dict(item, purchasable_balance=0))['available'] is False
+    assert item_status(dict(item, disabled_info={'reason': 'sold out'}))['available'] is False
+
+
+def test_item_status_without_price_is_unavailable():
+    assert item_status({'enabled': True}) == {'available': False, 'price': None}
+
+
+def test_check_venue_reads_menu(stub):
+    scraper = WoltApiScraper(api_url=stub.url + '/v4/venues/slug/{slug}/menu')
+    try:
+        available, sold_out, missing = scraper.check_venue(
+            venue('fisherija-maksimir', AVAILABLE_ID, SOLD_OUT_ID, 'ffffffffffffffffffffffff'))
+    finally:
+        scraper.close()
+    assert (available['available'], available['price'], available['error']) == (True, '8,99 €', None)
+    assert sold_out['available'] is False
+    assert 'not found in menu' in missing['error']
+
+
+def test_not_modified_menu_returns_cached_results(stub):
+    cache = FingerprintCache()
+    scraper = WoltApiScraper(api_url=stub.url + '/v4/venues/slug/{slug}/menu', fingerprints=cache)
+    try:
+        first = scraper.check_venue(venue('fisherija-maksimir', AVAILABLE_ID))
+        second = scraper.check_venue(venue('fisherija-maksimir', AVAILABLE_ID))
+    finally:
+        scraper.close()
+    assert 'unchanged' not in first[0]
+    assert second == [dict(first[0], unchanged=True)]
+    # The second request was conditional and answered 304
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_errors_are_not_cached(stub):
+    cache = FingerprintCache()
+    scraper = WoltApiScraper(api_url=stub.url + '/v4/venues/slug/{slug}/menu', fingerprints=cache)
+    try:
+        scraper.check_venue(venue('fisherija-maksimir', 'ffffffffffffffffffffffff'))
+        again = scraper.check_venue(venue('fisherija-maksimir', 'ffffffffffffffffffffffff'))
+    finally:
+        scraper.close()
+    assert again[0]['error'] and 'unchanged' not in again[0]
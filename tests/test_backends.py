@@ -0,0 +1,39 @@
+from backends import FingerprintCache
+
+RESULT = {'available': True, 'price': '8,99 €', 'error': None}
+
+
+def test_lookup_matches_fingerprint():
+    cache = FingerprintCache()
+    assert cache.lookup('venue', 'abc') is None
+    cache.store('venue', 'abc', [RESULT])
+    assert cache.lookup('venue', 'abc') == [dict(RESULT, unchanged=True)]
+    assert cache.lookup('venue', 'def') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cached_results_are_copies():
+    cache = FingerprintCache()
+    result = dict(RESULT)
+    cache.store('venue', 'abc', [result])
+    result['available'] = False
+    cache.lookup('venue', 'abc')[0]['price'] = None
+    assert cache.lookup('venue', 'abc') == [dict(RESULT, unchanged=True)]
+
+
+def test_validators_and_hit():
+    cache = FingerprintCache()
+    assert cache.validators('venue') == {}
+    assert cache.hit('venue') is None
+    cache.store('venue', 'abc', [RESULT], etag='"v1"', last_modified='Tue, 01 Sep 2026 10:00:00 GMT')
+    assert cache.validators('venue') == {'If-None-Match': '"v1"',
+                                         'If-Modified-Since': 'Tue, 01 Sep 2026 10:00:00 GMT'}
+    assert cache.hit('venue') == [dict(RESULT, unchanged=True)]
+
+
+def test_error_results_evict_the_entry():
+    cache = FingerprintCache()
+    cache.store('venue', 'abc', [RESULT], etag='"v1"')
+    cache.store('venue', 'def', [RESULT, dict(RESULT, error='Timeout')])
+    assert cache.lookup('venue', 'abc') is None
+    assert cache.validators('venue') == {}
@@ -0,0 +1,62 @@
+import sqlite3
+
+from database import MIGRATIONS, Database
+
+# Checks as version 1 stored them
+V1_CHECKS = [
+    ('Maksimir', 'https://wolt.com/venue/maksimir', 'Losos', 0, '11,49 €', '2026-09-01T10:00:00'),
+    ('Maksimir', 'https://wolt.com/venue/maksimir', 'Losos', 1, '11,49 €', '2026-09-01T11:00:00'),
+    ('Dubrava', 'https://wolt.com/venue/dubrava', 'Losos', 0, None, '2026-09-01T10:30:00'),
+]
+
+
+def v1_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(f'{MIGRATIONS[0][2]}; PRAGMA user_version = 1;')
+    conn.executemany('''
+        INSERT INTO product_checks (location_name, location_url, product_name, is_available, price, checked_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', V1_CHECKS)
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_is_at_the_latest_version(db):
+    assert db.schema_version() == MIGRATIONS[-1][0] == 8
+
+
+def test_migrates_version_1_history(db_path):
+    v1_database(db_path)
+    db = Database(db_path, changes_only=False)
+    try:
+        assert db.schema_version() == 8
+        # The latest check per product, from check_state
+        last = db.get_last_check('Maksimir', 'Losos')
+        assert (last.is_available, last.price, last.checked_at) == (True, '11,49 €', '2026-09-01T11:00:00')
+        assert db.get_last_check('Dubrava', 'Losos').price is None
+
+        # History moved to checks, with prices in cents; the view keeps the old shape
+        assert db.conn.execute('SELECT COUNT(*) FROM checks').fetchone()[0] == 3
+        assert sorted(row['price_cents'] for row in db.conn.execute('SELECT price_cents FROM checks')
+                      if row['price_cents']) == [1149, 1149]
+        rows = db.conn.execute('SELECT location_name, is_available, price, checked_at FROM product_checks '
+                               'ORDER BY id').fetchall()
+        assert [tuple(row) for row in rows] == [(name, available, price, checked_at)
+                                                for name, _, _, available, price, checked_at in V1_CHECKS]
+
+        # Tables of the later versions are usable
+        db.add_subscription('42', 'https://wolt.com/venue/maksimir', 'Losos')
+        assert db.get_subscribers('https://wolt.com/venue/maksimir', 'Losos') == ['42']
+        db.set_setting('last_maintenance', 1)
+        assert db.get_setting('last_maintenance') == '1'
+    finally:
+        db.close()
+
+
+def test_reopening_does_not_migrate_again(db_path):
+    Database(db_path, changes_only=False).close()
+    db = Database(db_path, changes_only=False)
+    try:
+        assert db.schema_version() == 8
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+from health import VenueHealth
+
+
+def health():
+    return VenueHealth(base_delay=60, max_delay=300, failure_threshold=4, probe_interval=3600)
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    venues = health()
+    delays = []
+    for _ in range(3):
+        venues.record('v', ok=False, now=0)
+        delays.append(venues.retry_delay('v'))
+    assert delays == [60, 120, 240]
+    assert venues.state('v') == 'closed'
+    assert not venues.allow('v', now=239)
+    assert venues.wait_time('v', now=200) == 40
+    assert venues.allow('v', now=240)
+
+
+def test_threshold_opens_the_circuit_and_probes():
+    venues = health()
+    for _ in range(4):
+        venues.record('v', ok=False, now=0)
+    assert venues.state('v') == 'open'
+    assert venues.parked() == ['v']
+    assert venues.retry_delay('v') == 3600
+    assert not venues.allow('v', now=3599)
+
+    # The probe moves the circuit to half-open; a failed probe opens it again
+    assert venues.allow('v', now=3600)
+    assert venues.state('v') == 'half_open'
+    venues.record('v', ok=False, now=3600)
+    assert venues.state('v') == 'open'
+    assert venues.wait_time('v', now=3600) == 3600
+
+
+def test_success_closes_the_circuit():
+    venues = health()
+    for _ in range(4):
+        venues.record('v', ok=False, now=0)
+    venues.allow('v', now=3600)
+    venues.record('v', ok=True)
+    assert venues.state('v') == 'closed'
+    assert venues.parked() == []
+    assert venues.retry_delay('v') == 0
+    assert venues.allow('v', now=0)
+
+
+def test_no_threshold_never_opens():
+    venues = VenueHealth(base_delay=60, max_delay=300, failure_threshold=0)
+    for _ in range(10):
+        venues.record('v', ok=False, now=0)
+    assert venues.state('v') == 'closed'
+    assert venues.retry_delay('v') == 300
@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from config import Config
+from mock_telegram import MockTelegram
+from notifier import NotificationQueue, RateLimiter, TelegramNotifier, format_availability_alert
+
+VENUE_URL = 'https://wolt.com/hr/hrv/zagreb/venue/fisherija-maksimir'
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    def start(**options):
+        mock = MockTelegram(rate=0, chat_interval=0, **options)
+        mock.start()
+        started.append(mock)
+        monkeypatch.setattr(Config, 'TELEGRAM_API_URL', mock.url)
+        monkeypatch.setattr(Config, 'TELEGRAM_BOT_TOKEN', 'test-token')
+        monkeypatch.setattr(Config, 'TELEGRAM_CHAT_ID', '1')
+        return mock
+
+    started = []
+    yield start
+    for mock in started:
+        mock.close()
+
+
+@pytest.fixture
+def alerts(db, db_path):
+    queues = []
+
+    def create():
+        queue = NotificationQueue(TelegramNotifier(), db_path=db_path, digest_window=30, senders=4,
+                                  rate_limiter=RateLimiter(rate=0, chat_interval=0, group_interval=0))
+        queues.append(queue)
+        return queue
+
+    yield create
+    for queue in queues:
+        queue.close(timeout=5)
+
+
+def deliver(queue, timeout=5.0):
+    """Send what is queued now and wait until the outbox is empty."""
+    queue.flush()
+    deadline = time.monotonic() + timeout
+    while queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return queue.pending()
+
+
+def texts(mock, chat_id):
+    return [text for _, chat, text in mock.messages if chat == chat_id]
+
+
+def wait_for(mock, chat_id, count, timeout=5.0):
+    """Wait until ``chat_id`` has received ``count`` messages; returns its messages."""
+    deadline = time.monotonic() + timeout
+    while len(texts(mock, chat_id)) < count and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return texts(mock, chat_id)
+
+
+def test_alert_fields_are_escaped():
+    body = format_availability_alert('Fish & <Chips>', "https://wolt.com/?a=1&b='2'", 'Losos <150g>', '8,99 €')
+    assert 'Fish &amp; &lt;Chips&gt;' in body
+    assert 'Losos &lt;150g&gt;' in body
+    assert "<a href='https://wolt.com/?a=1&amp;b=&#x27;2&#x27;'>" in body
+
+
+def test_alerts_within_the_window_are_one_digest(telegram, alerts):
+    mock = telegram()
+    queue = alerts()
+    for name in ('Losos', 'Tuna', 'Škampi'):
+        queue.enqueue('Maksimir', VENUE_URL, name, '8,99 €', chat_ids=['1', '2'])
+    assert deliver(queue) == 0
+    for chat_id in ('1', '2'):
+        [digest] = texts(mock, chat_id)
+        assert '3 PRODUCTS AVAILABLE' in digest
+        assert all(name in digest for name in ('Losos', 'Tuna', 'Škampi'))
+
+
+def test_long_digests_are_split(telegram, alerts):
+    mock = telegram()
+    queue = alerts()
+    for i in range(60):
+        queue.enqueue('Maksimir', VENUE_URL, f'Product {i} ' + 'x' * 60)
+    assert deliver(queue) == 0
+    messages = texts(mock, '1')
+    assert len(messages) > 1
+    assert all(len(text) <= 4096 for text in messages)
+    assert sum(text.count('📦') for text in messages) == 60
+
+
+def test_blocked_chat_is_unsubscribed(telegram, alerts, db):
+    mock = telegram(blocked=['666'])
+    db.add_subscription('666', VENUE_URL, 'Losos')
+    db.add_subscription('7', VENUE_URL, 'Losos')
+    queue = alerts()
+    queue.enqueue('Maksimir', VENUE_URL, 'Losos', chat_ids=['666', '7'])
+    assert deliver(queue) == 0
+    assert mock.forbidden == 1
+    assert len(texts(mock, '7')) == 1
+    assert db.get_subscribers(VENUE_URL, 'Losos') == ['7']
+    assert db.get_subscriptions('666') == []
+
+
+def test_refused_alert_is_dropped_alone(telegram, alerts):
+    mock = telegram(rejected=['Poison'])
+    queue = alerts()
+    for name in ('Losos', 'Poison', 'Tuna'):
+        queue.enqueue('Maksimir', VENUE_URL, name)
+    assert deliver(queue) == 0
+    delivered = texts(mock, '1')
+    # The digest was refused, then its alerts were sent one by one
+    assert mock.refused == 2
+    assert len(delivered) == 2
+    assert not any('Poison' in text for text in delivered)
+
+
+def test_failing_chat_does_not_hold_up_others(telegram, alerts):
+    mock = telegram(failing=['500'])
+    queue = alerts()
+    queue.enqueue('Maksimir', VENUE_URL, 'Losos', chat_ids=['500', '7'])
+    queue.flush()
+    assert len(wait_for(mock, '7', 1)) == 1
+    deadline = time.monotonic() + 5
+    while not mock.failed and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert mock.failed
+
+    # While chat 500 backs off, new alerts to other chats go out
+    queue.enqueue('Maksimir', VENUE_URL, 'Tuna', chat_ids=['7'])
+    queue.flush()
+    assert len(wait_for(mock, '7', 2)) == 2
+    # Chat 500's alert stays queued for a retry
+    assert queue.pending() == 1
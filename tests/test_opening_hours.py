@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from opening_hours import OpeningHours, parse_opening_times
+
+ZAGREB = ZoneInfo('Europe/Zagreb')
+
+
+def at(day, hour, minute=0):
+    """A moment in Zagreb in the week of Monday 2026-09-07."""
+    return datetime(2026, 9, 7 + day, hour, minute, tzinfo=ZAGREB)
+
+
+def entry(kind, hour, minute=0):
+    return {'type': kind, 'value': {'$date': (hour * 60 + minute) * 60000}}
+
+
+def test_parse_same_day_hours():
+    data = {'results': [{'timezone': 'Europe/Zagreb', 'opening_times': {
+        'monday': [entry('open', 8), entry('close', 20)],
+        'tuesday': [entry('open', 8), entry('close', 12), entry('open', 14), entry('close', 20)],
+    }}]}
+    assert parse_opening_times(data) == ('Europe/Zagreb', [(0, 480, 1200), (1, 480, 720), (1, 840, 1200)])
+
+
+def test_parse_close_listed_on_the_next_day():
+    data = {'opening_times': {
+        'friday': [entry('open', 18)],
+        'saturday': [entry('close', 2), entry('open', 18)],
+        'sunday': [entry('close', 3), entry('open', 20)],
+        'monday': [entry('close', 1)],
+    }}
+    tz, intervals = parse_opening_times(data)
+    assert tz is None
+    assert sorted(intervals) == [(4, 1080, 1440 + 120), (5, 1080, 1440 + 180), (6, 1200, 1440 + 60)]
+
+
+def test_parse_close_before_open_on_the_same_day():
+    data = {'opening_times': {'monday': [entry('open', 22), entry('close', 2)]}}
+    assert parse_opening_times(data) == (None, [(0, 1320, 1440 + 120)])
+
+
+def test_parse_without_opening_times():
+    assert parse_opening_times({'results': [{'slug': 'venue'}]}) is None
+
+
+def test_open_and_closed():
+    hours = OpeningHours([(0, 480, 1200)], 'Europe/Zagreb')
+    assert hours.is_open(at(0, 8))
+    assert not hours.is_open(at(0, 20))
+    assert hours.seconds_until_open(at(0, 7, 30)) == 30 * 60
+    assert hours.seconds_until_open(at(0, 12)) == 0
+    assert hours.seconds_since_open(at(0, 9)) == 3600
+    assert hours.seconds_since_open(at(0, 21)) is None
+    # Next Monday
+    assert hours.seconds_until_open(at(0, 21)) == (7 * 24 - 13) * 3600
+
+
+def test_sunday_night_wraps_to_monday():
+    hours = OpeningHours([(6, 1200, 1440 + 60)], 'Europe/Zagreb')
+    assert hours.is_open(at(6, 23))
+    assert hours.is_open(at(7, 0, 30))
+    assert not hours.is_open(at(7, 1))
+    # Opened on Sunday at 20:00
+    assert hours.seconds_since_open(at(7, 0, 30)) == 4.5 * 3600
+
+
+def test_timezone_is_the_venues():
+    hours = OpeningHours([(0, 480, 1200)], 'Europe/Zagreb')
+    # 07:00 UTC is 09:00 in Zagreb (summer time)
+    assert hours.is_open(datetime(2026, 9, 7, 7, tzinfo=timezone.utc))
+    assert not hours.is_open(datetime(2026, 9, 7, 19, tzinfo=timezone.utc))
+
+
+def test_unknown_timezone_reads_as_utc():
+    hours = OpeningHours([(0, 480, 1200)], 'Mars/Olympus')
+    assert hours.tz is timezone.utc
+
+
+def test_never_open():
+    hours = OpeningHours([])
+    assert not hours.is_open()
+    assert hours.seconds_until_open() is None
+    assert hours.describe().startswith('Mon closed')
@@ -0,0 +1,87 @@
+"""Tracking model: venues and the items tracked at each of them."""
+import re
+
+VENUE_SLUG_PATTERN = re.compile(r'/venue/([^/?#]+)')
+ITEM_ID_PATTERN = re.compile(r'itemid-([0-9a-f]+)')
+
+
+def parse_product_url(url):
+    """
+    Split a Wolt product URL into its venue slug and item id.
+
+    Example: .../venue/fisherija-maksimir/some-product-itemid-08c0c9d7...
+
+    Returns:
+        tuple: (venue_slug, item_id), either of which may be None
+    """
+    slug = VENUE_SLUG_PATTERN.search(url)
+    item_id = ITEM_ID_PATTERN.search(url)
+    return (slug.group(1) if slug else None, item_id.group(1) if item_id else None)
+
+
+def get_venue_url(url):
+    """Strip the item part from a Wolt product URL, leaving the venue page URL."""
+    match = VENUE_SLUG_PATTERN.search(url)
+    if not match:
+        return url.split('?')[0]
+    return url[:match.end()]
+
+
+def load_venues(locations, default_product_name):
+    """
+    Normalize configured locations into venues with a list of tracked items.
+
+    A location is either a single product URL (the original format)::
+
+        {'name': 'Fisherija Maksimir', 'url': '.../venue/fisherija-maksimir/...-itemid-08c0...'}
+
+    or a venue with several items, identified by id and/or name::
+
+        {'name': 'Fisherija Maksimir', 'url': '.../venue/fisherija-maksimir',
+         'items': [{'id': '08c0...', 'name': 'Divlji crveni losos ...'}, {'name': 'Fileti bakalara 400g'}]}
+
+    Product URLs pointing at the same venue are merged, so every venue is
+    loaded once per cycle however many of its items are tracked; an item
+    listed twice for a venue (e.g. configured and discovered) is kept once.
+
+    Returns:
+        list: Venue dicts with 'name', 'url', 'slug', 'backend' and 'items',
+        where every item has 'id' (may be None), 'name' and 'url'
+    """
+    venues = {}
+    # Venue URL -> (item id, item name) pairs already added
+    seen_items = {}
+    for location in locations:
+        url = get_venue_url(location['url'])
+        slug, item_id = parse_product_url(location['url'])
+
+        venue = venues.get(url)
+        if venue is None:
+            venue = venues[url] = {
+                'name': location['name'],
+                'url': url,
+                'slug': slug,
+                'backend': location.get('backend'),
+                'items': []
+            }
+
+        if 'items' in location:
+            items = location['items']
+        else:
+            items = [{'id': item_id, 'name': location.get('product', default_product_name), 'url': location['url']}]
+
+        seen = seen_items.setdefault(url, set())
+        for item in items:
+            if not item.get('id') and not item.get('name'):
+                raise ValueError(f"Item at {location['name']} needs an 'id' or a 'name'")
+            key = (item.get('id'), item.get('name') or item['id'])
+            if key in seen:
+                continue
+            seen.add(key)
+            venue['items'].append({
+                'id': item.get('id'),
+                'name': item.get('name') or item['id'],
+                'url': item.get('url', url)
+            })
+
+    return list(venues.values())